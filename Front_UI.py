@@ -3,15 +3,26 @@ import tkinter as tk
 from tkinter import ttk,filedialog,messagebox  
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.ndimage import binary_fill_holes
 import os
 from totalsegmentator.python_api import totalsegmentator
-import glob
+from totalsegmentator.map_to_binary import class_map
 import pydicom
 from rt_utils.rtstruct import RTStruct
 from tkinterdnd2 import DND_FILES, TkinterDnD 
 import time
-from rt_utils import RTStructBuilder
+from volume_cache import VolumeCache, load_series_cached
+from inference_worker import InferenceWorker
+from inference_cache import InferenceCache, get_model_version
+from label_volume import LabelVolume
+from nifti_grid import volume_to_nifti, labels_to_grid, editor_grid_affine
+from mask_store import MaskStore, _bbox
+from rtstruct_writer import RTStructWriter
+from edit_journal import EditJournal
+from render_cache import SliceRenderCache, composite_region
+from slice_interpolation import MAX_INTERPOLATION_GAP, interpolate_key_slices
+from mask_postprocess import MIN_BLOB_MM3, clean_roi, clean_masks
+from brush_stroke import BRUSH_SHAPES, StrokeBuffer, rasterize_stroke, close_stroke, slab_footprint
+from windowing import WindowLUT, WINDOW_PRESETS, window_to_uint8, first_value
 
 '''
 좌클릭 -> 추가 mask생성
@@ -57,8 +68,21 @@ class MaskEditor:
         self.d2_slices = None # dicom의 넘파이배열버전(x,y,z) -> dicom_to_np이 함수에서만 사용됨
 
         self.todosegment = [] # 지금 추론할 장기 이름들
-
-        self.masks_dict = {} # 장기별로 mask를 boolean형태로(3차원, x,y,z)
+        self.inference_worker = None # 백그라운드 추론 worker
+        self.inference_organs = [] # 백그라운드에서 추론중인 장기 이름들
+        self.inference_slices = None # 추론을 시작할때의 d2_slices
+        self.inference_start_time = None
+        self.inference_status = "" # 상태바에 표시할 추론 진행상황
+        self.inference_cache = InferenceCache() # 시리즈 UID별 추론결과 디스크 캐시
+        self.volume_cache = VolumeCache() # 시리즈 UID별 디코딩된 볼륨 디스크 캐시 (memmap)
+        self.inference_task = 'total' # roi_subset을 사용할때 TotalSegmentator task
+        self.inference_kind = None # 'subset'(선택 장기만) 또는 'full'(전체 task 한번에)
+        self.full_labels = None # full task 모드에서 한번 추론한 multilabel 결과 (LabelVolume)
+
+        self.masks_dict = {} # 장기별로 mask를 boolean형태로(3차원, x,y,z) -> 시리즈를 열면 MaskStore로 바뀜 (bounding box만 저장)
+        self.rtstruct_writer = None # 시리즈를 열면 생성 (save_mask에서 사용)
+        self.edit_journal = None # 마스크 수정 undo/redo 기록 (시리즈를 열면 생성)
+        self.key_slices = {} # {ROI 이름: {사용자가 직접 수정한 슬라이스 인덱스: 수정 횟수}} -> 슬라이스 보간에 사용
         self.isSemented = {task_name: False for task_name in self.organ_names} # 해당 organ이 이미 분할한건지 boolean
         self.segmented_class_names = [] # 분할완료된 organ이름들
 
@@ -67,10 +91,20 @@ class MaskEditor:
         # # --- 상태 변수 ---
         self.current_slice_idx = None
         self.brush_size = 1
+        self.brush_shape = "square" # 'b' 키로 square / round 전환
+        self.slab_depth = 0 # 3차원 브러시: 현재 슬라이스 위아래로 같이 편집할 슬라이스 수 ('[' / ']')
+        self.stroke_points = StrokeBuffer() # 아직 칠하지 않은 마우스 이동 점들
+        self.paint_job = None # after_idle로 예약된 _paint
         self.drawing = False
         self.erasing = False # 지우기 상태 변수 추가
         self.d_key_pressed = False # 'd' 키 상태 변수 추가
         self.temp_line_mask = None
+        self.stroke_frame = None # 그리는 동안 화면에 보여줄 합성 이미지 (base layer + 현재 stroke)
+
+        # --- 화면 랜더링 캐시 ---
+        self.render_cache = SliceRenderCache() # 슬라이스별 CT + ROI 오버레이 합성 결과
+        self.photo_img = None # 재사용하는 tkinter PhotoImage
+        self.canvas_image_id = None # 캔버스에 올라가있는 이미지 item
 
         # --- 줌 & 팬 상태 변수 ---
         self.zoom_level = 1.0
@@ -126,19 +160,28 @@ class MaskEditor:
             self.status_label.config(text=f"Failed to load DICOM data: {e}")
             return
             
-        self.masks_dict = {}
+        self.masks_dict = MaskStore(self.ct_volume.shape)
+        self.rtstruct_writer = RTStructWriter(self.d2_slices) # 저장할 때 바뀐 ROI/슬라이스만 다시 contour
+        self.edit_journal = EditJournal(self.masks_dict)
+        self.key_slices = {}
         self.isSemented = {task_name: False for task_name in self.organ_names}
         self.segmented_class_names = [] # 초기화
         self.selected_organ_name = None
         self.todosegment.clear() # 지금 추론할 장기 이름들
+        self.full_labels = None
 
         # --- 상태 변수 ---
         self.current_slice_idx = self.ct_volume.shape[2] // 2
         self.brush_size = 1
+        self.slab_depth = 0
         self.drawing = False
         self.erasing = False
         self.d_key_pressed = False
         self.temp_line_mask = np.zeros(self.ct_volume.shape[:2], dtype=bool)
+        self.stroke_frame = None
+        self._cancel_paint()
+        self.render_cache.invalidate()
+        self.window_combobox.set("default")
 
         # --- 줌 & 팬 상태 변수 ---
         self.zoom_level = 1.0
@@ -161,17 +204,12 @@ class MaskEditor:
 
         self._update_plot()
         self.status_label.config(text="DICOM data loaded successfully. Ready to edit.")
+        # full task 모드면 바로 백그라운드에서 전체 추론 시작
+        self._start_full_task()
 
 
     def _normalize_to_uint8(self, data, central_val ,width_val):
-        window_center = central_val
-        window_width = width_val
-        min_val = window_center - window_width / 2
-        max_val = window_center + window_width / 2
-        
-        data = np.clip(data, min_val, max_val)
-        data = (data - min_val) / (max_val - min_val) * 255
-        return data.astype(np.uint8)
+        return window_to_uint8(data, central_val, width_val)
     
     def _setup_ui(self):
         main_frame = ttk.Frame(self.root)
@@ -209,6 +247,17 @@ class MaskEditor:
         # 가로로 긴 'Inference' 버튼을 check_container_task에 직접 추가합니다.
         self.inference_button_long = ttk.Button(check_container_task, text="Inference", command=self.run_segmentation_get_mask) # command는 실제 실행할 함수로 연결하세요.
         self.inference_button_long.pack(fill=tk.X, padx=5, pady=(0, 5)) # 위아래 여백(padding) 추가
+        # 백그라운드 추론 취소 버튼
+        self.cancel_button = ttk.Button(check_container_task, text="Cancel", command=self.cancel_segmentation, state='disabled')
+        self.cancel_button.pack(fill=tk.X, padx=5, pady=(0, 5))
+        # 전체 task를 시리즈당 한번만 추론해두고 장기는 거기서 꺼내쓰는 모드
+        self.full_task_var = tk.BooleanVar(value=False)
+        self.full_task_check = ttk.Checkbutton(check_container_task, text="Segment full task once", variable=self.full_task_var, command=self._on_full_task_toggled)
+        self.full_task_check.pack(anchor='w', padx=5)
+        # 추론 결과에서 작은 덩어리를 지우고 저장
+        self.clean_inference_var = tk.BooleanVar(value=False)
+        self.clean_inference_check = ttk.Checkbutton(check_container_task, text=f"Remove blobs < {MIN_BLOB_MM3:.0f} mm³", variable=self.clean_inference_var)
+        self.clean_inference_check.pack(anchor='w', padx=5)
 
         # 스크롤 만들어 주는 부분
         self.visible_scroll_frame1 = ScrollableFrame(check_container_task)
@@ -241,14 +290,31 @@ class MaskEditor:
         self.editing_search_entry.bind("<KeyRelease>", self._filter_editing_rois)
 
         # 가로로 긴 'Mask_sace' 버튼을 추가합니다.
-        self.inference_button_long = ttk.Button(radio_container, text="Mask_Save", command=self.save_mask) # command는 실제 실행할 함수로 연결하세요.
-        self.inference_button_long.pack(fill=tk.X, padx=5, pady=(0, 5)) # 위아래 여백(padding) 추가
+        self.save_button = ttk.Button(radio_container, text="Mask_Save", command=self.save_mask) # command는 실제 실행할 함수로 연결하세요.
+        self.save_button.pack(fill=tk.X, padx=5, pady=(0, 5)) # 위아래 여백(padding) 추가
+
+        # editing roi 후처리 버튼들
+        cleanup_frame = ttk.Frame(radio_container)
+        cleanup_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+        cleanup_actions = [("Largest", {'largest_only': True}), ("Small", {'min_blob_mm3': MIN_BLOB_MM3}),
+                           ("Fill", {'fill_slices': True}), ("Open", {'open_radius': 1}), ("Close", {'close_radius': 1})]
+        for text, options in cleanup_actions:
+            ttk.Button(cleanup_frame, text=text, width=6, command=lambda o=options: self._clean_editing_roi(**o)).pack(side=tk.LEFT, expand=True, fill=tk.X)
         
 
         self.editing_scroll_frame = ScrollableFrame(radio_container)
         self.editing_scroll_frame.pack(fill=tk.BOTH, expand=True)
         self._populate_editing_rois_list(self.segmented_class_names)
 
+        # window/level 프리셋 선택 (default는 DICOM 헤더의 값)
+        window_frame = ttk.Frame(right_frame)
+        window_frame.pack(fill=tk.X, padx=5, pady=(5, 0))
+        ttk.Label(window_frame, text="Window").pack(side=tk.LEFT)
+        self.window_combobox = ttk.Combobox(window_frame, values=["default"] + list(WINDOW_PRESETS), state="readonly", width=15)
+        self.window_combobox.set("default")
+        self.window_combobox.pack(side=tk.LEFT, padx=(5, 0))
+        self.window_combobox.bind("<<ComboboxSelected>>", self._on_window_preset)
+
         # 화면 오른쪽에 그릴 빈 canvas만들어줌, 배경은 검은색으로
         self.canvas = tk.Canvas(right_frame, bg='black')
         self.canvas.pack(fill=tk.BOTH, expand=True)
@@ -267,14 +333,23 @@ class MaskEditor:
         self.root.bind("<KeyPress-d>", self._on_d_press)
         self.root.bind("<KeyRelease-d>", self._on_d_release)
 
+        # undo / redo
+        self.root.bind("<Control-z>", self._on_undo)
+        self.root.bind("<Control-y>", self._on_redo)
+        self.root.bind("<Control-Z>", self._on_redo) # ctrl + shift + z
+
         self.canvas.bind("<ButtonPress-1>", self._on_press) # 마우스 왼쪽 버튼 누를때
         self.canvas.bind("<ButtonRelease-1>", self._on_release) # 마우스 왼쪽 버튼 뗄시
         self.canvas.bind("<B1-Motion>", self._on_motion) # 마우스 왼쪽버튼 누르면서 움직일떄
 
         self.canvas.bind("<Control-MouseWheel>", self._on_zoom) # ctrl + 마우스휠 
+        self.canvas.bind("<Configure>", self._on_canvas_resize) # 캔버스 크기 변경
 
         self.canvas.bind("<ButtonPress-3>", self._on_pan_start)# 마우스 오른쪽버튼 누를 시
         self.canvas.bind("<B3-Motion>", self._on_pan_move) #마우스 오른쪽버튼 누르고 움직일떄
+
+        self.canvas.bind("<ButtonPress-2>", self._on_window_drag_start) # 마우스 가운데 버튼 누를 시
+        self.canvas.bind("<B2-Motion>", self._on_window_drag) # 가운데 버튼 드래그로 window/level 조절
     
     def save_mask(self):
         Result_mask = self.get_modified_masks()
@@ -306,19 +381,10 @@ class MaskEditor:
 
             
             print(f"{new_rt_filename} 파일 생성중 ...")
-            new_rtstruct = RTStructBuilder.create_new(self.dicom_folder)
-            
-            for name, mask in Result_mask.items():
-                filled_mask = binary_fill_holes(mask)
-                
-                # 수정된 마스크를 ROI로 추가
-                new_rtstruct.add_roi(
-                    mask=filled_mask,
-                    name=f"{name}_modified"
-                )
-            
-            new_rtstruct.save(new_rt_filename)
-            print(f"저장 완료! 새로운 파일: {new_rt_filename}")
+            # 이미 읽어둔 헤더로 RTSTRUCT를 만들고, 수정되지 않은 ROI/슬라이스는 이전 저장 때의 contour를 재사용
+            stats = self.rtstruct_writer.write(Result_mask, new_rt_filename)
+            print(f"저장 완료! 새로운 파일: {new_rt_filename} "
+                  f"(contour 계산 {stats['contoured']} 슬라이스, 재사용 {stats['reused']} 슬라이스)")
             messagebox.showwarning(f"정보", "수정된 마스크 '{new_rt_filename}' 가 저장되었습니다.")
 
         else:
@@ -360,9 +426,13 @@ class MaskEditor:
 
     def add_todo_segmentation_organ(self):
         print("pushed add!")
-        # 분할이 안된거면서 기존 todosegment에 없을때
+        # full task 결과가 이미 있으면 모델 실행없이 바로 꺼내옴
+        if self.full_labels is not None and self.isSemented.get(self.selected_organ_name) == False:
+            self._materialize_from_full_labels([self.selected_organ_name])
+            return
+        # 분할이 안된거면서 기존 todosegment에 없을때 (백그라운드에서 추론중인것도 제외)
         if self.isSemented[self.selected_organ_name] == False:
-            if not self.selected_organ_name in self.todosegment:
+            if not self.selected_organ_name in self.todosegment and not self.selected_organ_name in self.inference_organs:
                 print(f"name:{self.selected_organ_name} is added")
                 self.todosegment.append(self.selected_organ_name)
         elif self.isSemented[self.selected_organ_name] == True:
@@ -416,82 +486,254 @@ class MaskEditor:
             messagebox.showwarning("알림","선택된 장기가 없습니다")
             print("선택된 장기가 없습니다")
             return None
-        # segmentation loading UI
-        loading_window = tk.Toplevel(self.root)
-        loading_window.title("Processing")
-        # 창 크기 및 위치 설정 (화면 중앙에 오도록)
-        win_width = 200
-        win_height = 50
-        x = self.root.winfo_x() + (self.root.winfo_width() // 2) - (win_width // 2)
-        y = self.root.winfo_y() + (self.root.winfo_height() // 2) - (win_height // 2)
-        loading_window.geometry(f'{win_width}x{win_height}+{x}+{y}')
-        ttk.Label(loading_window, text="처리 중입니다...").pack(pady=15)
-
-        loading_window.transient(self.root) # 메인 창 위에 항상 있도록 설정
-        loading_window.grab_set()           # 모든 이벤트를 이 창으로 집중시켜 다른 상호작용을 막음
-        self.root.update_idletasks()        # 위 변경사항을 즉시 적용
+        if self.full_task_var.get():
+            # full task 모드: 결과가 있으면 바로 꺼내고 없으면 전체 추론이 끝날때 꺼냄
+            if self.full_labels is not None:
+                self._materialize_from_full_labels(list(self.todosegment))
+            else:
+                self._start_full_task()
+            return None
+        if self.inference_worker is not None and self.inference_worker.is_alive():
+            messagebox.showwarning("알림","이전 추론이 아직 진행중입니다")
+            return None
+
+        # 추론할 장기들은 todosegment에서 빼서 진행중 목록으로 옮김 -> 추론중에도 새로 add 가능
+        requested = list(self.todosegment)
+        self.todosegment.clear()
+        self._populate_segmen_rois()
+
+        # 이미 캐시에 있는 장기는 추론없이 바로 불러옴
+        series_uid = self.d2_slices[0].SeriesInstanceUID
+        cached_masks, missing = self.inference_cache.load(series_uid, self.inference_task, get_model_version(),
+                                                         requested, self.ct_volume.shape)
+        cached_organs = [name for name in requested if name not in missing]
+        if cached_organs:
+            print(f"캐시에서 불러옴: {cached_organs}")
+            self._apply_segmentation_result(cached_masks, cached_organs)
+        if not missing:
+            return None
+        self.inference_organs = missing
 
         print(f"segmentation진행중 ...")
-        try:
-            temp_path = self.segmentation('dicom', self.dicom_folder, self.todosegment) # todosegment = 현재 분할할 장기이름들
-            start_time = time.time()
-            new_mask = self.get_mask_From_rtstruct(temp_path)
-            # 아예 분할 안됬을때
-            if new_mask is None:
-                print("분할된것이 없습니다")
-                return
-            # 전부 분할했을떄
-            elif len(new_mask) == len(self.todosegment):
-                for name in self.todosegment:
-                    self.isSemented[name] = True
-                print("전부 분할 완료")
-            # 일정부분만 분할했을떄
-            else:
-                for name in self.todosegment:
-                    if name not in new_mask:
-                        print(f"{name}은 분할되지 않았습니다") 
-                    else:
-                        print(f"is segmented에 추가 {name}")
-                        self.isSemented[name] = True
-                        # self.segmented_class_names.append(name)
+        # 추론은 별도 thread에서 실행하고 결과는 _poll_inference에서 받아옴
+        self._start_inference_worker('subset', self._inference_job, self.ct_volume, self.d2_slices, self.slope, self.intercept,
+                                     self.inference_organs, series_uid)
+
+    def _start_inference_worker(self, kind, job, *args):
+        self.inference_kind = kind
+        self.inference_worker = InferenceWorker(job, *args).start()
+        self.inference_slices = self.d2_slices # 추론 도중 다른 폴더를 열었는지 확인하는 용도
+        self.inference_start_time = time.time()
+        self.inference_status = "starting"
+        self.inference_button_long.config(state='disabled')
+        self.cancel_button.config(state='normal')
+        self.root.after(100, self._poll_inference)
+
+    def _inference_job(self, worker, ct_volume, d2_slices, slope, intercept, organs, series_uid):
+        # worker thread에서 실행됨 -> Tk 위젯 접근 금지
+        worker.report(f"TotalSegmentator {organs}")
+        labels = self.segmentation_to_labels(ct_volume, d2_slices, slope, intercept, organs) # organs = 현재 분할할 장기이름들
+        if labels is None or worker.cancelled:
+            return None
 
-            self.todosegment.clear()
+        # multilabel 결과에서 요청한 장기만 잘라서 마스크로 만듦 (RTSTRUCT 변환 없음)
+        worker.report("splitting labels")
+        start_time = time.time()
+        new_mask = {name: labels.get_mask(name) for name in organs if labels.contains(name)}
+        end_time = time.time()
+        print(f"label split time = {end_time-start_time}")
 
-            end_time = time.time()
-            print(f"rtstruct loading time = {end_time-start_time}")
+        worker.report("writing cache")
+        self.inference_cache.store(series_uid, self.inference_task, get_model_version(), new_mask, organs, ct_volume.shape)
+        return new_mask
 
-            if new_mask is not None:
-                self.masks_dict.update(new_mask) # 기존 마스크딕셔너리에 새로운 마스크들 추가
-                self.segmented_class_names.extend(list(self.masks_dict.keys())) # class name 최신화
+    def _on_full_task_toggled(self):
+        if self.full_task_var.get():
+            self._start_full_task()
 
-                self._populate_editing_rois_list(self.segmented_class_names)
-                self.check_vars = {name: tk.BooleanVar(value=False) for name in self.segmented_class_names} # 체크박스의 선택/해제 상태와 연동되는 set변수
-                self.colors = plt.cm.get_cmap('gist_rainbow', len(self.segmented_class_names))
-                self.roi_colors = {name: [int(c*255) for c in self.colors(i)[:3]] for i, name in enumerate(self.segmented_class_names)}
+    def _start_full_task(self):
+        # 시리즈가 열려있고, full 결과가 없고, 다른 추론이 없을때만 시작 (추론중이면 끝난 뒤 _poll_inference에서 다시 호출)
+        if not self.full_task_var.get() or self.d2_slices is None or self.full_labels is not None:
+            return
+        if self.inference_worker is not None and self.inference_worker.is_alive():
+            return
+        self.inference_organs = ['full task']
+        series_uid = self.d2_slices[0].SeriesInstanceUID
+        self._start_inference_worker('full', self._full_task_job, self.ct_volume, self.d2_slices, self.slope, self.intercept,
+                                     series_uid)
+
+    def _full_task_job(self, worker, ct_volume, d2_slices, slope, intercept, series_uid):
+        # worker thread에서 실행됨 -> 전체 task 결과를 LabelVolume 하나로 만들어서 반환
+        model_version = get_model_version()
+        shape = ct_volume.shape
+        labels = LabelVolume(shape, self.organ_names)
+
+        # 전체 장기가 캐시에 있으면 모델 실행없이 캐시에서 구성
+        if not self.inference_cache.missing(series_uid, self.inference_task, model_version, self.organ_names):
+            worker.report("loading cache")
+            for name in self.organ_names:
+                if worker.cancelled:
+                    return None
+                masks, _ = self.inference_cache.load(series_uid, self.inference_task, model_version, [name], shape)
+                if name in masks:
+                    labels.paint(name, masks[name])
+            return labels.finalize()
+
+        worker.report(f"TotalSegmentator full '{self.inference_task}' task")
+        labels = self.segmentation_to_labels(ct_volume, d2_slices, slope, intercept, None) # roi_subset 없이 전체 task
+        if labels is None or worker.cancelled:
+            return None
+
+        # 장기 하나씩 꺼내서 캐시에 저장 (전체 마스크를 동시에 들고있지 않음)
+        present_names = labels.present_names()
+        for i, name in enumerate(present_names):
+            if worker.cancelled:
+                return None
+            worker.report(f"writing cache {i + 1}/{len(present_names)}")
+            self.inference_cache.store(series_uid, self.inference_task, model_version, {name: labels.get_mask(name)}, [name], shape)
+        # 결과가 없던 장기도 캐시에 빈 결과로 기록
+        empty_names = [name for name in self.organ_names if name not in present_names]
+        self.inference_cache.store(series_uid, self.inference_task, model_version, {}, empty_names, shape)
+        return labels
+
+    def _materialize_from_full_labels(self, organs):
+        # full task 결과에서 장기별 마스크만 잘라서 꺼냄 (모델 실행 없음)
+        organs = [name for name in organs if self.isSemented.get(name) == False]
+        new_mask = {}
+        for name in organs:
+            mask = self.full_labels.get_mask(name)
+            if mask is not None:
+                new_mask[name] = mask
+        for name in organs:
+            if name in self.todosegment:
+                self.todosegment.remove(name)
+            if name not in new_mask:
+                # 전체 추론에서 안나온 장기는 다시 추론해도 안나오므로 분할완료로 처리
+                self.isSemented[name] = True
+        self._populate_segmen_rois()
+        self._apply_segmentation_result(new_mask, list(new_mask))
+
+    def cancel_segmentation(self):
+        if self.inference_worker is None or not self.inference_worker.is_alive():
+            return
+        self.inference_worker.cancel()
+        self.inference_status = "cancelling, 결과는 버려집니다"
+        self.cancel_button.config(state='disabled')
+        self._update_status_label()
+
+    def _poll_inference(self):
+        worker = self.inference_worker
+        finished = False
+        for kind, payload in worker.poll():
+            if kind == 'progress':
+                self.inference_status = payload
+            elif kind == 'done':
+                finished = True
+                # 추론 도중 다른 DICOM을 열었으면 결과 버림
+                if self.inference_slices is not self.d2_slices:
+                    pass
+                elif self.inference_kind == 'full':
+                    if payload is not None:
+                        self.full_labels = payload
+                        print(f"full task 완료: {len(payload.present_names())}개 장기")
+                        # 기다리던 장기들은 바로 꺼냄
+                        if self.todosegment:
+                            self._materialize_from_full_labels(list(self.todosegment))
+                    else:
+                        self.full_task_var.set(False) # 실패했으면 자동으로 다시 시작하지 않게 모드 해제
+                else:
+                    if not payload:
+                        self._restore_todo_organs()
+                    self._apply_segmentation_result(payload, self.inference_organs)
+                self.inference_status = ""
+            elif kind == 'error':
+                finished = True
+                print(f"분할 중 오류 발생: {payload}")
+                if self.inference_slices is self.d2_slices and self.inference_kind == 'subset':
+                    self._restore_todo_organs()
+                if self.inference_kind == 'full':
+                    self.full_task_var.set(False)
+                self.inference_status = f"error: {payload}"
+            elif kind == 'cancelled':
+                finished = True
+                print("추론이 취소되었습니다")
+                if self.inference_kind == 'full':
+                    self.full_task_var.set(False)
+                self.inference_status = ""
+
+        if finished:
+            self.inference_organs = []
+            self.inference_button_long.config(state='normal')
+            self.cancel_button.config(state='disabled')
+            # 추론중에 full task 모드를 켰거나 다른 시리즈를 열었으면 이어서 전체 추론 시작
+            self._start_full_task()
+        else:
+            self.root.after(200, self._poll_inference)
+        self._update_status_label()
+
+    def _restore_todo_organs(self):
+        # 추론이 실패하면 진행중이던 장기들을 다시 todosegment로 돌려놓음
+        for name in self.inference_organs:
+            if name not in self.todosegment:
+                self.todosegment.append(name)
+        self._populate_segmen_rois()
+
+    def _apply_segmentation_result(self, new_mask, requested_organs):
+        # 아예 분할 안됬을때
+        if not new_mask:
+            print("분할된것이 없습니다")
+            return
+        # 전부 분할했을떄
+        elif len(new_mask) == len(requested_organs):
+            for name in requested_organs:
+                self.isSemented[name] = True
+            print("전부 분할 완료")
+        # 일정부분만 분할했을떄
+        else:
+            for name in requested_organs:
+                if name not in new_mask:
+                    print(f"{name}은 분할되지 않았습니다") 
+                else:
+                    print(f"is segmented에 추가 {name}")
+                    self.isSemented[name] = True
+
+        if self.clean_inference_var.get():
+            new_mask = clean_masks(new_mask, self._voxel_mm3(), min_blob_mm3=MIN_BLOB_MM3)
+
+        # 통째로 바뀌는 roi는 이전 수정기록으로 되돌릴 수 없으므로 기록을 버림
+        for name in new_mask:
+            if name in self.masks_dict:
+                self.edit_journal.discard(name)
+                self.key_slices.pop(name, None)
+        self.masks_dict.update(new_mask) # 기존 마스크딕셔너리에 새로운 마스크들 추가
+        self.segmented_class_names.extend([name for name in new_mask if name not in self.segmented_class_names]) # class name 최신화
 
-            for widget in self.visible_scroll_frame.scrollable_frame.winfo_children():
-                # 이전에 랜더링된 목록 지우기
-                widget.destroy()
-            for name in self.segmented_class_names:
-                # 보여줄 목록 가져와서 기존 true/false랑 연결지어서 pack해서 보여주기
-                cb = ttk.Checkbutton(self.visible_scroll_frame.scrollable_frame, text=name, variable=self.check_vars[name], command=self._on_check_changed)
-                cb.pack(anchor='w', padx=5)
+        self._populate_editing_rois_list(self.segmented_class_names)
+        # 기존 체크 상태는 유지하고 새로 생긴 roi만 추가
+        self.check_vars = {name: self.check_vars.get(name, tk.BooleanVar(value=False)) for name in self.segmented_class_names} # 체크박스의 선택/해제 상태와 연동되는 set변수
+        self.colors = plt.cm.get_cmap('gist_rainbow', len(self.segmented_class_names))
+        self.roi_colors = {name: [int(c*255) for c in self.colors(i)[:3]] for i, name in enumerate(self.segmented_class_names)}
+        self._populate_visible_rois_list(self.segmented_class_names)
+        if self.current_slice_idx is not None:
+            self._update_plot()
 
-        finally:
-            # 3. 로딩 창 제거 및 메인 창 활성화
-            # UI 업데이트는 모든 로직이 끝난 후 여기서 수행
-            self._populate_segmen_rois()
-            loading_window.grab_release()
-            loading_window.destroy()
 
+    @staticmethod
+    def _typing_in_entry(event):
+        # 검색창(Entry / Combobox)에 글자를 입력하는 중이면 단축키로 처리하지 않음 (예: "kidney"의 d, i)
+        return isinstance(getattr(event, 'widget', None), tk.Entry)
 
     def _on_d_press(self, event):
+        if self._typing_in_entry(event):
+            return
         self.d_key_pressed = True
 
     def _on_d_release(self, event):
         self.d_key_pressed = False
 
     def _on_key_press(self, event):
+        if self._typing_in_entry(event):
+            return
         key = event.keysym
         if key == 'Up':
             self.current_slice_idx = min(self.ct_volume.shape[2] - 1, self.current_slice_idx + 1)
@@ -501,6 +743,16 @@ class MaskEditor:
             self.brush_size += 1
         elif key == 'minus':
             self.brush_size = max(1, self.brush_size - 1)
+        elif key.lower() == 'b':
+            self.brush_shape = BRUSH_SHAPES[(BRUSH_SHAPES.index(self.brush_shape) + 1) % len(BRUSH_SHAPES)]
+        elif key == 'bracketright':
+            self.slab_depth += 1
+        elif key == 'bracketleft':
+            self.slab_depth = max(0, self.slab_depth - 1)
+        elif key.lower() == 'c':
+            self._copy_slice_to_slab()
+        elif key.lower() == 'i':
+            self._interpolate_key_slices()
         elif key.lower() == '0':
             self.zoom_level = 1.0
             self.canvas_img_x = 0
@@ -508,7 +760,8 @@ class MaskEditor:
         elif key == 'Delete':
             roi_name = self.editing_roi_name.get()
             print(f"Clearing mask for '{roi_name}' on slice {self.current_slice_idx}")
-            self.masks_dict[roi_name][:, :, self.current_slice_idx] = False
+            self._mark_key_slices(self.edit_journal.clear_slice(roi_name, self.current_slice_idx))
+            self.render_cache.invalidate(self.current_slice_idx)
             self.temp_line_mask.fill(False)
         elif key.lower() == '1':
             print("편집된 마스크 저장을 시도합니다. 창을 닫아주세요.")
@@ -521,6 +774,31 @@ class MaskEditor:
             return
         self._update_plot()
         
+    def _on_undo(self, event=None):
+        if self.edit_journal is not None:
+            changed = self.edit_journal.undo()
+            self._unmark_key_slices(changed) # 되돌린 수정은 더 이상 key 슬라이스가 아님
+            self._show_history_change(changed, "Undo")
+        return "break" # <KeyPress> 핸들러로 넘어가지 않게
+
+    def _on_redo(self, event=None):
+        if self.edit_journal is not None:
+            self._show_history_change(self.edit_journal.redo(), "Redo")
+        return "break"
+
+    def _show_history_change(self, changed, action):
+        if not changed:
+            print(f"{action}할 수정 기록이 없습니다.")
+            return
+        # 바뀐 슬라이스 캐시만 버리고, 현재 슬라이스가 아니면 바뀐 슬라이스로 이동
+        for _, z in changed:
+            self.render_cache.invalidate(z)
+        changed_slices = sorted({z for _, z in changed})
+        if self.current_slice_idx not in changed_slices:
+            self.current_slice_idx = changed_slices[0]
+        print(f"{action}: {', '.join(f'{name}@{z}' for name, z in changed)}")
+        self._update_plot()
+
     def _on_scroll(self, event):
         if event.state & 0x4 == 0: # ctrl키 안눌렸을 경우
             # 마우스 휠 동작 감지 -> 마우스 휠로도 슬라이스 넘기게끔
@@ -553,105 +831,305 @@ class MaskEditor:
         self.pan_start_x = event.x
         self.pan_start_y = event.y
         self._update_plot()
+
+    def _set_window(self, center, width):
+        # lookup table만 다시 만들고 다시 그림 (볼륨 전체를 다시 변환하지 않음)
+        self.window_lut.set_window(center, width)
+        self._update_plot()
+
+    def _on_window_preset(self, event=None):
+        if self.ct_volume is None:
+            return
+        name = self.window_combobox.get()
+        if name == "default":
+            self._set_window(self.center_val, self.width_val)
+        else:
+            self._set_window(*WINDOW_PRESETS[name])
+
+    def _on_window_drag_start(self, event):
+        self.window_drag_x = event.x
+        self.window_drag_y = event.y
+
+    def _on_window_drag(self, event):
+        # 좌우 드래그 -> width, 상하 드래그 -> center
+        if self.ct_volume is None:
+            return
+        dx = event.x - self.window_drag_x
+        dy = event.y - self.window_drag_y
+        self.window_drag_x = event.x
+        self.window_drag_y = event.y
+        center, width = self.window_lut.key
+        self._set_window(center + dy * 2, width + dx * 4)
         
     def _on_press(self, event):
         # 왼쪽 마우스버튼 눌렸을떄
         if event.num == 1:
             self.temp_line_mask.fill(False)
+            # 누르고 뗄 때까지의 수정을 하나의 undo 단위로 묶음
+            self.edit_journal.begin()
             # d키 눌리면 지우기모드, 아니면 그리기모드
             if self.d_key_pressed:
                 self.erasing = True
             else:
                 self.drawing = True
-            self._paint(event)
+                # stroke는 캐시된 base layer의 복사본 위에 칠함
+                self.stroke_frame = self._base_layer().copy()
+            x, y = self._canvas_to_image_coords(event.x, event.y)
+            self.stroke_points.start(y, x)
+            self._paint()
 
     def _on_release(self, event):
         # 마우스왼쪽버튼 뗄때,drawing모드일때
+        was_drawing = self.drawing
+        # 아직 칠하지 않은 점들을 먼저 반영
+        flushed = self.paint_job is not None
+        if flushed:
+            self._cancel_paint()
+            self._paint(redraw=False)
+        self.stroke_points.reset()
         if self.drawing:
-            current_mask_slice = self.masks_dict[self.editing_roi_name.get()][:, :, self.current_slice_idx] # 현재 슬라이스의 roi마스크 가져오기
-            boundary = np.logical_or(current_mask_slice, self.temp_line_mask) # or연산 이용해서 두개 마스크 합쳐줌
-            filled_mask = binary_fill_holes(boundary) # fill_holes함수로 구멍 채우기
-            self.masks_dict[self.editing_roi_name.get()][:, :, self.current_slice_idx] = filled_mask # 새로만들어진 마스크를 mask_dict에 적용
-            self._update_plot() # 화면 udpate
+            current_mask_slice = self.masks_dict.get_slice(self.editing_roi_name.get(), self.current_slice_idx) # 현재 슬라이스의 roi마스크 가져오기
+            filled_mask = close_stroke(current_mask_slice, self.temp_line_mask) # 선을 합치고 선으로 닫힌 영역만 채우기 (stroke 주변에서만)
+            if self.slab_depth:
+                # 선과 선으로 닫은 영역을 slab 전체에 칠함
+                added = (filled_mask & ~current_mask_slice) | self.temp_line_mask
+                box = _bbox(added)
+                if box is not None:
+                    (r0, r1), (c0, c1) = box
+                    self._paint_slab(slice(r0, r1), slice(c0, c1), added[r0:r1, c0:c1], True)
+            else:
+                self.edit_journal.set_slice(self.editing_roi_name.get(), self.current_slice_idx, filled_mask) # 새로만들어진 마스크를 mask_dict에 적용
+            self.render_cache.invalidate(self.current_slice_idx) # 마스크가 바뀌었으니 이 슬라이스 캐시는 버림
+        if self.edit_journal is not None:
+            self._mark_key_slices(self.edit_journal.commit()) # 이번 stroke를 undo 기록에 추가
         
         # 그리기, 지우기 상태 모두 초기화
         self.drawing = False
         self.erasing = False
+        self.stroke_frame = None
         self.temp_line_mask.fill(False) # 임시 저장한 선 지워주기
+        if was_drawing or flushed:
+            self._update_plot() # 화면 udpate
 
     def _on_motion(self, event):
-        # 그리기 또는 지우기 상태일 때 _paint 호출
+        # 점만 모아두고 칠하는 건 이벤트가 다 처리된 뒤(after_idle)에 한번에
         if self.drawing or self.erasing:
-            self._paint(event)
-
-    def _paint(self, event):
-        x, y = self._canvas_to_image_coords(event.x, event.y) # 현재 마우스위치의 x,y좌표 가져오기(ct좌표계에서의)
-        h, w = self.ct_volume.shape[:2]
-        if not (0 <= x < w and 0 <= y < h): return # 영역 밖이면 return
+            x, y = self._canvas_to_image_coords(event.x, event.y)
+            self.stroke_points.add(y, x)
+            if self.paint_job is None:
+                self.paint_job = self.root.after_idle(self._paint)
+
+    def _cancel_paint(self):
+        if self.paint_job is not None:
+            self.root.after_cancel(self.paint_job)
+            self.paint_job = None
+
+    def _paint(self, redraw=True):
+        # 모아둔 점들을 이은 선을 한번에 칠함
+        self.paint_job = None
+        points = self.stroke_points.take()
+        if not points or not (self.drawing or self.erasing):
+            return
+        painted = rasterize_stroke(points, self.brush_size, self.ct_volume.shape[:2], self.brush_shape)
+        if painted is None: # 영역 밖이면 return
+            return
+        paint_area_y, paint_area_x, brush_slice = painted
 
-        #브러시모양을 사각형으로 
-        shape = (self.brush_size * 2 + 1, self.brush_size * 2 + 1)
-        brush = np.ones(shape, dtype=bool)
-        
-        # 브러시 가장자리 처리
-        paint_area_y = slice(max(0, y - self.brush_size), min(h, y + self.brush_size + 1))
-        paint_area_x = slice(max(0, x - self.brush_size), min(w, x + self.brush_size + 1))
-        
-        brush_y_start = self.brush_size - y if y < self.brush_size else 0
-        brush_y_end = brush.shape[0] - (y + self.brush_size + 1 - h) if y + self.brush_size + 1 > h else brush.shape[0]
-        brush_x_start = self.brush_size - x if x < self.brush_size else 0
-        brush_x_end = brush.shape[1] - (x + self.brush_size + 1 - w) if x + self.brush_size + 1 > w else brush.shape[1]
-        
-        brush_slice = brush[brush_y_start:brush_y_end, brush_x_start:brush_x_end]
-        
         current_roi = self.editing_roi_name.get() # 현재 그리거나 지울 roi이름
         if self.drawing:
             self.temp_line_mask[paint_area_y, paint_area_x] |= brush_slice # temp에 brush위치를 true로
+            # stroke layer는 브러시가 칠해진 영역만 갱신
+            self.stroke_frame[paint_area_y, paint_area_x][brush_slice] = self.roi_colors[current_roi]
         # 지우기 로직 추가
+        elif self.erasing and self.slab_depth:
+            self._paint_slab(paint_area_y, paint_area_x, brush_slice, False)
+            self.render_cache.refresh_region(self.current_slice_idx, paint_area_y, paint_area_x, self._compose_region)
         elif self.erasing:
-            mask_slice = self.masks_dict[current_roi][:, :, self.current_slice_idx]
+            mask_slice = self.masks_dict.get_slice(current_roi, self.current_slice_idx)
             mask_slice[paint_area_y, paint_area_x] &= ~brush_slice # temp에 brush위치를 false로
-            
+            self.edit_journal.set_slice(current_roi, self.current_slice_idx, mask_slice)
+            # 캐시된 base layer에서 지운 영역만 다시 합성
+            self.render_cache.refresh_region(self.current_slice_idx, paint_area_y, paint_area_x, self._compose_region)
+
+        if redraw:
+            self._update_plot()
+
+    def _slab_range(self):
+        # 현재 슬라이스 위아래 slab_depth개 슬라이스 (볼륨 범위 안으로 자름)
+        z = self.current_slice_idx
+        return max(0, z - self.slab_depth), min(self.ct_volume.shape[2], z + self.slab_depth + 1)
+
+    def _paint_slab(self, rows, cols, footprint, value):
+        # (rows, cols) 영역의 2차원 footprint를 slab 전체에 한번에 칠하거나(value=True) 지움
+        # round 브러시는 현재 슬라이스에서 멀어질수록 작아짐 (sphere), square는 그대로 (cylinder)
+        z0, z1 = self._slab_range()
+        footprint3d = slab_footprint(footprint, np.arange(z0, z1) - self.current_slice_idx, self.slab_depth,
+                                     self.brush_size, taper=self.brush_shape == "round")
+        self.edit_journal.paint(self.editing_roi_name.get(), (rows.start, cols.start, z0), footprint3d, value)
+        for z in range(z0, z1):
+            if z != self.current_slice_idx:
+                self.render_cache.invalidate(z)
+
+    def _copy_slice_to_slab(self):
+        # 현재 슬라이스의 마스크를 slab 안의 다른 슬라이스에 그대로 복사
+        roi_name = self.editing_roi_name.get()
+        if self.edit_journal is None or roi_name not in self.masks_dict or not self.slab_depth:
+            return
+        z0, z1 = self._slab_range()
+        self._mark_key_slices(self.edit_journal.fill_slices(roi_name, z0, z1, self.masks_dict.get_slice(roi_name, self.current_slice_idx)))
+        for z in range(z0, z1):
+            self.render_cache.invalidate(z)
+        print(f"Copied '{roi_name}' slice {self.current_slice_idx} to slices {z0}-{z1 - 1}")
+
+    def _mark_key_slices(self, changed):
+        # 사용자가 직접 수정한 슬라이스를 보간의 기준(key) 슬라이스로 기억 (같은 슬라이스를 여러번 수정하면 횟수를 셈)
+        for name, z in changed:
+            counts = self.key_slices.setdefault(name, {})
+            counts[z] = counts.get(z, 0) + 1
+
+    def _unmark_key_slices(self, changed):
+        # undo로 되돌린 수정 하나만큼 key 슬라이스 횟수를 줄이고, 남은 수정이 없으면 key에서 뺌
+        for name, z in changed:
+            counts = self.key_slices.get(name, {})
+            if z in counts:
+                counts[z] -= 1
+                if counts[z] <= 0:
+                    del counts[z]
+
+    def _interpolate_key_slices(self):
+        # editing roi의 key 슬라이스 사이를 signed distance 보간으로 채움 (하나의 undo 단위)
+        roi_name = self.editing_roi_name.get()
+        if self.edit_journal is None:
+            return
+        start = time.time()
+        blocks = interpolate_key_slices(self.masks_dict, roi_name, self.key_slices.get(roi_name, ()))
+        if not blocks:
+            print(f"'{roi_name}'에 보간할 구간이 없습니다. (key 슬라이스 2장 이상, "
+                  f"사이가 비어있거나 {MAX_INTERPOLATION_GAP}장 이하인 구간만 보간)")
+            return
+        self.edit_journal.begin()
+        for origin, block in blocks:
+            self.edit_journal.set_slices(roi_name, origin, block)
+        changed = self.edit_journal.commit()
+        # 이번 보간에 쓴 key 슬라이스는 버림 (다음 보간은 새로 수정한 슬라이스 기준)
+        self.key_slices.pop(roi_name, None)
+        for _, z in changed:
+            self.render_cache.invalidate(z)
+        print(f"Interpolated '{roi_name}': {len(changed)} slices changed ({time.time() - start:.2f}s)")
         self._update_plot()
 
-    def _update_plot(self):
-        ct_slice = self.ct_volume_display[:, :, self.current_slice_idx]  # 원본 ct가져오고
-        display_img_base = np.stack([ct_slice] * 3, axis=-1) # overlay를 위해서 3채널로 바꿔줌
+    def _voxel_mm3(self):
+        # voxel 하나의 부피 (mm^3)
+        return abs(np.linalg.det(editor_grid_affine(self.d2_slices)[:3, :3]))
 
-        for roi_name in self.active_rois:
-            # # 체크해놓은 것들중, 이름과 색상을 가져오고
-            mask = self.masks_dict[roi_name][:, :, self.current_slice_idx]
-            color = self.roi_colors[roi_name]
-            # 기존 ct에 오버레이
-            display_img_base[mask] = (display_img_base[mask] * 0.5 + np.array(color) * 0.5).astype(np.uint8)
+    def _clean_editing_roi(self, **options):
+        # editing roi를 bounding box 안에서 후처리 (하나의 undo 단위)
+        roi_name = self.editing_roi_name.get()
+        if self.edit_journal is None or roi_name not in self.masks_dict:
+            return
+        start = time.time()
+        cleaned = clean_roi(self.masks_dict, roi_name, self._voxel_mm3(), **options)
+        if cleaned is None:
+            return
+        changed = self.edit_journal.set_slices(roi_name, *cleaned)
+        for _, z in changed:
+            self.render_cache.invalidate(z)
+        print(f"Cleaned '{roi_name}' {options}: {len(changed)} slices changed ({time.time() - start:.2f}s)")
+        self._update_plot()
 
-        # drawing중이면 사용자가 그린 색을 현재 editing중인 class 색상으로
-        if self.drawing:
-            display_img_base[self.temp_line_mask]= self.roi_colors[self.editing_roi_name.get()]
-            #display_img_base[self.temp_line_mask] = [255, 255, 0]
+    def _compose_region(self, rows=None, cols=None):
+        # 현재 슬라이스의 (rows, cols) 영역을 CT + 보이는 ROI로 합성 (None이면 전체)
+        h, w = self.ct_volume.shape[:2]
+        rows = slice(0, h) if rows is None else rows
+        cols = slice(0, w) if cols is None else cols
+        visible = [name for name in self.segmented_class_names if name in self.active_rois]
+        return composite_region(self.window_lut.apply(self.ct_volume[:, :, self.current_slice_idx]), self.masks_dict, visible,
+                                self.roi_colors, self.current_slice_idx, rows, cols)
+
+    def _base_layer(self):
+        # 보이는 roi나 색상이 바뀌면 캐시 전체를 버리고, 아니면 슬라이스별 캐시를 재사용
+        visible = [name for name in self.segmented_class_names if name in self.active_rois]
+        self.render_cache.set_view_key((self.window_lut.key, tuple((name, tuple(self.roi_colors[name])) for name in visible)))
+        return self.render_cache.base_layer(self.current_slice_idx, self._compose_region)
+
+    def _visible_image_region(self):
+        # 캔버스에 보이는 원본 이미지 픽셀 범위 ((y0, y1), (x0, x1))
+        h, w = self.ct_volume.shape[:2]
+        canvas_w, canvas_h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if canvas_w <= 1 or canvas_h <= 1:
+            # 캔버스가 아직 화면에 배치되기 전이면 전체 이미지
+            return (0, h), (0, w)
+        x0 = max(0, int(np.floor(-self.canvas_img_x / self.zoom_level)))
+        y0 = max(0, int(np.floor(-self.canvas_img_y / self.zoom_level)))
+        x1 = min(w, int(np.ceil((canvas_w - self.canvas_img_x) / self.zoom_level)))
+        y1 = min(h, int(np.ceil((canvas_h - self.canvas_img_y) / self.zoom_level)))
+        return (y0, y1), (x0, x1)
+
+    def _on_canvas_resize(self, event):
+        # 창 크기가 바뀌면 보이는 영역이 달라지므로 다시 그림
+        if self.ct_volume is not None and self.current_slice_idx is not None:
+            self._update_plot()
 
-        # 최종 오버레이된 이미지를 넘파이배열로 변환하고
-        self.pil_img = Image.fromarray(display_img_base)
+    def _update_plot(self):
+        # drawing중이면 base layer 위에 stroke를 칠해둔 이미지를, 아니면 캐시된 base layer를 그대로 사용
+        if self.drawing and self.stroke_frame is not None:
+            display_img_base = self.stroke_frame
+        else:
+            display_img_base = self._base_layer()
+
+        # 캔버스에 실제로 보이는 영역만 잘라서 확대 -> 프레임당 비용이 줌 배율이 아니라 캔버스 크기에 비례
+        (y0, y1), (x0, x1) = self._visible_image_region()
+        if y0 >= y1 or x0 >= x1:
+            # 이미지가 화면 밖으로 완전히 나간 경우
+            self.canvas.delete("all")
+            self.photo_img, self.canvas_image_id = None, None
+            self._update_status_label()
+            return
+
+        # 최종 오버레이된 이미지를 넘파이배열로 변환하고 (보이는 영역만)
+        self.pil_img = Image.fromarray(display_img_base[y0:y1, x0:x1])
         w, h = self.pil_img.size
         # 현재 zoom-level에 맞게끔 높이, 너비 구하고
-        new_w, new_h = int(w * self.zoom_level), int(h * self.zoom_level)
+        new_w, new_h = max(1, int(round(w * self.zoom_level))), max(1, int(round(h * self.zoom_level)))
         # 해당 사이즈로 resize
         resized_img = self.pil_img.resize((new_w, new_h), Image.Resampling.NEAREST)
-        # tkinter캔버스에 표시할수있게끔 변환
-        self.photo_img = ImageTk.PhotoImage(image=resized_img)
 
-        #기존 내용지우고
-        self.canvas.delete("all")
-        #새이미지를 랜더링
-        self.canvas.create_image(self.canvas_img_x, self.canvas_img_y, image=self.photo_img, anchor='nw')
+        # 크기가 같으면 기존 PhotoImage와 캔버스 item을 재사용 (매 프레임 새로 만들지 않음)
+        if self.photo_img is not None and (self.photo_img.width(), self.photo_img.height()) == (new_w, new_h):
+            self.photo_img.paste(resized_img)
+        else:
+            # tkinter캔버스에 표시할수있게끔 변환
+            self.photo_img = ImageTk.PhotoImage(image=resized_img)
+            #기존 내용지우고
+            self.canvas.delete("all")
+            #새이미지를 랜더링
+            self.canvas_image_id = self.canvas.create_image(0, 0, image=self.photo_img, anchor='nw')
+        # 잘라낸 영역의 왼쪽 위가 원래 위치에 오도록 배치
+        self.canvas.coords(self.canvas_image_id, self.canvas_img_x + x0 * self.zoom_level, self.canvas_img_y + y0 * self.zoom_level)
         
         # 상태바 텍스트 변경
+        self._update_status_label()
+
+    def _update_status_label(self):
+        inference_text = ""
+        if self.inference_worker is not None and self.inference_worker.is_alive():
+            elapsed = time.time() - self.inference_start_time
+            inference_text = f"\nInference {self.inference_organs}: {self.inference_status} ({elapsed:.0f}s)"
+        elif self.inference_status:
+            inference_text = f"\nInference: {self.inference_status}"
+
+        if self.current_slice_idx is None:
+            self.status_label.config(text=f"Status..{inference_text}")
+            return
         status_text = (f"Slice: {self.current_slice_idx}/{self.ct_volume.shape[2]-1} | "
                        f"Zoom: {self.zoom_level:.2f}x | "
                        f"Editing: {self.editing_roi_name.get()} | "
-                       f"Brush: {self.brush_size}\n"
-                       f"Controls: L-Draw, d+L-Erase, R-Pan, Wheel-Slice, Ctrl+Wheel-Zoom\n"
-                       f"Keys: +/- (Brush), Del (Clear Slice), 0 (Reset Zoom), 1 (Save), 2 (Quit)")
+                       f"Brush: {self.brush_size} ({self.brush_shape}) | "
+                       f"Slab: ±{self.slab_depth} | "
+                       f"W/L: {self.window_lut.width:.0f}/{self.window_lut.center:.0f}\n"
+                       f"Controls: L-Draw, d+L-Erase, R-Pan, M-Drag W/L, Wheel-Slice, Ctrl+Wheel-Zoom\n"
+                       f"Keys: +/- (Brush), b (Brush Shape), [/] (Slab), c (Copy Slice to Slab), i (Interpolate), Del (Clear Slice), Ctrl+Z/Y (Undo/Redo), 0 (Reset Zoom), 1 (Save), 2 (Quit)"
+                       f"{inference_text}")
         self.status_label.config(text=status_text)
     
     def get_modified_masks(self):
@@ -685,69 +1163,47 @@ class MaskEditor:
     
     def dicom_to_np(self, dicom_series_path):
         print("원본 DICOM 시리즈를 로딩합니다...")
-        # 해당 폴더안에 있는 .dcm파일들 경로를 리스트로 반환
-        dicom_files = glob.glob(os.path.join(dicom_series_path, '*.dcm'))
-        if not dicom_files:
-            print(f"오류: '{dicom_series_path}' 폴더에 DICOM 파일이 없습니다.")
-            return
-        
-        #dicom파일 하나씩 읽고
-        self.d2_slices = [pydicom.dcmread(f) for f in dicom_files]
-        # z축 기준 정렬
-        self.d2_slices.sort(key=lambda x: float(x.ImagePositionPatient[2]))
+
+        def report_progress(done, total):
+            # 디코딩 진행상황을 상태바에 표시 (메인 thread에서 호출됨)
+            if done % 10 == 0 or done == total:
+                self.status_label.config(text=f"Decoding DICOM slices... {done}/{total}")
+                self.root.update_idletasks()
+
+        # 헤더만 읽어서 z축 기준 정렬 + geometry 검증 후
+        # 전에 연 시리즈면 캐시된 볼륨을 memmap으로 열고, 아니면 (H, W, Z) 배열에 병렬로 디코딩해서 캐시에 저장
+        self.ct_volume, self.d2_slices, meta = load_series_cached(dicom_series_path, self.volume_cache,
+                                                                  progress_callback=report_progress)
 
         # hu값변환시 사용할 변수들
-        self.center_val = self.d2_slices[0].WindowCenter
-        self.width_val = self.d2_slices[0].WindowWidth
-        self.slope = float(self.d2_slices[0].RescaleSlope)
-        self.intercept = float(self.d2_slices[0].RescaleIntercept)
-        
-        # 원본 3D 볼륨 생성 -> mask editor클래스에 넘겨주는 용도
-        self.ct_volume = np.stack([s.pixel_array for s in self.d2_slices], axis=-1)
+        self.center_val = first_value(meta['window_center'], 40)
+        self.width_val = first_value(meta['window_width'], 400)
+        self.slope = meta['slope']
+        self.intercept = meta['intercept']
 
-        # hu값으로 변환하고 값 정규화
-        hu_image = self.ct_volume * self.slope + self.intercept
-        self.ct_volume_display = self._normalize_to_uint8(hu_image, self.center_val ,self.width_val)
+        # 화면용 uint8 볼륨을 따로 만들지 않고, 슬라이스를 그릴 때 lookup table로 window 적용
+        self.window_lut = WindowLUT(self.ct_volume.dtype, self.slope, self.intercept)
+        self.window_lut.set_window(self.center_val, self.width_val)
 
 
-    def segmentation(self, filetype, input_path, roi_organs):
+    def segmentation_to_labels(self, ct_volume, d2_slices, slope, intercept, roi_organs):
         """
-        DICOM 파일을 입력받아 TotalSegmentator를 이용해 RTSTRUCT를 생성
+        TotalSegmentator를 메모리상의 NIfTI로 실행해서 multilabel 결과를 에디터 grid로 반환
+        (RTSTRUCT를 만들고 다시 읽어서 래스터화하는 과정 없음, RTSTRUCT는 저장할때만 만듦)
 
         Args:
-            filetype (str): 입력 파일 타입 ('dicom' 또는 'nifti'). 현재는 'dicom'만 지원.
-            input_path (str): DICOM 파일들이 있는 폴더 경로.
+            ct_volume (np.ndarray): 에디터 볼륨 (H, W, Z) 원본 픽셀값.
+            d2_slices (list): 정렬된 DICOM 헤더 리스트 (geometry 계산용).
+            slope, intercept (float): HU 변환값.
+            roi_organs (list): 분할할 장기 이름들. None이면 전체 task.
         Returns:
-            str: 생성된 RTSTRUCT 파일의 경로. 오류 발생 시 None 반환.
+            LabelVolume: 에디터 grid (H, W, Z)의 분할 결과. 오류 발생 시 None 반환.
         """
         try:
-            if filetype == 'dicom':
-                # 출력 경로 설정 (입력 폴더 이름 기준)
-                folder_name = os.path.basename(os.path.normpath(input_path))
-                output_path = os.path.join('dcm_output', folder_name)
-                os.makedirs(output_path, exist_ok=True)
-                print(f"segmentation 결과 저장할 경로 : {output_path}")
-
-                # TotalSegmentator 실행
-                totalsegmentator(input_path, output_path, roi_subset=roi_organs, output_type=filetype)
-
-                # 생성된 RTSTRUCT 파일 경로 반환
-                rt_path = os.path.join(output_path,'segmentations.dcm')
-                #rt_path = output_path
-                if os.path.exists(rt_path):
-                    print(f"분할 완료! RTSTRUCT 파일: {rt_path}")
-                    return rt_path
-                else:
-                    print("오류: RTSTRUCT 파일이 생성되지 않았습니다.")
-                    return None
-
-            elif filetype == 'nifti':
-                print("nifti 파일 타입은 아직 구현되지 않았습니다.")
-                return None
-
-        except FileNotFoundError:
-            print("파일 경로를 다시 확인하세요.")
-            return None
+            input_img = volume_to_nifti(ct_volume, d2_slices, slope, intercept)
+            seg_img = totalsegmentator(input_img, None, ml=True, roi_subset=roi_organs, task=self.inference_task)
+            labels = labels_to_grid(np.asanyarray(seg_img.dataobj), seg_img.affine, input_img.affine, ct_volume.shape)
+            return LabelVolume.from_array(labels, class_map[self.inference_task])
         except Exception as e:
             print(f"분할 중 오류 발생: {e}")
-            return None 
+            return None
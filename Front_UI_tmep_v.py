@@ -6,12 +6,13 @@ import numpy as np
 from scipy.ndimage import binary_fill_holes
 import os
 from totalsegmentator.python_api import totalsegmentator
-import glob
 import pydicom
 from rt_utils.rtstruct import RTStruct
 from tkinterdnd2 import DND_FILES, TkinterDnD 
 import time
 from rt_utils import RTStructBuilder
+from volume_cache import VolumeCache, load_series_cached, series_key
+from windowing import first_value
 import torch
 import SimpleITK as sitk
 
@@ -58,6 +59,7 @@ class MaskEditor:
         self.ct_volume = None # dicom의 넘파이배열버전(x,y,z)
         self.dicom_folder = None # 원본 dicom폴더 경로
         self.d2_slices = None # dicom의 넘파이배열버전(x,y,z) -> dicom_to_np이 함수에서만 사용됨
+        self.volume_cache = VolumeCache() # 시리즈 UID별 디코딩된 볼륨 디스크 캐시 (memmap)
 
         self.todosegment = [] # 지금 추론할 장기 이름들
 
@@ -751,25 +753,22 @@ class MaskEditor:
     
     def dicom_to_np(self, dicom_series_path):
         print("원본 DICOM 시리즈를 로딩합니다...")
-        # 해당 폴더안에 있는 .dcm파일들 경로를 리스트로 반환
-        dicom_files = glob.glob(os.path.join(dicom_series_path, '*.dcm'))
-        if not dicom_files:
-            print(f"오류: '{dicom_series_path}' 폴더에 DICOM 파일이 없습니다.")
-            return
-        
-        #dicom파일 하나씩 읽고
-        self.d2_slices = [pydicom.dcmread(f) for f in dicom_files]
-        # z축 기준 정렬
-        self.d2_slices.sort(key=lambda x: float(x.ImagePositionPatient[2]))
+
+        def report_progress(done, total):
+            # 디코딩 진행상황을 상태바에 표시 (메인 thread에서 호출됨)
+            if done % 10 == 0 or done == total:
+                self.status_label.config(text=f"Decoding DICOM slices... {done}/{total}")
+                self.root.update_idletasks()
+
+        # 전에 연 시리즈면 캐시된 볼륨을 memmap으로 열고, 아니면 (H, W, Z) 배열에 병렬로 디코딩해서 캐시에 저장
+        self.ct_volume, self.d2_slices, meta = load_series_cached(dicom_series_path, self.volume_cache,
+                                                                  progress_callback=report_progress)
 
         # hu값변환시 사용할 변수들
-        self.center_val = self.d2_slices[0].WindowCenter
-        self.width_val = self.d2_slices[0].WindowWidth
-        self.slope = float(self.d2_slices[0].RescaleSlope)
-        self.intercept = float(self.d2_slices[0].RescaleIntercept)
-        
-        # 원본 3D 볼륨 생성 -> mask editor클래스에 넘겨주는 용도
-        self.ct_volume = np.stack([s.pixel_array for s in self.d2_slices], axis=-1)
+        self.center_val = meta['window_center'] if meta['window_center'] is not None else 40
+        self.width_val = meta['window_width'] if meta['window_width'] is not None else 400
+        self.slope = meta['slope']
+        self.intercept = meta['intercept']
 
         # hu값으로 변환하고 값 정규화
         hu_image = self.ct_volume * self.slope + self.intercept
@@ -784,6 +783,18 @@ class MaskEditor:
         print("SimpleITK를 사용하여 원본 DICOM 시리즈를 로딩합니다...")
         
         try:
+            # 0. 전에 연 시리즈면 SimpleITK로 다시 읽지 않고 캐시된 볼륨을 memmap으로 사용
+            series_uid, fingerprint = series_key(dicom_series_path)
+            cached = self.volume_cache.load(series_uid, 'sitk', fingerprint)
+            if cached is not None:
+                self.ct_volume, meta = cached
+                self.slope, self.intercept = meta['slope'], meta['intercept']
+                self.center_val, self.width_val = meta['window_center'], meta['window_width']
+                hu_image = self.ct_volume.astype(np.float64) * self.slope + self.intercept
+                self.ct_volume_display = self._normalize_to_uint8(hu_image, self.center_val, self.width_val)
+                print("DICOM 로딩 완료 (캐시 사용)")
+                return
+
             # 1. SimpleITK를 사용해 폴더 내의 DICOM 시리즈를 읽어 3D 이미지로 재구성
             reader = sitk.ImageSeriesReader()
             dicom_names = reader.GetGDCMSeriesFileNames(dicom_series_path)
@@ -805,8 +816,13 @@ class MaskEditor:
             
             self.slope = float(first_slice.get('RescaleSlope', 1.0))
             self.intercept = float(first_slice.get('RescaleIntercept', -1024.0)) # CT는 보통 -1024가 기본값
-            self.center_val = first_slice.get('WindowCenter', 40)
-            self.width_val = first_slice.get('WindowWidth', 400)
+            self.center_val = first_value(first_slice.get('WindowCenter'), 40)
+            self.width_val = first_value(first_slice.get('WindowWidth'), 400)
+
+            # 다음에 열 때를 위해 볼륨과 rescale/window 값을 캐시에 저장
+            meta = {'slope': self.slope, 'intercept': self.intercept,
+                    'window_center': self.center_val, 'window_width': self.width_val}
+            self.ct_volume = self.volume_cache.store(series_uid, 'sitk', fingerprint, self.ct_volume, meta)
 
             # 3. HU 변환 및 정규화
             hu_image = self.ct_volume.astype(np.float64) * self.slope + self.intercept
@@ -136,6 +136,14 @@ def evaluate_by_order(pred_folder, gt_folder, k_from_end=12, count=16, threshold
     }
     return results
 
+def evaluate_volumes(pred_path, gt_path, **kwargs):
+    """
+    PNG 슬라이스 짝맞춤 대신 3차원 볼륨(NIfTI, NRRD, RTSTRUCT, PNG 폴더) 단위로 label별 Dice/IoU/HD95/ASSD 계산
+    자세한 인자는 volume_metrics.evaluate_volumes 참고
+    """
+    from volume_metrics import evaluate_volumes as _evaluate_volumes # SimpleITK/scipy는 이 평가에서만 필요
+    return _evaluate_volumes(pred_path, gt_path, **kwargs)
+
 if __name__ == "__main__":
     pred_folder = r"./GT_TEST/Segmentation_liver_basic"   # 예측 폴더
     gt_folder   = r"./GT_TEST/Mask_Spleen"     # GT 폴더
@@ -36,8 +36,40 @@ def validate_series_uid(dicom_folder_path, rt_struct_path):
         print(f"UID 확인 중 오류 발생: {e}")
         return False
 
+def physical_to_index_transform(image):
+    """
+    물리 좌표 -> 연속 (x, y, z) 인덱스 변환 (A, origin)
+    index = (point - origin) @ A.T 로 한번에 여러 점을 변환 (TransformPhysicalPointToIndex를 점마다 부르지 않음)
+    """
+    direction = np.array(image.GetDirection(), dtype=float).reshape(3, 3)
+    spacing = np.array(image.GetSpacing(), dtype=float)
+    A = np.linalg.inv(direction @ np.diag(spacing))
+    return A, np.array(image.GetOrigin(), dtype=float)
+
+
+def rasterize_contours(contour_sequence, A, origin, mask_array, label=1):
+    """ROI 하나의 contour들을 mask_array (z, y, x)에 label 값으로 채움 (sub-pixel 좌표로 polygon fill)"""
+    depth = mask_array.shape[0]
+    for contour in contour_sequence:
+        contour_data = np.asarray(contour.ContourData, dtype=float).reshape(-1, 3)
+        if len(contour_data) < 3:
+            continue
+        # contour 전체를 행렬곱 한번으로 변환, 반올림하지 않고 그대로 polygon fill에 사용
+        index = (contour_data - origin) @ A.T
+        slice_z_index = int(np.rint(index[:, 2].mean()))
+        if not (0 <= slice_z_index < depth):
+            continue
+        rr, cc = fill_polygon(index[:, 1], index[:, 0], shape=mask_array.shape[1:])
+        mask_array[slice_z_index, rr, cc] = label
+
+
 def convert_rtstruct_to_nifti(dicom_folder, rtstruct_file, target_roi_name, output_nifti):
-    """RT-STRUCT를 NIfTI 마스크로 변환하는 최종 함수"""
+    """
+    RT-STRUCT를 NIfTI 마스크로 변환하는 최종 함수
+
+    target_roi_name에 ROI 이름 하나를 주면 0/1 마스크, 이름 리스트를 주면 순서대로 1, 2, ... label을 갖는
+    multilabel 마스크를 저장함 (None이면 RT-STRUCT의 모든 ROI). 반환값은 {ROI 이름: label}.
+    """
     
     # 1. UID 검증
     print("--- 1. Series UID 검증 시작 ---")
@@ -55,48 +87,34 @@ def convert_rtstruct_to_nifti(dicom_folder, rtstruct_file, target_roi_name, outp
     # 3. RT-STRUCT 파일 로드 및 ROI 정보 추출
     print("\n--- 3. RT-STRUCT 데이터 추출 ---")
     rt_ds = pydicom.dcmread(rtstruct_file)
-    
-    roi_number = next(
-        (roi.ROINumber for roi in rt_ds.StructureSetROISequence if roi.ROIName == target_roi_name), 
-        None
-    )
-    if roi_number is None:
-        print(f"오류: ROI '{target_roi_name}'을(를) 찾을 수 없습니다.")
-        return
-    print(f"ROI '{target_roi_name}' (번호: {roi_number}) 확인.")
-    
-    contour_sequence = next(
-        (contour.ContourSequence for contour in rt_ds.ROIContourSequence if contour.ReferencedROINumber == roi_number),
-        None
-    )
-    if contour_sequence is None:
-        print(f"오류: ROI 번호 {roi_number}에 대한 Contour를 찾을 수 없습니다.")
-        return
+    roi_numbers = {roi.ROIName: roi.ROINumber for roi in rt_ds.StructureSetROISequence}
+    contours = {contour.ReferencedROINumber: contour.get('ContourSequence') for contour in rt_ds.ROIContourSequence}
 
-    # 4. 마스크 생성 (래스터화)
-    print("\n--- 4. 마스크 생성 (래스터화) ---")
-    image_array = sitk.GetArrayFromImage(original_image)
-    mask_array = np.zeros_like(image_array, dtype=np.uint8)
+    if target_roi_name is None:
+        roi_names = list(roi_numbers)
+    elif isinstance(target_roi_name, str):
+        roi_names = [target_roi_name]
+    else:
+        roi_names = list(target_roi_name)
 
-    for contour in contour_sequence:
-        contour_data = np.array(contour.ContourData).reshape(-1, 3)
-        
-        # Contour가 속한 슬라이스의 Z 인덱스 찾기
-        # 첫 번째 점의 물리적 좌표를 이미지 인덱스로 변환하여 z 인덱스를 얻음
-        physical_point = contour_data[0]
-        slice_index_vec = original_image.TransformPhysicalPointToIndex(physical_point)
-        slice_z_index = slice_index_vec[2]
-
-        # 3D 물리적 좌표를 2D 픽셀 좌표로 변환
-        pixel_coords = []
-        for point in contour_data:
-            idx = original_image.TransformPhysicalPointToIndex(point)
-            pixel_coords.append([idx[1], idx[0]]) # (row, col) 순서로 저장
-
-        if pixel_coords:
-            rows, cols = zip(*pixel_coords)
-            rr, cc = fill_polygon(rows, cols, shape=mask_array.shape[1:])
-            mask_array[slice_z_index, rr, cc] = 1 # 해당 슬라이스에 마스크 채우기
+    labels = {}
+    for roi_name in roi_names:
+        roi_number = roi_numbers.get(roi_name)
+        if roi_number is None:
+            print(f"오류: ROI '{roi_name}'을(를) 찾을 수 없습니다.")
+            return
+        if contours.get(roi_number) is None:
+            print(f"오류: ROI 번호 {roi_number}에 대한 Contour를 찾을 수 없습니다.")
+            return
+        labels[roi_name] = len(labels) + 1
+        print(f"ROI '{roi_name}' (번호: {roi_number}) -> label {labels[roi_name]}")
+
+    # 4. 마스크 생성 (래스터화) - 모든 ROI를 한번에
+    print("\n--- 4. 마스크 생성 (래스터화) ---")
+    mask_array = np.zeros(original_image.GetSize()[::-1], dtype=np.uint8) # (z, y, x)
+    A, origin = physical_to_index_transform(original_image)
+    for roi_name, label in labels.items():
+        rasterize_contours(contours[roi_numbers[roi_name]], A, origin, mask_array, label)
 
     print("마스크 생성 완료.")
 
@@ -107,6 +125,7 @@ def convert_rtstruct_to_nifti(dicom_folder, rtstruct_file, target_roi_name, outp
     
     sitk.WriteImage(mask_image, output_nifti)
     print(f"\n🎉 변환 성공! 파일이 저장되었습니다:\n{output_nifti}")
+    return labels
 
 
 # --- ✍️ 사용자 설정 부분 ---
@@ -0,0 +1,135 @@
+import os
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from volume_metrics import evaluate_volumes
+
+METRICS = ("dice", "iou", "hd95", "assd")
+
+
+def read_manifest(path):
+    """
+    평가할 case 목록 읽기 (CSV 또는 JSON 리스트)
+
+    각 case: prediction, ground_truth (필수), label, name, reference_dicom, reverse_pred_png, reverse_gt_png.
+    label이 비어있으면 두 볼륨에 있는 모든 label을 평가. 상대경로는 manifest 파일 위치 기준.
+    """
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            cases = json.load(f)
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            cases = list(csv.DictReader(f))
+
+    base = os.path.dirname(os.path.abspath(path))
+    parsed = []
+    for i, case in enumerate(cases):
+        def resolve(key):
+            value = case.get(key)
+            return os.path.join(base, value) if value else None
+
+        label = case.get("label")
+        parsed.append({
+            "name": case.get("name") or f"case_{i:03d}",
+            "prediction": resolve("prediction"),
+            "ground_truth": resolve("ground_truth"),
+            "label": int(label) if label not in (None, "") else None,
+            "reference_dicom": resolve("reference_dicom"),
+            "reverse_pred_png": str(case.get("reverse_pred_png", "")).lower() in ("1", "true", "yes"),
+            "reverse_gt_png": str(case.get("reverse_gt_png", "")).lower() in ("1", "true", "yes"),
+        })
+    return parsed
+
+
+def evaluate_case(case):
+    """worker 프로세스에서 case 하나를 평가하고 label별 결과 행을 반환 (실패하면 error 행)"""
+    start = time.perf_counter()
+    try:
+        results = evaluate_volumes(case["prediction"], case["ground_truth"],
+                                   labels=[case["label"]] if case["label"] is not None else None,
+                                   reference_dicom=case["reference_dicom"],
+                                   reverse_pred_png=case["reverse_pred_png"], reverse_gt_png=case["reverse_gt_png"])
+    except Exception as e:
+        return [{"name": case["name"], "label": case["label"], "error": str(e),
+                 "seconds": round(time.perf_counter() - start, 3)}]
+    seconds = round(time.perf_counter() - start, 3)
+    if not results:
+        return [{"name": case["name"], "label": None, "error": "평가할 label이 없음 (두 볼륨 모두 비어있음)",
+                 "seconds": seconds}]
+    return [{"name": case["name"], "label": label, **metrics, "seconds": seconds} for label, metrics in results.items()]
+
+
+def aggregate(rows):
+    """label별, 전체의 지표 통계 (mean, std, median, min, max). nan(한쪽이 빈 경우)은 제외"""
+    groups = {"all": [row for row in rows if "error" not in row]}
+    for row in groups["all"]:
+        groups.setdefault(f"label_{row['label']}", []).append(row)
+
+    summary = {}
+    for group, group_rows in groups.items():
+        stats = {"cases": len(group_rows)}
+        for metric in METRICS:
+            values = np.array([row[metric] for row in group_rows], dtype=float)
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            stats[metric] = {"mean": float(values.mean()), "std": float(values.std()), "median": float(np.median(values)),
+                             "min": float(values.min()), "max": float(values.max())}
+        summary[group] = stats
+    return summary
+
+
+def run(manifest_path, output_prefix, workers=None):
+    cases = read_manifest(manifest_path)
+    print(f"평가할 case: {len(cases)}")
+    rows = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(evaluate_case, case): case["name"] for case in cases}
+        for done, future in enumerate(as_completed(futures), start=1):
+            case_rows = future.result()
+            rows.extend(case_rows)
+            status = case_rows[0].get("error") or ", ".join(f"label {r['label']} dice {r['dice']:.4f}" for r in case_rows)
+            print(f"[{done}/{len(cases)}] {futures[future]}: {status}")
+    rows.sort(key=lambda row: (row["name"], row["label"] if row["label"] is not None else -1))
+
+    report = {"manifest": os.path.abspath(manifest_path), "seconds": round(time.perf_counter() - start, 3),
+              "cases": rows, "summary": aggregate(rows)}
+    with open(f"{output_prefix}.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    columns = ["name", "label", *METRICS, "pred_voxels", "gt_voxels", "seconds", "error"]
+    with open(f"{output_prefix}.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: row.get(key, "") for key in columns})
+
+    print("=== 요약 ===")
+    for group, stats in report["summary"].items():
+        if "dice" in stats:
+            print(f"{group}: {stats['cases']} cases | Dice {stats['dice']['mean']:.4f} ± {stats['dice']['std']:.4f}"
+                  + (f" | HD95 {stats['hd95']['mean']:.2f}mm" if "hd95" in stats else ""))
+    failed = [row for row in rows if "error" in row]
+    if failed:
+        print(f"실패한 case: {len(failed)}개 ({', '.join(row['name'] for row in failed)})")
+    print(f"결과 저장: {output_prefix}.json, {output_prefix}.csv")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="여러 (예측, 정답) case를 병렬로 평가하고 보고서 저장")
+    parser.add_argument("manifest", help="case 목록 CSV/JSON (prediction, ground_truth, label, ...)")
+    parser.add_argument("--output", default="evaluation_report", help="결과 파일 경로 (.json, .csv가 붙음)")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+    args = parser.parse_args()
+    run(args.manifest, args.output, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
-import SimpleITK as sitk
 import numpy as np
 import matplotlib.pyplot as plt
 
+from slice_convert import volume_info, iter_slices
+
 # temp로 생성된 파일을 오버레이하는 부분
 # 원본 dicom을 nifti파일로 변환 후 오버레이함.
 # deepedit에도 nifti가 필요하기에 맨처음 dicom을 nifti로 변환후 계속 그거 사용
@@ -11,31 +12,27 @@ image_path = 'nifti_data1/case1.nii.gz'
 mask_path = 'final_output/mask_case1_auto.nii.gz'
 
 
-# 1. 원본 이미지와 마스크 로드
-image_itk = sitk.ReadImage(image_path)
-mask_itk = sitk.ReadImage(mask_path)
-
-# 2. ITK 이미지 배열로 변환
-image_array = sitk.GetArrayFromImage(image_itk)
-mask_array = sitk.GetArrayFromImage(mask_itk)
+# 1. 총 슬라이스 개수 (헤더만 읽음)
+total_slices = volume_info(image_path).GetSize()[2]
 
-# 3. 총 슬라이스 개수
-total_slices = image_array.shape[0]
-
-# 4. 슬라이스 20개 선택: 고르게 나누기
+# 2. 슬라이스 20개 선택: 고르게 나누기
 slice_indices = np.linspace(0, total_slices - 1, 20, dtype=int)
 
-# 5. 시각화
+# 3. 선택한 슬라이스만 읽기 (.nii.gz는 파일을 한번 열어서 앞에서부터 풀면서 필요한 슬라이스만 꺼냄)
+image_slices = dict(iter_slices(image_path, slice_indices))
+mask_slices = dict(iter_slices(mask_path, slice_indices))
+
+# 4. 시각화
 plt.figure(figsize=(15, 12))
 
 for i, slice_idx in enumerate(slice_indices):
     plt.subplot(4, 5, i + 1)
 
     # 원본 CT
-    plt.imshow(image_array[slice_idx, :, :], cmap='gray', alpha=1.0)
+    plt.imshow(image_slices[slice_idx], cmap='gray', alpha=1.0)
 
     # 마스크 slice
-    mask_slice = mask_array[slice_idx, :, :]
+    mask_slice = mask_slices[slice_idx]
 
     # RGBA 배열 생성 (기본은 투명)
     overlay = np.zeros((*mask_slice.shape, 4), dtype=np.float32)
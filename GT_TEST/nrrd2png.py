@@ -1,18 +1,6 @@
-import os
-import SimpleITK as sitk
-import imageio
+from slice_convert import volume_to_png
 
-# 저장 폴더 설정
-output_dir = "./GT_TEST/Segmentation_liver_first"
-os.makedirs(output_dir, exist_ok=True)
-
-# NRRD 파일 읽기
-img = sitk.ReadImage("./GT_TEST/Segmentation_liver_first.nrrd")
-arr = sitk.GetArrayFromImage(img)  # (z, y, x)
-
-# PNG로 저장
-for i, slice_img in enumerate(arr):
-    save_path = os.path.join(output_dir, f"slice_{i:03d}.png")  # 폴더 경로 포함
-    imageio.imwrite(save_path, (slice_img.astype("uint8") * 255))
-
-print(f"모든 슬라이스가 '{output_dir}' 폴더에 저장 완료!")
+# NRRD 마스크 -> 슬라이스별 PNG (slice_convert가 슬라이스 단위로 읽어서 병렬로 저장)
+# mode: "binary"는 기존처럼 0/255, "palette"는 multilabel 값을 유지하고 label별 색으로 저장
+if __name__ == "__main__":
+    volume_to_png("./GT_TEST/Segmentation_liver_first.nrrd", "./GT_TEST/Segmentation_liver_first", mode="binary")
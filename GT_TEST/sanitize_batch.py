@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List
+
+from test2 import setup_logger, process_file
+
+# 한번에 worker에게 넘기는 파일 수 (너무 작으면 프로세스간 통신 비용이 커짐)
+DEFAULT_CHUNK_SIZE = 32
+
+
+def list_files(in_dir: str) -> List[str]:
+    """in_dir 아래 모든 파일의 상대경로 (정렬해서 매 실행마다 같은 순서)"""
+    files = []
+    for root, _, names in os.walk(in_dir):
+        for fname in names:
+            files.append(os.path.relpath(os.path.join(root, fname), in_dir))
+    return sorted(files)
+
+
+def load_manifest(manifest_path: str, dry_run: bool) -> dict:
+    """이전 실행의 manifest에서 {상대경로: 마지막 기록}. 같은 모드(dry-run/write)의 기록만 사용"""
+    done = {}
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue # 중단되면서 마지막 줄이 잘린 경우
+            if record.get("dry_run") == dry_run:
+                done[record["file"]] = record
+    return done
+
+
+def process_chunk(in_dir: str, out_dir: str, rel_paths: List[str], dry_run: bool, force_charset: str) -> List[dict]:
+    """worker 프로세스에서 파일 묶음 하나를 처리하고 파일별 기록을 반환"""
+    records = []
+    for rel in rel_paths:
+        start = time.perf_counter()
+        success, issues, fixes = process_file(os.path.join(in_dir, rel), os.path.join(out_dir, rel),
+                                              dry_run=dry_run, force_charset=force_charset)
+        records.append({"file": rel, "success": success, "issues": issues, "fixes": fixes,
+                        "seconds": round(time.perf_counter() - start, 4), "dry_run": dry_run})
+    return records
+
+
+def run(in_dir, out_dir, manifest_path, dry_run=False, force_charset=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+        retry_failed=False):
+    """
+    in_dir의 DICOM 파일들을 프로세스 풀로 검사/수정해서 out_dir에 저장
+
+    파일마다 manifest(JSONL)에 한 줄씩 바로 기록하므로 중간에 멈춰도 다시 실행하면 기록된 파일은 건너뜀.
+    retry_failed면 이전에 실패한 파일은 다시 처리.
+    """
+    done = load_manifest(manifest_path, dry_run)
+    files = list_files(in_dir)
+    pending = [rel for rel in files if rel not in done or (retry_failed and not done[rel]["success"])]
+    logging.info(f"총 파일: {len(files)}, 이전 실행에서 처리됨: {len(files) - len(pending)}, 이번에 처리: {len(pending)}")
+
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    summary_issues, summary_fixes = {}, {}
+    ok = failed = 0
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    with open(manifest_path, "a", encoding="utf-8") as manifest, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_chunk, in_dir, out_dir, chunk, dry_run, force_charset) for chunk in chunks]
+        for future in as_completed(futures):
+            for record in future.result():
+                manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if record["success"]:
+                    ok += 1
+                else:
+                    failed += 1
+                    logging.error(f"[실패] {record['file']}: {record['issues'] + record['fixes']}")
+                for i in record["issues"]:
+                    summary_issues[i] = summary_issues.get(i, 0) + 1
+                for f in record["fixes"]:
+                    summary_fixes[f] = summary_fixes.get(f, 0) + 1
+            manifest.flush()
+            logging.info(f"진행: {ok + failed}/{len(pending)} ({time.perf_counter() - start:.1f}s)")
+
+    # 요약
+    logging.info("=" * 60)
+    logging.info(f"이번 실행: {ok + failed}, 성공: {ok}, 실패: {failed}, 모드: {'DRY-RUN' if dry_run else 'WRITE'}, "
+                 f"{time.perf_counter() - start:.1f}s")
+    if summary_issues:
+        logging.info("이슈 요약(발견 빈도 상위):")
+        for k, v in sorted(summary_issues.items(), key=lambda x: x[1], reverse=True):
+            logging.info(f" - {k}: {v}개")
+    if not dry_run and summary_fixes:
+        logging.info("수정 요약(적용 빈도 상위):")
+        for k, v in sorted(summary_fixes.items(), key=lambda x: x[1], reverse=True):
+            logging.info(f" + {k}: {v}개")
+    logging.info("=" * 60)
+    return ok, failed
+
+
+def main():
+    setup_logger()
+    parser = argparse.ArgumentParser(description="DICOM 폴더 일괄 검사/수정 (멀티프로세스, 이어서 실행 가능)")
+    parser.add_argument("in_dir")
+    parser.add_argument("out_dir")
+    parser.add_argument("--manifest", help="파일별 결과 JSONL (기본: out_dir/manifest.jsonl)")
+    parser.add_argument("--dry-run", action="store_true", help="검사만 하고 저장하지 않음")
+    parser.add_argument("--charset", default=None, help="SpecificCharacterSet 강제 값")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--retry-failed", action="store_true", help="이전에 실패한 파일도 다시 처리")
+    args = parser.parse_args()
+
+    manifest_path = args.manifest or os.path.join(args.out_dir, "manifest.jsonl")
+    run(args.in_dir, args.out_dir, manifest_path, dry_run=args.dry_run, force_charset=args.charset,
+        workers=args.workers, chunk_size=args.chunk_size, retry_failed=args.retry_failed)
+
+
+if __name__ == "__main__":
+    main()
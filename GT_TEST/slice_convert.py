@@ -0,0 +1,372 @@
+import os
+import bz2
+import gzip
+import colorsys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import nibabel as nib
+import SimpleITK as sitk
+from PIL import Image
+
+# 한번에 읽는 슬라이스 수 (worker마다 이만큼만 메모리에 올림)
+SLICES_PER_READ = 4
+# PNG -> 볼륨에서 동시에 읽고 있는 슬라이스 수 = workers * IN_FLIGHT_PER_WORKER
+IN_FLIGHT_PER_WORKER = 2
+# label 1~9 색 (nii_overlay에서 쓰던 색), 나머지 label은 hue를 돌려가며 생성
+BASE_COLORS = {1: (255, 0, 0), 2: (0, 255, 0), 3: (0, 0, 255), 6: (255, 255, 0), 7: (255, 0, 255),
+               8: (0, 255, 255), 9: (128, 255, 128)}
+MODES = ("palette", "binary", "gray")
+
+
+def label_palette():
+    """PNG 'P' 모드용 256색 palette (0은 검정). label 값이 그대로 픽셀 인덱스로 저장됨"""
+    palette = [(0, 0, 0)]
+    for label in range(1, 256):
+        if label in BASE_COLORS:
+            palette.append(BASE_COLORS[label])
+        else:
+            hue = (label * 0.618033988749895) % 1.0 # 황금비로 hue를 돌려서 이웃 label끼리 색이 겹치지 않게
+            palette.append(tuple(int(c * 255) for c in colorsys.hsv_to_rgb(hue, 0.8, 1.0)))
+    return [c for color in palette for c in color]
+
+
+# ===== 볼륨 -> 슬라이스 (streaming 읽기) =====
+def volume_info(path):
+    """픽셀을 읽지 않고 헤더만 읽어서 (size, pixel id, 좌표계 정보를 가진 reader) 반환"""
+    reader = sitk.ImageFileReader()
+    reader.SetFileName(path)
+    if path.lower().endswith(".dcm"): # preamble이 없는 DICOM은 자동으로 형식을 못 찾음
+        reader.SetImageIO("GDCMImageIO")
+    reader.ReadImageInformation()
+    return reader
+
+
+def _read_text_header(path, separator):
+    """NRRD(':') / MHA('=') 텍스트 헤더 -> ({소문자 key: 값}, 헤더 바로 다음 바이트 위치)"""
+    fields = {}
+    with open(path, "rb") as f:
+        while True:
+            line = f.readline()
+            text = line.strip().decode("latin-1")
+            if not text: # 파일 끝 또는 NRRD 헤더 끝 (빈 줄)
+                break
+            if text.startswith("#") or separator not in text:
+                continue
+            key, value = text.split(separator, 1)
+            fields[key.strip().lower()] = value.strip()
+            if key.strip().lower() == "elementdatafile": # MHA 헤더 끝
+                break
+        return fields, f.tell()
+
+
+def is_compressed(path):
+    """
+    압축된 볼륨인지 (.gz 파일, gzip/bzip2 NRRD, 압축 MHA/MHD)
+
+    압축 파일은 원하는 슬라이스만 건너뛰어 읽을 수 없어서 읽을 때마다 앞부분부터 다시 풀어야 함.
+    """
+    lower = path.lower()
+    if lower.endswith(".gz"):
+        return True
+    if lower.endswith((".nrrd", ".nhdr")):
+        return _read_text_header(path, ":")[0].get("encoding", "raw").lower() not in ("raw", "ascii", "text", "txt")
+    if lower.endswith((".mha", ".mhd")):
+        return _read_text_header(path, "=")[0].get("compresseddata", "false").lower() == "true"
+    return False
+
+
+# 압축 종류별로 풀면서 읽는 파일 객체 (앞으로 seek하면 이어서 풂)
+_DECOMPRESSORS = {"gzip": lambda f: gzip.GzipFile(fileobj=f, mode="rb"), "gz": lambda f: gzip.GzipFile(fileobj=f, mode="rb"),
+                  "bzip2": bz2.BZ2File, "bz2": bz2.BZ2File}
+
+
+def _numpy_dtype(pixel_id):
+    return sitk.GetArrayViewFromImage(sitk.Image([1, 1], pixel_id)).dtype
+
+
+def _stream_layout(path, reader):
+    """
+    압축 파일을 앞에서부터 한번만 풀면서 슬라이스를 읽기 위한 정보
+    -> (압축 데이터 시작 위치, 압축 종류, 풀린 데이터에서 픽셀 시작 위치, 저장 dtype, (slope, inter))
+
+    .nii.gz와 gzip/bzip2 NRRD만 지원. 그 외 (압축 MHA, 데이터 파일이 따로 있는 NRRD, 벡터 픽셀)는 None.
+    """
+    if reader.GetNumberOfComponents() != 1:
+        return None
+    lower = path.lower()
+    if lower.endswith(".nii.gz"):
+        proxy = nib.load(path).dataobj # 헤더만 읽음 (load된 header의 offset은 0으로 바뀌어 있으므로 proxy에서 가져옴)
+        return 0, "gzip", int(proxy.offset), np.dtype(proxy.dtype), (float(proxy.slope), float(proxy.inter))
+    if lower.endswith(".nrrd"):
+        fields, offset = _read_text_header(path, ":")
+        encoding = fields.get("encoding", "raw").lower()
+        detached = any(key in fields for key in ("data file", "datafile"))
+        skipped = int(fields.get("line skip", 0)) or int(fields.get("byte skip", 0))
+        if encoding not in _DECOMPRESSORS or detached or skipped:
+            return None
+        dtype = _numpy_dtype(reader.GetPixelID()).newbyteorder(">" if fields.get("endian") == "big" else "<")
+        return offset, encoding, 0, dtype, (None, None)
+    return None
+
+
+def _stream_slices(path, zs, reader, layout):
+    """
+    zs 순서대로 (z, 2D 배열) 반환. 압축 파일 하나를 열어둔 채로 앞에서부터 풀면서 읽으므로
+    z가 커지는 순서면 전체를 한번만 풀고 메모리는 슬라이스 하나만 사용함 (앞쪽 z로 돌아가면 처음부터 다시 품)
+    """
+    start, encoding, data_offset, dtype, (slope, inter) = layout
+    width, height = reader.GetSize()[:2]
+    output_dtype = _numpy_dtype(reader.GetPixelID())
+    slice_bytes = width * height * dtype.itemsize
+    with open(path, "rb") as raw:
+        stream = None
+        try:
+            for z in zs:
+                target = data_offset + z * slice_bytes
+                # 압축 파일 객체의 뒤로 seek은 파일 맨 앞(NRRD 헤더)부터 다시 풀기 때문에 직접 다시 엶
+                if stream is None or target < stream.tell():
+                    if stream is not None:
+                        stream.close()
+                    raw.seek(start)
+                    stream = _DECOMPRESSORS[encoding](raw)
+                stream.seek(target)
+                data = stream.read(slice_bytes)
+                if len(data) != slice_bytes:
+                    raise ValueError(f"압축 데이터가 예상보다 짧습니다: {path} (z={z})")
+                array2d = np.frombuffer(data, dtype).reshape(height, width)
+                if slope is not None and (slope != 1 or inter != 0): # NIfTI scl_slope/scl_inter (ITK와 같게 적용)
+                    array2d = array2d * slope + inter
+                yield z, array2d.astype(output_dtype)
+        finally:
+            if stream is not None:
+                stream.close()
+
+
+def read_slices(path, z0, count):
+    """
+    볼륨의 z0부터 count개 슬라이스만 읽음 -> (count, y, x) 배열
+
+    ITK가 지원하는 형식(NRRD, MHA, 압축 안 된 NIfTI)은 해당 영역만 파일에서 읽음.
+    """
+    reader = volume_info(path)
+    size = reader.GetSize()
+    reader.SetExtractIndex([0, 0, z0])
+    reader.SetExtractSize([size[0], size[1], count])
+    return sitk.GetArrayFromImage(reader.Execute()).reshape(count, size[1], size[0])
+
+
+def iter_slices(path, zs=None, slices_per_read=SLICES_PER_READ):
+    """
+    (z, 2D 배열)을 zs 순서대로 하나씩 반환. zs가 없으면 전체
+
+    압축 안 된 파일은 연속된 z를 slices_per_read개씩 묶어서 그 부분만 읽음.
+    .nii.gz / 압축 NRRD는 파일을 한번 열어서 앞에서부터 풀면서 읽음 (슬라이스마다 다시 열면 매번 처음부터 풀어서 O(Z²)).
+    그 외 압축 형식은 slices_per_read개씩 읽음 (메모리는 제한되지만 매번 처음부터 풂).
+    """
+    reader = volume_info(path)
+    zs = list(range(reader.GetSize()[2])) if zs is None else [int(z) for z in zs]
+    layout = _stream_layout(path, reader) if is_compressed(path) else None
+    if layout is not None:
+        yield from _stream_slices(path, zs, reader, layout)
+        return
+    i = 0
+    while i < len(zs):
+        run = 1
+        while run < slices_per_read and i + run < len(zs) and zs[i + run] == zs[i] + run:
+            run += 1
+        block = read_slices(path, zs[i], run)
+        for k in range(run):
+            yield zs[i] + k, block[k]
+        i += run
+
+
+def slice_to_png(array2d, mode, window=None):
+    """2D 슬라이스 -> PIL 이미지 (palette: label 값 유지 + 색, binary: 0/255, gray: window 적용)"""
+    if mode == "palette":
+        if array2d.max(initial=0) > 255 or array2d.min(initial=0) < 0:
+            raise ValueError("palette 모드는 0~255 label만 지원합니다")
+        image = Image.fromarray(array2d.astype(np.uint8))
+        image.putpalette(label_palette()) # L -> P, 픽셀 값(label)은 그대로
+        return image
+    if mode == "binary":
+        return Image.fromarray(((array2d > 0) * 255).astype(np.uint8))
+    center, width = window
+    low = center - width / 2
+    data = np.clip((array2d.astype(np.float32) - low) / width, 0, 1) * 255
+    return Image.fromarray(data.astype(np.uint8))
+
+
+def _write_block(path, output_dir, z0, count, mode, window, prefix):
+    """worker: z0부터 count개 슬라이스를 iter_slices로 읽어서 PNG로 저장 (메모리는 몇 슬라이스만 사용)"""
+    for z, array2d in iter_slices(path, range(z0, z0 + count)):
+        slice_to_png(array2d, mode, window).save(os.path.join(output_dir, f"{prefix}{z:03d}.png"))
+    return count
+
+
+def volume_to_png(path, output_dir, mode="auto", window=(40, 400), workers=None, prefix="slice_"):
+    """
+    NRRD/NIfTI 볼륨을 슬라이스별 PNG로 저장 (프로세스 풀, worker마다 연속된 z 구간을 맡음)
+
+    mode: "auto"면 uint8 볼륨은 palette (label 값 유지), 나머지 (int16 CT, 실수형 등)는 gray.
+          uint8이 아닌 label 볼륨은 mode="palette"로 지정 (0~255 밖의 값이 있으면 오류).
+    메모리는 worker당 SLICES_PER_READ개 슬라이스만 사용함.
+    """
+    reader = volume_info(path)
+    depth = reader.GetSize()[2]
+    if mode == "auto":
+        mode = "palette" if reader.GetPixelID() == sitk.sitkUInt8 else "gray"
+    if mode not in MODES:
+        raise ValueError(f"mode는 {MODES} 중 하나여야 합니다: {mode}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    # 압축 파일은 앞부분부터 풀어야 하므로 worker마다 한 구간씩 연속으로 읽는 게 유리 (구간 안에서는 한번에 풀면서 읽음)
+    block = max(SLICES_PER_READ, -(-depth // workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_write_block, path, output_dir, z0, min(block, depth - z0), mode, window, prefix)
+                   for z0 in range(0, depth, block)]
+        written = sum(f.result() for f in futures)
+    print(f"{written}개 슬라이스를 '{output_dir}'에 저장 ({mode})")
+    return written
+
+
+# ===== PNG 폴더 -> 볼륨 (streaming 쓰기) =====
+def read_png(path):
+    """PNG 하나 -> 2D uint8 배열 (palette PNG는 label 인덱스, RGB는 첫 채널)"""
+    with Image.open(path) as image:
+        array = np.asarray(image)
+    return array[..., 0] if array.ndim == 3 else array
+
+
+def _read_png_block(paths, binarize):
+    block = np.stack([read_png(p) for p in paths])
+    return ((block > 127) if binarize else block).astype(np.uint8)
+
+
+def _ordered_png_blocks(pool, blocks, binarize, max_in_flight, shape):
+    """블록을 순서대로 반환. 동시에 읽는 블록은 max_in_flight개로 제한 (먼저 끝난 블록이 메모리에 쌓이지 않게)"""
+    pending = []
+    for block in blocks:
+        pending.append(pool.submit(_read_png_block, block, binarize))
+        if len(pending) >= max_in_flight:
+            yield _check_shape(pending.pop(0).result(), shape)
+    for future in pending:
+        yield _check_shape(future.result(), shape)
+
+
+def _check_shape(data, shape):
+    if data.shape[1:] != shape:
+        raise ValueError(f"PNG 크기가 다릅니다: {data.shape[1:]} vs {shape}")
+    return data
+
+
+def _nrrd_header(size, spacing, origin, direction):
+    """gzip 압축 uint8 3D NRRD 헤더 (ITK와 같은 LPS 좌표계)"""
+    direction = np.asarray(direction, dtype=float).reshape(3, 3)
+    axes = " ".join("(" + ",".join(f"{v:.17g}" for v in direction[:, i] * spacing[i]) + ")" for i in range(3))
+    return ("NRRD0004\n"
+            "type: uint8\n"
+            "dimension: 3\n"
+            "space: left-posterior-superior\n"
+            f"sizes: {size[0]} {size[1]} {size[2]}\n"
+            f"space directions: {axes}\n"
+            "kinds: domain domain domain\n"
+            "encoding: gzip\n"
+            f"space origin: ({','.join(f'{v:.17g}' for v in origin)})\n"
+            "\n").encode("ascii")
+
+
+def series_geometry(files):
+    """
+    정렬된 DICOM 슬라이스 파일들의 (size, spacing, origin, direction)
+
+    슬라이스 헤더 두 개 (처음, 마지막)로 시리즈 좌표계 계산, 픽셀은 읽지 않음.
+    """
+    first, last = volume_info(files[0]), volume_info(files[-1])
+    spacing = list(first.GetSpacing())
+    if len(files) > 1:
+        spacing[2] = float(np.linalg.norm(np.subtract(last.GetOrigin(), first.GetOrigin()))) / (len(files) - 1)
+    size = (*first.GetSize()[:2], len(files))
+    return size, tuple(spacing), first.GetOrigin(), first.GetDirection()
+
+
+def reference_geometry(reference):
+    """reference (볼륨 파일 또는 DICOM 폴더)의 (spacing, origin, direction). 없으면 단위 좌표계"""
+    if reference is None:
+        return (1.0, 1.0, 1.0), (0.0, 0.0, 0.0), (1, 0, 0, 0, 1, 0, 0, 0, 1)
+    if os.path.isdir(reference):
+        return series_geometry(sitk.ImageSeriesReader.GetGDCMSeriesFileNames(reference))[1:]
+    reader = volume_info(reference)
+    return reader.GetSpacing(), reader.GetOrigin(), reader.GetDirection()
+
+
+def png_to_volume(png_dir, output_path, reverse=False, binarize=False, reference=None, workers=None):
+    """
+    PNG 폴더 (파일 이름 순서, reverse면 거꾸로) -> uint8 3D 볼륨
+
+    .nrrd 출력은 읽은 슬라이스를 gzip으로 파일에 바로 이어 쓰므로 볼륨 전체를 메모리에 올리지 않음.
+    다른 형식(.nii.gz 등)은 슬라이스를 모은 뒤 SimpleITK로 저장함.
+    reference: 좌표계를 가져올 볼륨 파일이나 DICOM 폴더 (없으면 spacing 1, origin 0).
+    binarize: 127보다 큰 값을 1로 (0/255 마스크용). palette PNG는 label 값을 그대로 읽음.
+    """
+    files = sorted(f for f in os.listdir(png_dir) if f.lower().endswith(".png"))
+    if reverse:
+        files = files[::-1]
+    if not files:
+        raise ValueError(f"PNG 파일이 없습니다: {png_dir}")
+    paths = [os.path.join(png_dir, f) for f in files]
+    height, width = read_png(paths[0]).shape
+    size = (width, height, len(paths))
+    spacing, origin, direction = reference_geometry(reference)
+
+    workers = workers or os.cpu_count() or 1
+    blocks = [paths[i:i + SLICES_PER_READ] for i in range(0, len(paths), SLICES_PER_READ)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        slabs = _ordered_png_blocks(pool, blocks, binarize, workers * IN_FLIGHT_PER_WORKER, (height, width))
+        if output_path.lower().endswith(".nrrd"):
+            with open(output_path, "wb") as raw:
+                raw.write(_nrrd_header(size, spacing, origin, direction))
+                with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1) as out:
+                    for data in slabs:
+                        out.write(data.tobytes())
+        else:
+            image = sitk.GetImageFromArray(np.concatenate(list(slabs)))
+            image.SetSpacing(spacing)
+            image.SetOrigin(origin)
+            image.SetDirection(direction)
+            sitk.WriteImage(image, output_path, useCompression=True)
+    print(f"{len(paths)}개 PNG를 '{output_path}'로 저장")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NRRD/NIfTI 볼륨 <-> PNG 슬라이스 변환 (streaming, 멀티프로세스)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    to_png = sub.add_parser("to-png", help="볼륨 -> PNG 폴더")
+    to_png.add_argument("volume")
+    to_png.add_argument("output_dir")
+    to_png.add_argument("--mode", default="auto", choices=("auto",) + MODES)
+    to_png.add_argument("--window", type=float, nargs=2, default=(40, 400), metavar=("CENTER", "WIDTH"))
+    to_png.add_argument("--prefix", default="slice_")
+    to_png.add_argument("--workers", type=int, default=None)
+
+    to_volume = sub.add_parser("to-volume", help="PNG 폴더 -> 볼륨")
+    to_volume.add_argument("png_dir")
+    to_volume.add_argument("output")
+    to_volume.add_argument("--reverse", action="store_true", help="파일 이름 역순으로 쌓기")
+    to_volume.add_argument("--binarize", action="store_true", help="0/255 마스크를 0/1로")
+    to_volume.add_argument("--reference", default=None, help="좌표계를 가져올 볼륨 파일 또는 DICOM 폴더")
+    to_volume.add_argument("--workers", type=int, default=None)
+
+    args = parser.parse_args()
+    if args.command == "to-png":
+        volume_to_png(args.volume, args.output_dir, args.mode, tuple(args.window), args.workers, args.prefix)
+    else:
+        png_to_volume(args.png_dir, args.output, args.reverse, args.binarize, args.reference, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,5 @@
-import SimpleITK as sitk
-import os
+from slice_convert import png_to_volume
 
-# PNG 폴더 → 3D Volume 변환
-png_dir = "./GT_TEST/Mask_spleen2"
-reader = sitk.ImageSeriesReader()
-
-file_names = [os.path.join(png_dir, f) for f in sorted(os.listdir(png_dir)) if f.endswith(".png")]
-
-image = sitk.ReadImage(file_names)
-
-sitk.WriteImage(image, "segmentation_png.nrrd")
+# PNG 폴더 → 3D Volume 변환 (슬라이스를 읽는 대로 파일에 이어 씀)
+if __name__ == "__main__":
+    png_to_volume("./GT_TEST/Mask_spleen2", "segmentation_png.nrrd")
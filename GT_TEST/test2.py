@@ -6,6 +6,7 @@ from typing import List, Tuple
 import pydicom
 from pydicom.uid import ExplicitVRLittleEndian
 from pydicom.tag import Tag
+from pydicom.sequence import Sequence
 from pydicom.errors import InvalidDicomError
 
 
@@ -24,9 +25,21 @@ def is_compressed_tsuid(ds: pydicom.dataset.Dataset) -> bool:
         return False
 
 
-def verify_dataset(ds: pydicom.dataset.Dataset) -> List[str]:
-    """수정 전에 잠재적 문제를 수집"""
+def scan_elements(ds: pydicom.dataset.Dataset) -> Tuple[list, list]:
+    """ds.iterall()을 한번만 돌면서 (VR 누락/손상 element 목록, 값이 None인 SQ element 목록) 수집"""
+    broken_vr, empty_sq = [], []
+    for elem in ds.iterall():
+        if not isinstance(elem.VR, str) or elem.VR is None:
+            broken_vr.append(elem)
+        elif elem.VR == "SQ" and elem.value is None:
+            empty_sq.append(elem)
+    return broken_vr, empty_sq
+
+
+def verify_dataset(ds: pydicom.dataset.Dataset, scan: Tuple[list, list] = None) -> List[str]:
+    """수정 전에 잠재적 문제를 수집 (scan: scan_elements 결과, 없으면 새로 수집)"""
     issues = []
+    broken_vr, empty_sq = scan if scan is not None else scan_elements(ds)
 
     # 1) Transfer Syntax
     try:
@@ -53,14 +66,10 @@ def verify_dataset(ds: pydicom.dataset.Dataset) -> List[str]:
         issues.append("SpecificCharacterSet 없음")
 
     # 4) VR 깨짐/None, SQ인데 None
-    for elem in ds.iterall():
-        if not isinstance(elem.VR, str) or elem.VR is None:
-            issues.append(f"태그 {elem.tag} VR 누락/손상")
-            break
-    for elem in ds.iterall():
-        if elem.VR == "SQ" and elem.value is None:
-            issues.append(f"태그 {elem.tag} SQ 값이 None")
-            break
+    if broken_vr:
+        issues.append(f"태그 {broken_vr[0].tag} VR 누락/손상")
+    if empty_sq:
+        issues.append(f"태그 {empty_sq[0].tag} SQ 값이 None")
 
     return issues
 
@@ -68,9 +77,11 @@ def verify_dataset(ds: pydicom.dataset.Dataset) -> List[str]:
 def fix_dataset(
     ds: pydicom.dataset.Dataset,
     force_charset: str = None,
+    scan: Tuple[list, list] = None,
 ) -> Tuple[pydicom.dataset.Dataset, List[str]]:
-    """발견된 문제만 보수적으로 수정"""
+    """발견된 문제만 보수적으로 수정 (scan: verify_dataset에서 쓴 scan_elements 결과를 재사용)"""
     fixes = []
+    broken_vr, empty_sq = scan if scan is not None else scan_elements(ds)
 
     # 0) file_meta 보장
     if not hasattr(ds, "file_meta") or ds.file_meta is None:
@@ -118,16 +129,18 @@ def fix_dataset(
             fixes.append("SpecificCharacterSet 기본값 ISO_IR 100 설정")
 
     # 4) VR 누락/깨짐, SQ None 최소 보정
-    for elem in list(ds.iterall()):
-        if not isinstance(elem.VR, str) or elem.VR is None:
-            # 가능한 경우만 보정: 알 수 없으니 UN으로
-            elem.VR = "UN"
-            fixes.append(f"{elem.tag} VR=UN으로 교정")
-    from pydicom.sequence import Sequence
-    for elem in list(ds.iterall()):
-        if elem.VR == "SQ" and elem.value is None:
-            elem.value = Sequence([])
-            fixes.append(f"{elem.tag} SQ None→빈 Sequence")
+    # scan은 1~3 수정 전에 모은 것이므로 지금 상태를 다시 확인 (예: 2에서 CS로 교정한 ImageType은 건너뜀)
+    for elem in broken_vr:
+        if isinstance(elem.VR, str) and elem.VR:
+            continue
+        # 가능한 경우만 보정: 알 수 없으니 UN으로
+        elem.VR = "UN"
+        fixes.append(f"{elem.tag} VR=UN으로 교정")
+    for elem in empty_sq:
+        if elem.VR != "SQ" or elem.value is not None:
+            continue
+        elem.value = Sequence([])
+        fixes.append(f"{elem.tag} SQ None→빈 Sequence")
 
     # 5) 저장 형식 표준화 (메타 포함)
     # SOPInstanceUID 등 원본 UID 보존
@@ -150,13 +163,14 @@ def process_file(src_path: str, dst_path: str, dry_run=False, force_charset=None
     except (InvalidDicomError, Exception) as e:
         return False, [f"DICOM 읽기 실패: {e}"], fixes
 
-    issues = verify_dataset(ds)
+    scan = scan_elements(ds) # element 순회는 검사/수정 합쳐서 한번만
+    issues = verify_dataset(ds, scan)
 
     if dry_run:
         # 검사만
         return True, issues, fixes
 
-    ds, fixes = fix_dataset(ds, force_charset=force_charset)
+    ds, fixes = fix_dataset(ds, force_charset=force_charset, scan=scan)
 
     # 출력 디렉터리 보장
     os.makedirs(os.path.dirname(dst_path), exist_ok=True)
@@ -0,0 +1,202 @@
+import os
+import argparse
+
+import numpy as np
+import pydicom
+import SimpleITK as sitk
+from PIL import Image
+from scipy.ndimage import binary_erosion, distance_transform_edt
+
+from dcm_2_nifti import physical_to_index_transform, rasterize_contours
+from slice_convert import read_png, series_geometry
+
+# 0/255 PNG 마스크를 bool로 볼 때 기준값 (accuracy.read_mask_as_bool과 같음)
+PNG_THRESHOLD = 127
+VOLUME_EXTENSIONS = (".nii", ".nii.gz", ".nrrd", ".nhdr", ".mha", ".mhd")
+
+
+# ===== 볼륨 읽기 =====
+def read_dicom_geometry(dicom_folder):
+    """
+    DICOM 시리즈의 좌표계만 가진 빈 uint8 이미지 (좌표계 기준으로 사용)
+
+    처음/마지막 슬라이스 헤더만 읽고 픽셀은 디코딩하지 않음.
+    """
+    files = sitk.ImageSeriesReader.GetGDCMSeriesFileNames(dicom_folder)
+    if not files:
+        raise ValueError(f"DICOM 시리즈가 없습니다: {dicom_folder}")
+    size, spacing, origin, direction = series_geometry(files)
+    image = sitk.Image(size, sitk.sitkUInt8)
+    image.SetSpacing(spacing)
+    image.SetOrigin(origin)
+    image.SetDirection(direction)
+    return image
+
+
+def read_png_stack(folder, reverse=False, threshold=PNG_THRESHOLD):
+    """
+    PNG 폴더 -> (z, y, x) uint8 label 이미지 (파일 이름 순서, reverse면 거꾸로). 좌표계 정보는 없음
+
+    palette PNG와 label 값(threshold 이하)을 그대로 담은 PNG는 label을 유지함.
+    0/255 마스크나 threshold보다 큰 값이 섞인 흑백 PNG만 threshold로 0/1로 만듦.
+    """
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(".png"))
+    if reverse:
+        files = files[::-1]
+    if not files:
+        raise ValueError(f"PNG 파일이 없습니다: {folder}")
+    paths = [os.path.join(folder, f) for f in files]
+    data = np.stack([read_png(p) for p in paths])
+    with Image.open(paths[0]) as first:
+        palette = first.mode == "P"
+    if not palette and data.max() > threshold:
+        data = (data > threshold).astype(np.uint8)
+    return sitk.GetImageFromArray(data.astype(np.uint8))
+
+
+def read_rtstruct(rtstruct_path, reference, roi_names=None):
+    """RTSTRUCT의 ROI들을 reference 이미지 grid에 multilabel로 래스터화 (ROI 순서대로 1, 2, ...)"""
+    rt_ds = pydicom.dcmread(rtstruct_path)
+    numbers = {roi.ROIName: roi.ROINumber for roi in rt_ds.StructureSetROISequence}
+    contours = {c.ReferencedROINumber: c.get('ContourSequence') for c in rt_ds.ROIContourSequence}
+    roi_names = list(numbers) if roi_names is None else roi_names
+    mask_array = np.zeros(reference.GetSize()[::-1], dtype=np.uint8)
+    A, origin = physical_to_index_transform(reference)
+    for label, name in enumerate(roi_names, start=1):
+        if contours.get(numbers[name]) is not None:
+            rasterize_contours(contours[numbers[name]], A, origin, mask_array, label)
+    image = sitk.GetImageFromArray(mask_array)
+    image.CopyInformation(reference)
+    return image
+
+
+def _is_rtstruct(path):
+    if not os.path.isfile(path) or not path.lower().endswith(".dcm"):
+        return False
+    return pydicom.dcmread(path, stop_before_pixels=True).get("Modality") == "RTSTRUCT"
+
+
+def load_label_image(path, reference_dicom=None, reverse_png=False):
+    """
+    NIfTI / NRRD / MHA 파일, PNG 폴더, RTSTRUCT(.dcm)를 label 이미지(sitk.Image)로 읽음
+
+    RTSTRUCT는 reference_dicom (원본 DICOM 폴더)가 필요함.
+    PNG 폴더는 좌표계 정보가 없으므로 align_to에서 비교 대상의 좌표계를 그대로 씀.
+    """
+    if os.path.isdir(path):
+        return read_png_stack(path, reverse=reverse_png)
+    if _is_rtstruct(path):
+        if reference_dicom is None:
+            raise ValueError(f"RTSTRUCT는 원본 DICOM 폴더가 필요합니다: {path}")
+        return read_rtstruct(path, read_dicom_geometry(reference_dicom))
+    if not path.lower().endswith(VOLUME_EXTENSIONS):
+        raise ValueError(f"지원하지 않는 형식입니다: {path}")
+    return sitk.ReadImage(path)
+
+
+def _same_geometry(a, b):
+    return (a.GetSize() == b.GetSize() and np.allclose(a.GetSpacing(), b.GetSpacing())
+            and np.allclose(a.GetOrigin(), b.GetOrigin()) and np.allclose(a.GetDirection(), b.GetDirection()))
+
+
+def align_to(image, reference, has_geometry=True):
+    """image를 reference grid로 맞춤 (같은 grid면 그대로, 좌표계가 없으면 정보만 복사, 아니면 nearest 리샘플링)"""
+    if _same_geometry(image, reference):
+        return image
+    if not has_geometry:
+        if image.GetSize() != reference.GetSize():
+            raise ValueError(f"크기가 다릅니다: {image.GetSize()} vs {reference.GetSize()}")
+        image = sitk.Image(image)
+        image.CopyInformation(reference)
+        return image
+    return sitk.Resample(image, reference, sitk.Transform(), sitk.sitkNearestNeighbor, 0, image.GetPixelID())
+
+
+# ===== 지표 계산 =====
+def _surface_distances(a, b, spacing):
+    """a 표면의 각 voxel에서 b 표면까지의 거리 (mm)"""
+    surface_a = a & ~binary_erosion(a)
+    surface_b = b & ~binary_erosion(b)
+    return distance_transform_edt(~surface_b, sampling=spacing)[surface_a]
+
+
+def label_metrics(pred, gt, spacing):
+    """
+    bool 볼륨 두 개의 Dice, IoU, HD95, 평균 표면 거리 (거리 단위 mm)
+
+    pred | gt의 bounding box (+1 voxel 여백)에서만 계산함.
+    """
+    pred_voxels, gt_voxels = int(pred.sum()), int(gt.sum())
+    result = {"pred_voxels": pred_voxels, "gt_voxels": gt_voxels}
+    union_mask = pred | gt
+    if not union_mask.any():
+        result.update(dice=1.0, iou=1.0, hd95=0.0, assd=0.0)
+        return result
+
+    # 둘 중 하나라도 있는 영역만 잘라서 계산 (1 voxel 여백: 경계 voxel도 표면으로 잡히도록)
+    box = tuple(slice(idx.min(), idx.max() + 1) for idx in np.nonzero(union_mask))
+    pred_c = np.pad(pred[box], 1)
+    gt_c = np.pad(gt[box], 1)
+
+    inter = int(np.count_nonzero(pred_c & gt_c))
+    union = pred_voxels + gt_voxels - inter
+    result["dice"] = 2 * inter / (pred_voxels + gt_voxels)
+    result["iou"] = inter / union
+
+    if pred_voxels == 0 or gt_voxels == 0:
+        result.update(hd95=float("nan"), assd=float("nan"))
+        return result
+    d_pred_to_gt = _surface_distances(pred_c, gt_c, spacing)
+    d_gt_to_pred = _surface_distances(gt_c, pred_c, spacing)
+    distances = np.concatenate([d_pred_to_gt, d_gt_to_pred])
+    result["hd95"] = float(max(np.percentile(d_pred_to_gt, 95), np.percentile(d_gt_to_pred, 95)))
+    result["assd"] = float(distances.mean())
+    return result
+
+
+def evaluate_volumes(pred_path, gt_path, labels=None, reference_dicom=None, reverse_pred_png=False, reverse_gt_png=False):
+    """
+    예측/정답 볼륨을 GT 좌표계로 맞춘 뒤 label별 지표 계산
+
+    Args:
+        pred_path, gt_path (str): NIfTI/NRRD 파일, PNG 폴더, RTSTRUCT(.dcm).
+        labels (list): 평가할 label 값들 (None이면 GT와 예측에 있는 0이 아닌 모든 값).
+        reference_dicom (str): RTSTRUCT를 읽거나 PNG 폴더끼리 비교할 때 쓸 원본 DICOM 폴더.
+        reverse_pred_png, reverse_gt_png (bool): PNG 폴더의 슬라이스 순서를 뒤집을지.
+    Returns:
+        dict: {label: {"dice", "iou", "hd95", "assd", "pred_voxels", "gt_voxels"}}.
+    """
+    gt = load_label_image(gt_path, reference_dicom, reverse_gt_png)
+    pred = load_label_image(pred_path, reference_dicom, reverse_pred_png)
+    if os.path.isdir(gt_path) and reference_dicom is not None:
+        gt = align_to(gt, read_dicom_geometry(reference_dicom), has_geometry=False)
+    pred = align_to(pred, gt, has_geometry=not os.path.isdir(pred_path))
+
+    gt_array = sitk.GetArrayViewFromImage(gt)
+    pred_array = sitk.GetArrayViewFromImage(pred)
+    spacing = gt.GetSpacing()[::-1] # (z, y, x) 배열 순서에 맞춤
+    if labels is None:
+        labels = sorted((set(np.unique(gt_array)) | set(np.unique(pred_array))) - {0})
+    return {int(label): label_metrics(pred_array == label, gt_array == label, spacing) for label in labels}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="3차원 볼륨 단위 분할 평가 (Dice, IoU, HD95, ASSD)")
+    parser.add_argument("pred")
+    parser.add_argument("gt")
+    parser.add_argument("--labels", type=int, nargs="*", default=None)
+    parser.add_argument("--reference-dicom", default=None, help="RTSTRUCT / PNG 폴더 평가에 쓸 원본 DICOM 폴더")
+    parser.add_argument("--reverse-pred-png", action="store_true")
+    parser.add_argument("--reverse-gt-png", action="store_true")
+    args = parser.parse_args()
+
+    results = evaluate_volumes(args.pred, args.gt, args.labels, args.reference_dicom,
+                               args.reverse_pred_png, args.reverse_gt_png)
+    print("=== 평가 결과 ===")
+    for label, m in results.items():
+        print(f"label {label}: Dice {m['dice']:.4f} | IoU {m['iou']:.4f} | HD95 {m['hd95']:.2f}mm | "
+              f"ASSD {m['assd']:.2f}mm | voxels pred {m['pred_voxels']} / gt {m['gt_voxels']}")
+
+
+if __name__ == "__main__":
+    main()
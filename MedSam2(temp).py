@@ -21,18 +21,16 @@ import SimpleITK as sitk
 import pydicom
 from rt_utils import RTStructBuilder
 
-from PIL import Image
 import torch
-from sam2.build_sam import build_sam2_video_predictor_npz
 from skimage import measure
 
+from medsam2_propagation import select_device, build_predictor, propagation_range, propagate_from_slice
+
 import matplotlib.pyplot as plt
 
 torch.set_float32_matmul_precision('high')
 torch.manual_seed(2024)
 np.random.seed(2024)
-if not torch.cuda.is_available():
-    raise RuntimeError("CUDA GPU가 필요합니다. (MedSAM2는 GPU 추론 권장)")
 
 # ===== USER CONFIG =====
 DICOM_DIR = "./dcm_data1"                   # DICOM 폴더
@@ -46,6 +44,9 @@ WINDOW_CENTER = None
 WINDOW_WIDTH  = None
 DEFAULT_WIN = (-200, 300)   # (lower, upper) CT soft-tissue 권장 예시
 
+# 추론 장치 ("auto"면 CUDA가 있으면 GPU, 없으면 CPU)
+DEVICE = "auto"
+
 # MedSAM2 모델 경로
 CHECKPOINT = "./checkpoints/MedSAM2_2411.pt"
 MODEL_CFG  = "configs/sam2.1_hiera_t512.yaml"
@@ -62,25 +63,6 @@ def getLargestCC(seg):
     largest = labels == np.argmax(np.bincount(labels.flat)[1:]) + 1
     return largest.astype(seg.dtype)
 
-def bbox_from_mask(mask2d):
-    """mask2d: (H,W) bool/0-1 -> [x_min, y_min, x_max, y_max] (원본 해상도 좌표)"""
-    ys, xs = np.where(mask2d > 0)
-    if len(xs) == 0:
-        raise ValueError("수정한 슬라이스 마스크가 비어 있습니다.")
-    x_min, x_max = xs.min(), xs.max()
-    y_min, y_max = ys.min(), ys.max()
-    return np.array([int(x_min), int(y_min), int(x_max), int(y_max)], dtype=int)
-
-def grayscale3d_to_rgb_resized(vol_uint8, image_size=512):
-    """(D,H,W)->(D,3,sz,sz), PIL resize, uint8 -> float(0..1) 이후 표준화는 아래에서"""
-    D,H,W = vol_uint8.shape
-    out = np.zeros((D, 3, image_size, image_size), dtype=np.uint8)
-    for i in range(D):
-        img = Image.fromarray(vol_uint8[i])
-        img = img.convert("RGB").resize((image_size, image_size), resample=Image.BILINEAR)
-        out[i] = np.asarray(img).transpose(2,0,1)
-    return out
-
 def window_normalize_to_uint8(vol, wc, ww):
     lower = wc - ww/2.0
     upper = wc + ww/2.0
@@ -158,57 +140,20 @@ else:
 
 vol_uint8 = window_normalize_to_uint8(vol_hu, wc_use, ww_use)  # (Z,H,W) uint8 in [0,255]
 
-# ===== 4) SAM2 입력 준비 (RGB, 512 리사이즈 + 표준화) =====
-video_height, video_width = H, W
-rgb_512 = grayscale3d_to_rgb_resized(vol_uint8, image_size=512)  # (Z,3,512,512) uint8
-img_resized = torch.from_numpy(rgb_512.astype(np.float32) / 255.0).cuda()  # (Z,3,512,512)
-
-# ImageNet mean/std
-img_mean=(0.485, 0.456, 0.406)
-img_std=(0.229, 0.224, 0.225)
-img_mean = torch.tensor(img_mean, dtype=torch.float32)[:, None, None].cuda()
-img_std  = torch.tensor(img_std,  dtype=torch.float32)[:, None, None].cuda()
-img_resized = (img_resized - img_mean) / img_std
-
-# ===== 5) 수정 슬라이스에서 bbox 시드 생성 =====
-bbox = bbox_from_mask(initial_mask_zyx[EDITED_SLICE_INDEX])  # [x_min, y_min, x_max, y_max]
-
-# ===== 6) MedSAM2 추론 및 전파 =====
-segs_3D = np.zeros((Z, H, W), dtype=np.uint8)
-predictor = build_sam2_video_predictor_npz(MODEL_CFG, CHECKPOINT)
-
-with torch.inference_mode(), torch.autocast("cuda", dtype=torch.bfloat16):
-    state = predictor.init_state(img_resized, video_height, video_width)
-
-    # seed from edited slice
-    _, out_obj_ids, out_mask_logits = predictor.add_new_points_or_box(
-        inference_state=state,
-        frame_idx=EDITED_SLICE_INDEX,
-        obj_id=1,
-        box=bbox,  # 원본 해상도 좌표
-    )
-
-    # forward propagate
-    for out_frame_idx, out_obj_ids, out_mask_logits in predictor.propagate_in_video(state):
-        segs_3D[out_frame_idx, (out_mask_logits[0] > 0.0).detach().cpu().numpy()[0]] = 1
-
-    predictor.reset_state(state)
-
-    # re-seed & backward propagate
-    _, out_obj_ids, out_mask_logits = predictor.add_new_points_or_box(
-        inference_state=state,
-        frame_idx=EDITED_SLICE_INDEX,
-        obj_id=1,
-        box=bbox,
-    )
-    for out_frame_idx, out_obj_ids, out_mask_logits in predictor.propagate_in_video(state, reverse=True):
-        segs_3D[out_frame_idx, (out_mask_logits[0] > 0.0).detach().cpu().numpy()[0]] = 1
+# ===== 4) MedSAM2 추론 및 전파 =====
+# 입력 전처리(resize + 표준화)는 모듈 안에서 chunk 단위로, 장기의 z 범위 주변만 전파
+device = select_device(DEVICE)
+print(f"MedSAM2 device: {device}")
+predictor = build_predictor(MODEL_CFG, CHECKPOINT, device)
+z_range = propagation_range(initial_mask_zyx, EDITED_SLICE_INDEX)
+segs_3D = propagate_from_slice(predictor, vol_uint8, initial_mask_zyx[EDITED_SLICE_INDEX], EDITED_SLICE_INDEX,
+                               device, z_range=z_range)
 
 # 후처리(선택): LCC
 if segs_3D.max() > 0:
     segs_3D = getLargestCC(segs_3D).astype(np.uint8)
 
-# ===== 7) 저장: NIfTI & RTSTRUCT =====
+# ===== 5) 저장: NIfTI & RTSTRUCT =====
 # NIfTI 저장 (DICOM 기하정보 복사)
 sitk_img_uint8 = sitk.Cast(sitk.GetImageFromArray(vol_uint8), sitk.sitkUInt8)
 sitk_img_uint8.CopyInformation(sitk_img)  # origin/direction/spacing
@@ -234,7 +179,7 @@ rt_out = join(SAVE_DIR, "rtstruct_MedSAM2_propagated.dcm")
 new_rt.save(rt_out)
 print(f"[저장] {rt_out}")
 
-# ===== 8) (선택) 시각화: 편집 슬라이스 전/후 비교 =====
+# ===== 6) (선택) 시각화: 편집 슬라이스 전/후 비교 =====
 fig, axes = plt.subplots(1,3, figsize=(12,4))
 axes[0].imshow(vol_uint8[EDITED_SLICE_INDEX], cmap='gray'); axes[0].set_title("CT (edited slice)"); axes[0].axis('off')
 axes[1].imshow(vol_uint8[EDITED_SLICE_INDEX], cmap='gray'); axes[1].imshow(initial_mask_zyx[EDITED_SLICE_INDEX], alpha=0.4); axes[1].set_title("Initial (edited applied)"); axes[1].axis('off')
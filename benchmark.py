@@ -0,0 +1,345 @@
+"""
+에디터 주요 경로 벤치마크 (Tk 창, GPU 없이 실행)
+
+GT_TEST/DCM 시리즈와 지정한 크기의 합성 DICOM 시리즈에서
+dicom_to_np, dicom_to_np_v2, _normalize_to_uint8, _update_plot, _paint / _on_release,
+save_mask (RTSTRUCT 저장), get_mask_From_rtstruct 시간을 재서 JSON으로 저장함.
+
+사용 예:
+    python benchmark.py --synthetic 512x512x200 --output bench.json
+    python benchmark.py --compare bench_before.json --output bench_after.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pydicom
+from pydicom.dataset import FileDataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, CTImageStorage, generate_uid
+
+from Front_UI import MaskEditor
+from volume_cache import VolumeCache
+from mask_store import MaskStore
+from rtstruct_writer import RTStructWriter
+from edit_journal import EditJournal
+from render_cache import SliceRenderCache
+from brush_stroke import StrokeBuffer
+
+DEFAULT_DICOM_DIR = os.path.join("GT_TEST", "DCM")
+ROI_NAME = "phantom"
+
+
+# --- Tk 없이 에디터를 쓰기 위한 부분 ---
+class _Headless:
+    """root / canvas / status_label 대신 쓰는 객체 (화면에 아무것도 그리지 않음)"""
+    def winfo_width(self):
+        return 1 # 배치 전 캔버스처럼 보여서 _update_plot이 전체 이미지를 그림
+
+    def winfo_height(self):
+        return 1
+
+    def after_idle(self, func):
+        return None # _paint는 벤치마크에서 프레임마다 직접 호출
+
+    def after_cancel(self, job):
+        pass
+
+    def config(self, **kwargs):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+    def coords(self, *args):
+        pass
+
+    def delete(self, *args):
+        pass
+
+
+class _HeadlessPhoto:
+    """ImageTk.PhotoImage 대신 크기만 맞춰서 paste 경로를 타게 함"""
+    def __init__(self, width, height):
+        self._size = (width, height)
+
+    def width(self):
+        return self._size[0]
+
+    def height(self):
+        return self._size[1]
+
+    def paste(self, image):
+        image.tobytes() # 실제 PhotoImage처럼 픽셀을 한번 읽음
+
+
+class _Var:
+    def __init__(self, value):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+
+def headless_editor(cache_dir):
+    # MaskEditor.__init__은 Tk 창을 만들고 mainloop를 돌리므로 __init__의 상태 변수들만 직접 채움
+    # (이벤트 핸들러가 읽는 변수는 모두 있어야 함)
+    editor = MaskEditor.__new__(MaskEditor)
+    editor.root = editor.canvas = editor.status_label = _Headless()
+    editor.center_val = editor.width_val = editor.slope = editor.intercept = None
+    editor.organ_names = []
+    editor.ct_volume = editor.dicom_folder = editor.d2_slices = None
+    editor.todosegment = []
+    editor.inference_worker = None
+    editor.inference_organs = []
+    editor.inference_slices = editor.inference_start_time = None
+    editor.inference_status = ""
+    editor.inference_cache = None
+    editor.volume_cache = VolumeCache(cache_dir)
+    editor.inference_task = 'total'
+    editor.inference_kind = editor.full_labels = None
+    editor.masks_dict = {}
+    editor.rtstruct_writer = editor.edit_journal = None
+    editor.key_slices = {}
+    editor.isSemented = {}
+    editor.segmented_class_names = []
+    editor.selected_organ_name = None
+    editor.current_slice_idx = None
+    editor.brush_size = 1
+    editor.brush_shape = "square"
+    editor.slab_depth = 0
+    editor.stroke_points = StrokeBuffer()
+    editor.paint_job = None
+    editor.drawing = editor.erasing = False
+    editor.d_key_pressed = False
+    editor.temp_line_mask = editor.stroke_frame = None
+    editor.render_cache = SliceRenderCache()
+    editor.photo_img = editor.canvas_image_id = None
+    editor.zoom_level = 1.0
+    editor.pan_start_x = editor.pan_start_y = 0
+    editor.canvas_img_x = editor.canvas_img_y = 0
+    editor.colors = None
+    editor.segment_check_vars = {}
+    editor.check_vars = {}
+    editor.active_rois = {}
+    editor.segmented = {}
+    return editor
+
+
+def open_series(editor, dicom_dir):
+    # _on_drop에서 시리즈를 연 뒤 하는 초기화 (위젯 제외)
+    editor.dicom_to_np(dicom_dir)
+    h, w, depth = editor.ct_volume.shape
+    editor.masks_dict = MaskStore(editor.ct_volume.shape)
+    editor.masks_dict[ROI_NAME] = phantom_mask(editor.ct_volume.shape)
+    editor.rtstruct_writer = RTStructWriter(editor.d2_slices)
+    editor.edit_journal = EditJournal(editor.masks_dict)
+    editor.key_slices = {}
+    editor.segmented_class_names = [ROI_NAME]
+    editor.active_rois = {ROI_NAME}
+    editor.roi_colors = {ROI_NAME: [255, 0, 0]}
+    editor.editing_roi_name = _Var(ROI_NAME)
+    editor.current_slice_idx = depth // 2
+    editor.brush_size = 3
+    editor.brush_shape = "round"
+    editor.slab_depth = 0
+    editor.stroke_points = StrokeBuffer()
+    editor.paint_job = None
+    editor.drawing = editor.erasing = False
+    editor.temp_line_mask = np.zeros((h, w), dtype=bool)
+    editor.stroke_frame = None
+    editor.photo_img = _HeadlessPhoto(w, h)
+    editor.render_cache.invalidate()
+
+
+# --- 합성 데이터 ---
+def phantom_mask(shape):
+    """볼륨 가운데의 타원체 마스크 (H, W, Z)"""
+    h, w, depth = shape
+    rows, cols, zs = np.ogrid[:h, :w, :depth]
+    return ((rows - h / 2) / (h / 4)) ** 2 + ((cols - w / 2) / (w / 5)) ** 2 + ((zs - depth / 2) / (depth / 3)) ** 2 <= 1
+
+
+def write_synthetic_series(out_dir, shape, seed=0):
+    """(H, W, Z) 크기의 CT 팬텀을 DICOM 시리즈로 저장 (몸통 원기둥 + 장기 타원체 + 노이즈)"""
+    h, w, depth = shape
+    rng = np.random.default_rng(seed)
+    rows, cols = np.ogrid[:h, :w]
+    body = ((rows - h / 2) / (h * 0.45)) ** 2 + ((cols - w / 2) / (w * 0.45)) ** 2 <= 1
+    organ = phantom_mask(shape)
+    study_uid, series_uid, frame_uid = generate_uid(), generate_uid(), generate_uid()
+    # rt_utils가 RTSTRUCT를 만들 때 원본 시리즈에서 복사하는 study/series 정보
+    date, clock = time.strftime("%Y%m%d"), time.strftime("%H%M%S")
+    os.makedirs(out_dir, exist_ok=True)
+    for z in range(depth):
+        hu = np.where(body, 40, -1000) + np.where(organ[:, :, z], 20, 0) + rng.normal(0, 10, (h, w))
+        meta = FileMetaDataset()
+        meta.MediaStorageSOPClassUID = CTImageStorage
+        meta.MediaStorageSOPInstanceUID = generate_uid()
+        meta.TransferSyntaxUID = ExplicitVRLittleEndian
+        path = os.path.join(out_dir, f"slice_{z:04d}.dcm")
+        ds = FileDataset(path, {}, file_meta=meta, preamble=b"\0" * 128)
+        ds.is_little_endian, ds.is_implicit_VR = True, False
+        ds.SOPClassUID, ds.SOPInstanceUID = CTImageStorage, meta.MediaStorageSOPInstanceUID
+        ds.StudyInstanceUID, ds.SeriesInstanceUID, ds.FrameOfReferenceUID = study_uid, series_uid, frame_uid
+        ds.Modality, ds.PatientName, ds.PatientID = "CT", "Benchmark^Phantom", "BENCH"
+        ds.StudyDate, ds.StudyTime, ds.StudyID = date, clock, "BENCH"
+        ds.SeriesDate, ds.SeriesTime, ds.SeriesNumber = date, clock, 1
+        ds.InstanceNumber = z + 1
+        ds.ImagePositionPatient = [-w / 2 * 0.8, -h / 2 * 0.8, z * 2.5]
+        ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+        ds.PixelSpacing, ds.SliceThickness = [0.8, 0.8], 2.5
+        ds.Rows, ds.Columns = h, w
+        ds.SamplesPerPixel, ds.PhotometricInterpretation = 1, "MONOCHROME2"
+        ds.BitsAllocated, ds.BitsStored, ds.HighBit, ds.PixelRepresentation = 16, 16, 15, 0
+        ds.RescaleSlope, ds.RescaleIntercept = 1, -1024
+        ds.WindowCenter, ds.WindowWidth = 40, 400
+        ds.PixelData = np.clip(hu + 1024, 0, 65535).astype(np.uint16).tobytes()
+        ds.save_as(path)
+    return out_dir
+
+
+# --- 시간 측정 ---
+def measure(func, repeat, setup=None, teardown=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        if teardown is not None:
+            teardown()
+    return {'repeat': repeat, 'min': min(times), 'median': float(np.median(times)), 'mean': float(np.mean(times))}
+
+
+def _stroke(editor, points=64):
+    # 현재 슬라이스에 원을 그리는 stroke (4 이벤트마다 한 프레임씩 _paint)
+    h, w = editor.ct_volume.shape[:2]
+    angles = np.linspace(0, 2 * np.pi, points)
+    xs = (w / 2 + w / 6 * np.cos(angles)).astype(int)
+    ys = (h / 2 + h / 6 * np.sin(angles)).astype(int)
+    editor._on_press(SimpleNamespace(num=1, x=int(xs[0]), y=int(ys[0])))
+    for i, (x, y) in enumerate(zip(xs[1:], ys[1:]), start=1):
+        editor._on_motion(SimpleNamespace(x=int(x), y=int(y)))
+        if i % 4 == 0:
+            editor._paint()
+    editor._paint()
+
+
+def _release(editor):
+    editor._on_release(SimpleNamespace(num=1, x=0, y=0))
+
+
+def _legacy_dicom_to_np_v2(dicom_dir, cache_dir):
+    # SimpleITK로 읽는 구버전 로더 (Front_UI_tmep_v)
+    from Front_UI_tmep_v import MaskEditor as LegacyEditor
+    editor = LegacyEditor.__new__(LegacyEditor)
+    editor.volume_cache = VolumeCache(cache_dir)
+    editor.dicom_to_np_v2(dicom_dir)
+
+
+def run_dataset(dicom_dir, repeat, work_dir):
+    results = {}
+    cache_root = os.path.join(work_dir, "cache")
+
+    def fresh_cache():
+        shutil.rmtree(cache_root, ignore_errors=True)
+
+    editor = headless_editor(cache_root)
+    results['dicom_to_np_cold'] = measure(lambda: editor.dicom_to_np(dicom_dir), repeat, setup=fresh_cache)
+    results['dicom_to_np_warm'] = measure(lambda: editor.dicom_to_np(dicom_dir), repeat)
+    try:
+        results['dicom_to_np_v2_cold'] = measure(lambda: _legacy_dicom_to_np_v2(dicom_dir, cache_root), repeat, setup=fresh_cache)
+    except ImportError as e:
+        results['dicom_to_np_v2_cold'] = {'skipped': str(e)}
+
+    open_series(editor, dicom_dir)
+    hu = editor.ct_volume * np.float32(editor.slope) + np.float32(editor.intercept)
+    results['normalize_to_uint8'] = measure(
+        lambda hu=hu: editor._normalize_to_uint8(hu, editor.center_val, editor.width_val), repeat)
+    del hu
+
+    results['update_plot_uncached'] = measure(editor._update_plot, repeat, setup=editor.render_cache.invalidate)
+    results['update_plot_cached'] = measure(editor._update_plot, repeat)
+    results['paint_stroke'] = measure(lambda: _stroke(editor), repeat, teardown=lambda: _release(editor))
+    results['release_stroke'] = measure(lambda: _release(editor), repeat, setup=lambda: _stroke(editor))
+
+    rt_path = os.path.join(work_dir, "bench_rtstruct.dcm")
+
+    def new_writer():
+        editor.rtstruct_writer = RTStructWriter(editor.d2_slices)
+
+    results['save_mask_cold'] = measure(lambda: editor.rtstruct_writer.write(editor.masks_dict, rt_path), repeat, setup=new_writer)
+    results['save_mask_unchanged'] = measure(lambda: editor.rtstruct_writer.write(editor.masks_dict, rt_path), repeat)
+    results['get_mask_From_rtstruct'] = measure(lambda: editor.get_mask_From_rtstruct(rt_path), repeat)
+    results['shape'] = list(editor.ct_volume.shape)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    # 같은 데이터셋/항목의 median 비율 출력 (1보다 크면 느려짐)
+    for dataset, results in current['datasets'].items():
+        old = baseline.get('datasets', {}).get(dataset, {})
+        for name, stats in results.items():
+            if not isinstance(stats, dict) or 'median' not in stats or 'median' not in old.get(name, {}):
+                continue
+            ratio = stats['median'] / old[name]['median']
+            flag = "  <-- slower" if ratio > 1.1 else ""
+            print(f"{dataset:>20} {name:<26} {old[name]['median']:.4f}s -> {stats['median']:.4f}s ({ratio:.2f}x){flag}")
+
+
+def parse_shape(text):
+    h, w, depth = (int(v) for v in text.lower().split("x"))
+    return h, w, depth
+
+
+def main():
+    parser = argparse.ArgumentParser(description="에디터 주요 경로 벤치마크 (headless)")
+    parser.add_argument("--dicom", default=DEFAULT_DICOM_DIR, help="벤치마크할 DICOM 시리즈 폴더 ('' 이면 생략)")
+    parser.add_argument("--synthetic", action="append", default=[], type=parse_shape, metavar="HxWxZ",
+                        help="합성 시리즈 크기 (여러 번 지정 가능)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    report = {'commit': _git_commit(), 'python': platform.python_version(), 'numpy': np.__version__,
+              'pydicom': pydicom.__version__, 'machine': platform.machine(), 'cpu_count': os.cpu_count(),
+              'time': time.strftime("%Y-%m-%dT%H:%M:%S"), 'repeat': args.repeat, 'datasets': {}}
+    with tempfile.TemporaryDirectory(prefix="mask_editor_bench_") as work_root:
+        datasets = []
+        if args.dicom:
+            datasets.append((os.path.basename(os.path.normpath(args.dicom)), args.dicom))
+        for shape in args.synthetic:
+            label = "synthetic_{}x{}x{}".format(*shape)
+            datasets.append((label, write_synthetic_series(os.path.join(work_root, label, "dicom"), shape)))
+        for label, dicom_dir in datasets:
+            print(f"[{label}] {dicom_dir}")
+            work_dir = os.path.join(work_root, label)
+            os.makedirs(work_dir, exist_ok=True)
+            report['datasets'][label] = run_dataset(dicom_dir, args.repeat, work_dir)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"결과 저장: {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import numpy as np
+from scipy.ndimage import distance_transform_edt, distance_transform_cdt, binary_fill_holes, binary_dilation, label
+
+from mask_store import _bbox
+
+BRUSH_SHAPES = ("square", "round")
+# stroke를 놓았을 때 구멍을 채우는 영역 = stroke의 bounding box + 이 여유
+FILL_MARGIN = 32
+
+
+def _segment_points(points):
+    """연속된 점들 사이를 1픽셀 간격으로 채운 (N, 2) (y, x) 정수 좌표 -> 빠르게 그어도 선이 끊기지 않게"""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) == 1:
+        return np.rint(points).astype(int)
+    starts, ends = points[:-1], points[1:]
+    steps = np.ceil(np.abs(ends - starts).max(axis=1)).astype(int) + 1 # 세그먼트별 샘플 수
+    seg_index = np.repeat(np.arange(len(steps)), steps)
+    # 세그먼트 안에서의 위치 (0~1)
+    offsets = np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)
+    t = offsets / np.maximum(steps[seg_index] - 1, 1)
+    samples = starts[seg_index] + (ends - starts)[seg_index] * t[:, None]
+    return np.rint(samples).astype(int)
+
+
+def rasterize_stroke(points, radius, shape, brush_shape="square"):
+    """
+    점들을 이은 선을 브러시로 칠한 영역을 한번에 계산
+
+    Args:
+        points (list): [(y, x), ...] 이미지 좌표. 이어진 순서대로.
+        radius (int): 브러시 반지름 (square면 한 변이 2 * radius + 1).
+        shape (tuple): 이미지 (H, W).
+        brush_shape (str): "square" 또는 "round".
+    Returns:
+        (row slice, column slice, 2차원 boolean 배열) 또는 칠해진 영역이 이미지 밖이면 None.
+    """
+    h, w = shape
+    centers = _segment_points(points)
+    # 이미지에 닿을 수 없는 점은 버림 (캔버스 밖으로 멀리 끌어도 계산 영역이 커지지 않게)
+    inside = ((centers[:, 0] >= -radius) & (centers[:, 0] < h + radius) &
+              (centers[:, 1] >= -radius) & (centers[:, 1] < w + radius))
+    centers = centers[inside]
+    if len(centers) == 0:
+        return None
+
+    # 중심점들의 bounding box + 반지름만큼만 계산
+    (y0, x0), (y1, x1) = centers.min(axis=0) - radius, centers.max(axis=0) + radius + 1
+    grid = np.ones((y1 - y0, x1 - x0), dtype=bool)
+    grid[centers[:, 0] - y0, centers[:, 1] - x0] = False
+    # 가장 가까운 중심점까지의 거리로 칠함 -> 브러시 크기와 상관없이 영역 크기에 비례
+    if brush_shape == "round":
+        painted = distance_transform_edt(grid) <= radius
+    else:
+        painted = distance_transform_cdt(grid, metric='chessboard') <= radius
+
+    # 이미지 범위로 자름
+    r0, r1, c0, c1 = max(0, y0), min(h, y1), max(0, x0), min(w, x1)
+    if r0 >= r1 or c0 >= c1:
+        return None
+    return slice(r0, r1), slice(c0, c1), painted[r0 - y0:r1 - y0, c0 - x0:c1 - x0]
+
+
+def slab_footprint(footprint, dzs, depth, radius, taper=False):
+    """
+    2차원 footprint를 여러 슬라이스로 늘린 (h, w, len(dzs)) footprint (3차원 브러시)
+
+    Args:
+        footprint (np.ndarray): (h, w) 현재 슬라이스에 칠한 영역.
+        dzs (np.ndarray): 현재 슬라이스 기준 슬라이스 offset들 (-depth ~ depth).
+        depth (int): slab 두께 (현재 슬라이스 위아래 슬라이스 수).
+        radius (int): 브러시 반지름.
+        taper (bool): False면 모든 슬라이스에 같은 영역 (cylinder),
+            True면 현재 슬라이스에서 멀어질수록 가장자리를 최대 radius만큼 깎음 (sphere).
+    """
+    dzs = np.asarray(dzs)
+    if not taper:
+        return np.repeat(footprint[:, :, None], len(dzs), axis=2)
+    # 영역 가장자리까지의 거리 (잘린 경계도 가장자리로 봄)
+    inside = distance_transform_edt(np.pad(footprint, 1))[1:-1, 1:-1]
+    shrink = radius * (1 - np.sqrt(1 - (dzs / (depth + 1)) ** 2))
+    return inside[:, :, None] > shrink[None, None, :]
+
+
+def close_stroke(mask2d, stroke, margin=FILL_MARGIN):
+    """
+    그린 선(stroke)을 마스크에 더하고 선으로 닫힌 영역을 채운 (H, W) 마스크를 반환
+
+    stroke의 bounding box + margin 영역에서만 계산하고, 새로 생긴 구멍 중 stroke에 닿은 것만 채움
+    -> 혈관 내강처럼 원래 마스크에 있던 다른 구멍은 그대로 둠.
+    """
+    result = mask2d | stroke
+    box = _bbox(stroke)
+    if box is None:
+        return result
+    (r0, r1), (c0, c1) = box
+    h, w = stroke.shape
+    rows = slice(max(0, r0 - margin), min(h, r1 + margin))
+    cols = slice(max(0, c0 - margin), min(w, c1 + margin))
+
+    boundary = result[rows, cols]
+    holes = binary_fill_holes(boundary) & ~boundary
+    if not holes.any():
+        return result
+    # stroke에 닿은 구멍만 "선으로 닫은 영역"으로 봄
+    labels, _ = label(holes)
+    touching = np.unique(labels[binary_dilation(stroke[rows, cols]) & holes])
+    result[rows, cols] |= np.isin(labels, touching[touching > 0])
+    return result
+
+
+class StrokeBuffer:
+    """
+    마우스 이동 이벤트로 들어온 점들을 모아두는 버퍼
+
+    이벤트마다 바로 칠하지 않고 모아뒀다가 화면을 그릴 때 한번에 rasterize_stroke로 칠함.
+    take()는 이전에 칠한 마지막 점부터 반환하므로 프레임 사이의 선도 이어짐.
+    """
+    def __init__(self):
+        self._points = []
+        self._last = None
+
+    def start(self, y, x):
+        self._points = [(y, x)]
+        self._last = None
+
+    def add(self, y, x):
+        self._points.append((y, x))
+
+    def take(self):
+        """아직 칠하지 않은 점들 (이전 마지막 점 포함). 없으면 빈 리스트"""
+        if not self._points:
+            return []
+        points = ([self._last] if self._last is not None else []) + self._points
+        self._last = self._points[-1]
+        self._points = []
+        return points
+
+    def reset(self):
+        self._points = []
+        self._last = None
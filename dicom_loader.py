@@ -0,0 +1,191 @@
+import os
+import glob
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pydicom
+
+
+def _read_header(path):
+    # 픽셀데이터 앞에서 읽기를 멈춰서 헤더만 읽음
+    return pydicom.dcmread(path, stop_before_pixels=True, force=True)
+
+
+def _slice_position(ds):
+    # 슬라이스 법선벡터 방향으로의 위치 (axial이면 ImagePositionPatient[2]와 같음)
+    orientation = np.array(ds.ImageOrientationPatient, dtype=float)
+    normal = np.cross(orientation[:3], orientation[3:])
+    return float(np.dot(normal, np.array(ds.ImagePositionPatient, dtype=float)))
+
+
+def _acquisition_key(ds):
+    # 같은 시리즈 안의 다른 acquisition (예: 5mm / 2.5mm 재구성)은 서로 다른 볼륨으로 봄
+    return str(ds.get('AcquisitionNumber', '') or '')
+
+
+def split_acquisitions(headers):
+    """헤더들을 {AcquisitionNumber: 헤더 리스트}로 나눔 (AcquisitionNumber가 없으면 '' 하나)"""
+    stacks = {}
+    for ds in headers:
+        stacks.setdefault(_acquisition_key(ds), []).append(ds)
+    return stacks
+
+
+def drop_duplicate_positions(headers):
+    """
+    정렬된 헤더에서 같은 위치의 슬라이스는 InstanceNumber가 가장 작은 것 하나만 남김
+
+    Returns:
+        tuple: (남긴 헤더 리스트, 버린 개수).
+    """
+    kept = [headers[0]]
+    for ds in headers[1:]:
+        if np.isclose(_slice_position(ds), _slice_position(kept[-1]), atol=1e-3):
+            continue
+        kept.append(ds)
+    return kept, len(headers) - len(kept)
+
+
+def read_series_headers(dicom_series_path, max_workers=None, acquisition=None):
+    """
+    DICOM 폴더에서 헤더만 읽어 z축 기준으로 정렬하고 geometry를 검증
+
+    한 시리즈에 acquisition이 여러 개 있으면 (같은 위치를 다른 두께로 재구성한 경우 등) 섞어서 쌓지 않고
+    하나만 사용함: acquisition을 지정하면 그 AcquisitionNumber, 아니면 슬라이스가 가장 많은 것.
+    남은 슬라이스 중 같은 위치가 또 있으면 InstanceNumber가 가장 작은 것만 남김. 버린 슬라이스는 경고로 출력.
+
+    Args:
+        dicom_series_path (str): DICOM 파일들이 있는 폴더 경로.
+        max_workers (int): 헤더를 읽을 thread 개수. None이면 기본값 사용.
+        acquisition (str): 사용할 AcquisitionNumber. None이면 슬라이스가 가장 많은 acquisition.
+    Returns:
+        list: 정렬된 pydicom Dataset 리스트 (픽셀데이터 없음, ds.filename에 파일경로).
+    """
+    dicom_files = glob.glob(os.path.join(dicom_series_path, '*.dcm'))
+    if not dicom_files:
+        raise FileNotFoundError(f"'{dicom_series_path}' 폴더에 DICOM 파일이 없습니다.")
+
+    # 헤더 읽기는 대부분 I/O라서 thread로 병렬 처리
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        headers = list(executor.map(_read_header, dicom_files))
+
+    series_uids = {ds.get('SeriesInstanceUID') for ds in headers}
+    if len(series_uids) > 1:
+        raise ValueError(f"폴더에 여러 개의 시리즈가 섞여 있습니다: {len(series_uids)}개")
+
+    stacks = split_acquisitions(headers)
+    if acquisition is not None:
+        if str(acquisition) not in stacks:
+            raise ValueError(f"AcquisitionNumber {acquisition}이(가) 없습니다: {sorted(stacks)}")
+        headers = stacks[str(acquisition)]
+    else:
+        headers = max(stacks.values(), key=len)
+    if len(stacks) > 1:
+        summary = ", ".join(f"{key or '-'}: {len(stack)}장" for key, stack in sorted(stacks.items()))
+        print(f"경고: 시리즈에 acquisition이 여러 개 있습니다 ({summary}). "
+              f"AcquisitionNumber {_acquisition_key(headers[0]) or '-'}만 사용합니다.")
+
+    # 위치가 같은 슬라이스는 InstanceNumber 순서로
+    headers.sort(key=lambda ds: (_slice_position(ds), int(ds.get('InstanceNumber', 0) or 0)))
+    headers, dropped = drop_duplicate_positions(headers)
+    if dropped:
+        print(f"경고: 같은 위치에 중복된 슬라이스 {dropped}개를 제외했습니다 (InstanceNumber가 가장 작은 슬라이스 사용).")
+    validate_series_geometry(headers)
+    return headers
+
+
+def validate_series_geometry(headers):
+    """모든 슬라이스가 하나의 (H, W, Z) 볼륨으로 쌓일 수 있는지 확인"""
+    first = headers[0]
+    for ds in headers[1:]:
+        if (ds.Rows, ds.Columns) != (first.Rows, first.Columns):
+            raise ValueError(f"슬라이스 크기가 다릅니다: {ds.filename}")
+        if not np.allclose(np.array(ds.ImageOrientationPatient, dtype=float),
+                           np.array(first.ImageOrientationPatient, dtype=float), atol=1e-4):
+            raise ValueError(f"슬라이스 방향(ImageOrientationPatient)이 다릅니다: {ds.filename}")
+
+
+# process pool에서 worker 하나에 한번에 넘기는 슬라이스 수
+DECODE_CHUNK_SIZE = 8
+
+
+def _decode_into(volume, z_index, path):
+    # 워커 thread에서 픽셀 디코딩 후 미리 할당한 볼륨에 바로 써넣음
+    volume[:, :, z_index] = pydicom.dcmread(path, force=True).pixel_array
+
+
+def _decode_chunk(paths):
+    # 워커 프로세스에서 슬라이스 묶음을 디코딩 -> (H, W, n)
+    return np.stack([pydicom.dcmread(path, force=True).pixel_array for path in paths], axis=-1)
+
+
+def _process_context():
+    """
+    디코딩 process pool의 start method (fork는 쓰지 않음)
+
+    에디터에서는 추론 thread (torch / TotalSegmentator)가 도는 중에 새 시리즈를 열 수 있는데,
+    lock을 잡은 thread가 있는 프로세스를 fork하면 자식 프로세스가 멈출 수 있음.
+    forkserver는 thread 없는 서버 프로세스에서 fork하고 (메인 모듈 import는 서버에서 한번만),
+    지원하지 않는 OS (Windows)는 spawn을 씀.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _is_compressed(ds):
+    try:
+        return bool(ds.file_meta.TransferSyntaxUID.is_compressed)
+    except Exception:
+        return False
+
+
+def load_series_volume(headers, max_workers=None, progress_callback=None):
+    """
+    정렬된 헤더 순서대로 픽셀데이터를 병렬 디코딩해서 (H, W, Z) 배열 하나로 만듦
+
+    압축된 transfer syntax (JPEG 2000 등)는 디코딩이 CPU 작업이라 GIL 때문에 thread로는 빨라지지 않으므로
+    코어가 여러 개면 process pool로 DECODE_CHUNK_SIZE장씩 디코딩해서 받아옴.
+    압축되지 않은 파일은 읽기(I/O)가 대부분이라 thread가 미리 할당한 볼륨에 바로 써넣음.
+
+    Args:
+        headers (list): read_series_headers로 읽은 정렬된 헤더 리스트.
+        max_workers (int): 디코딩할 thread/process 개수. None이면 CPU 코어 수.
+        progress_callback (callable): (완료 개수, 전체 개수)를 받는 함수. 호출한 thread에서 호출됨.
+    Returns:
+        np.ndarray: (H, W, Z) 원본 픽셀값 볼륨.
+    """
+    total = len(headers)
+    max_workers = max_workers or os.cpu_count() or 1
+    # 첫 슬라이스로 dtype을 정하고 전체 볼륨은 한 번만 할당
+    first_pixels = pydicom.dcmread(headers[0].filename, force=True).pixel_array
+    volume = np.empty(first_pixels.shape + (total,), dtype=first_pixels.dtype)
+    volume[:, :, 0] = first_pixels
+    done = 1
+    if progress_callback is not None:
+        progress_callback(done, total)
+
+    if _is_compressed(headers[0]) and max_workers > 1:
+        paths = [ds.filename for ds in headers]
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=_process_context()) as executor:
+            futures = {executor.submit(_decode_chunk, paths[z0:z0 + DECODE_CHUNK_SIZE]): z0
+                       for z0 in range(1, total, DECODE_CHUNK_SIZE)}
+            for future in as_completed(futures):
+                chunk = future.result() # 디코딩 중 에러가 있으면 여기서 발생
+                z0 = futures[future]
+                volume[:, :, z0:z0 + chunk.shape[2]] = chunk
+                done += chunk.shape[2]
+                if progress_callback is not None:
+                    progress_callback(done, total)
+        return volume
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_decode_into, volume, z, ds.filename)
+                   for z, ds in enumerate(headers[1:], start=1)]
+        for future in as_completed(futures):
+            future.result() # 디코딩 중 에러가 있으면 여기서 발생
+            done += 1
+            if progress_callback is not None:
+                progress_callback(done, total)
+
+    return volume
@@ -0,0 +1,199 @@
+import numpy as np
+
+from mask_store import _bbox
+
+# undo 기록이 쓸 수 있는 최대 메모리 (넘으면 오래된 기록부터 버림)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _union(*boxes):
+    """2차원 영역 ((r0, r1), (c0, c1))들을 모두 포함하는 영역. None은 무시하고 모두 None이면 None"""
+    boxes = [box for box in boxes if box is not None]
+    if not boxes:
+        return None
+    return ((min(b[0][0] for b in boxes), max(b[0][1] for b in boxes)),
+            (min(b[1][0] for b in boxes), max(b[1][1] for b in boxes)))
+
+
+class _SliceDiff:
+    """슬라이스 하나에서 바뀐 영역(bounding box)의 수정 전/후 값을 비트로 압축해서 저장"""
+    def __init__(self, name, z, offset, before, after):
+        """before / after: 슬라이스의 offset (r0, c0) 위치부터 잘라낸 같은 크기의 영역"""
+        self.name = name
+        self.z = z
+        (r0, r1), (c0, c1) = _bbox(before ^ after)
+        self.rows = slice(offset[0] + r0, offset[0] + r1)
+        self.cols = slice(offset[1] + c0, offset[1] + c1)
+        self.shape = (r1 - r0, c1 - c0)
+        self.before = np.packbits(before[r0:r1, c0:c1])
+        self.after = np.packbits(after[r0:r1, c0:c1])
+
+    @property
+    def nbytes(self):
+        return self.before.nbytes + self.after.nbytes
+
+    def apply(self, masks, use_before):
+        bits = self.before if use_before else self.after
+        region = np.unpackbits(bits, count=self.shape[0] * self.shape[1]).reshape(self.shape).astype(bool)
+        mask = masks.get_slice(self.name, self.z) if self.name in masks else np.zeros(masks.shape[:2], dtype=bool)
+        mask[self.rows, self.cols] = region
+        masks.set_slice(self.name, self.z, mask)
+
+
+class EditJournal:
+    """
+    마스크 수정 기록 (undo / redo)
+
+    begin() ~ commit() 사이에 수정된 슬라이스들을 하나의 undo 단위로 묶음.
+    수정 전에 touch()로 수정될 수 있는 영역(슬라이스 전체가 아니라 bounding box)의 원래 값을 기억해두고
+    commit() 때 바뀐 영역만 비트로 압축해서 저장하므로 기록 중에도 메모리가 수정 크기에 비례함.
+    기록 전체 크기가 max_bytes를 넘으면 오래된 것부터 버림.
+    undo() / redo()는 바뀐 (ROI 이름, z) 목록을 반환 -> 화면 캐시 갱신에 사용.
+    MaskStore.set_slice를 거쳐서 되돌리므로 저장(RTStructWriter)도 되돌린 ROI를 수정된 것으로 봄.
+    """
+    def __init__(self, masks, max_bytes=DEFAULT_MAX_BYTES):
+        self.masks = masks
+        self.max_bytes = max_bytes
+        self._undo = [] # [[_SliceDiff, ...], ...] 오래된 것부터
+        self._redo = []
+        self._nbytes = 0
+        self._pending = None # 진행중인 undo 단위 {(이름, z): (rows, cols, 수정 전 영역)}
+
+    def begin(self):
+        if self._pending is None:
+            self._pending = {}
+
+    def touch(self, name, z, rows=None, cols=None):
+        """
+        (name, z) 슬라이스의 rows=(r0, r1), cols=(c0, c1) 영역을 수정하기 직전에 호출 (None이면 슬라이스 전체)
+
+        같은 undo 단위에서 같은 슬라이스를 다시 touch하면 기억하는 영역을 넓힘.
+        이전 영역 밖은 아직 수정되지 않았으므로 지금 값이 수정 전 값임.
+        """
+        if self._pending is None:
+            return
+        h, w = self.masks.shape[:2]
+        rows = (0, h) if rows is None else (max(0, rows[0]), min(h, rows[1]))
+        cols = (0, w) if cols is None else (max(0, cols[0]), min(w, cols[1]))
+        previous = self._pending.get((name, z))
+        if previous is not None:
+            old_rows, old_cols, old_before = previous
+            if old_rows[0] <= rows[0] and rows[1] <= old_rows[1] and old_cols[0] <= cols[0] and cols[1] <= old_cols[1]:
+                return
+            rows, cols = _union((rows, cols), (old_rows, old_cols))
+        before = self.masks.get_slice_crop(name, z, rows, cols)
+        if previous is not None:
+            r, c = old_rows[0] - rows[0], old_cols[0] - cols[0]
+            before[r:r + old_before.shape[0], c:c + old_before.shape[1]] = old_before
+        self._pending[(name, z)] = (rows, cols, before)
+
+    def commit(self):
+        """진행중인 undo 단위를 기록하고 바뀐 (ROI 이름, z) 목록을 반환"""
+        pending, self._pending = self._pending, None
+        if not pending:
+            return []
+        diffs = []
+        for (name, z), (rows, cols, before) in pending.items():
+            after = self.masks.get_slice_crop(name, z, rows, cols)
+            if (before != after).any():
+                diffs.append(_SliceDiff(name, z, (rows[0], cols[0]), before, after))
+        if diffs:
+            self._push(self._undo, diffs)
+            self._redo.clear()
+            self._trim()
+        return [(diff.name, diff.z) for diff in diffs]
+
+    # --- 편하게 쓰기 위한 부분 (진행중인 undo 단위가 없으면 한번의 수정이 하나의 undo 단위) ---
+    def set_slice(self, name, z, mask2d):
+        return self._edit(name, [z], lambda: self.masks.set_slice(name, z, mask2d), _bbox(mask2d))
+
+    def clear_slice(self, name, z):
+        return self._edit(name, [z], lambda: self.masks.clear_slice(name, z), None)
+
+    def paint(self, name, origin, footprint, value=True):
+        """MaskStore.paint와 같음. footprint가 걸친 슬라이스들의 footprint 영역만 기록"""
+        r0, c0, z0 = origin
+        box = ((r0, r0 + footprint.shape[0]), (c0, c0 + footprint.shape[1]))
+        return self._edit(name, range(z0, z0 + footprint.shape[2]),
+                          lambda: self.masks.paint(name, origin, footprint, value), box, replaces=False)
+
+    def fill_slices(self, name, z0, z1, mask2d):
+        return self._edit(name, range(z0, z1), lambda: self.masks.fill_slices(name, z0, z1, mask2d), _bbox(mask2d))
+
+    def set_slices(self, name, origin, block):
+        r0, c0, z0 = origin
+        box = _bbox(block.any(axis=2))
+        if box is not None:
+            box = ((r0 + box[0][0], r0 + box[0][1]), (c0 + box[1][0], c0 + box[1][1]))
+        return self._edit(name, range(z0, z0 + block.shape[2]), lambda: self.masks.set_slices(name, origin, block), box)
+
+    def _edit(self, name, zs, apply, box, replaces=True):
+        """
+        zs 슬라이스들의 box 영역을 기록하고 apply()로 수정
+        replaces: 슬라이스를 통째로 교체하는 수정이면 지금 ROI가 저장된 영역도 바뀔 수 있으므로 같이 기록
+        진행중인 undo 단위가 없을 때만 바로 commit하고 바뀐 (ROI 이름, z) 목록을 반환
+        """
+        if replaces and name in self.masks:
+            stored = self.masks.bbox(name)
+            box = _union(box, stored[:2] if stored is not None else None)
+        single = self._pending is None
+        self.begin()
+        if box is not None:
+            for z in zs:
+                self.touch(name, z, *box)
+        apply()
+        return self.commit() if single else []
+
+    # --- undo / redo ---
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo(self):
+        return self._move(self._undo, self._redo, use_before=True)
+
+    def redo(self):
+        return self._move(self._redo, self._undo, use_before=False)
+
+    def discard(self, name):
+        """ROI 전체가 다른 마스크로 바뀌었을 때 그 ROI의 기록은 더 이상 맞지 않으므로 버림"""
+        for stack in (self._undo, self._redo):
+            kept = []
+            for diffs in stack:
+                diffs = [diff for diff in diffs if diff.name != name]
+                if diffs:
+                    kept.append(diffs)
+            stack[:] = kept
+        self._nbytes = sum(diff.nbytes for stack in (self._undo, self._redo) for diffs in stack for diff in diffs)
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._nbytes = 0
+        self._pending = None
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def _move(self, source, target, use_before):
+        if self._pending is not None or not source:
+            return []
+        diffs = source.pop()
+        self._nbytes -= sum(diff.nbytes for diff in diffs)
+        # 같은 단위 안의 수정은 서로 다른 슬라이스라서 순서 상관없이 적용 가능
+        for diff in diffs:
+            diff.apply(self.masks, use_before)
+        self._push(target, diffs)
+        return [(diff.name, diff.z) for diff in diffs]
+
+    def _push(self, stack, diffs):
+        stack.append(diffs)
+        self._nbytes += sum(diff.nbytes for diff in diffs)
+
+    def _trim(self):
+        # 오래된 undo 기록부터 버림 (가장 최근 기록 하나는 남김)
+        while self._nbytes > self.max_bytes and len(self._undo) > 1:
+            self._nbytes -= sum(diff.nbytes for diff in self._undo.pop(0))
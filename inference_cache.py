@@ -0,0 +1,156 @@
+import os
+import re
+import uuid
+import importlib.metadata
+
+import numpy as np
+
+
+def default_cache_dir():
+    # 같은 워크스테이션의 모든 사용자가 공유할 수 있는 위치를 기본값으로 사용
+    if "TOTALSEG_UI_CACHE_DIR" in os.environ:
+        return os.environ["TOTALSEG_UI_CACHE_DIR"]
+    if os.name == 'nt':
+        return os.path.join(os.environ.get("PROGRAMDATA", "C:\\ProgramData"), "totalseg_ui_cache")
+    return os.path.join("/var/tmp", "totalseg_ui_cache")
+
+
+# 공유 캐시 폴더 권한: 루트는 /tmp처럼 누구나 쓰되 남의 폴더는 못 지우게 (sticky bit),
+# 그 아래는 다른 사용자가 같은 캐시 파일을 교체할 수 있게 모두 쓰기 가능
+SHARED_ROOT_MODE = 0o1777
+SHARED_DIR_MODE = 0o777
+
+
+def makedirs_shared(cache_dir, path):
+    """
+    cache_dir부터 path까지 없는 폴더를 만들고 다른 사용자도 쓸 수 있게 권한 설정
+
+    기본 umask로 만들면 처음 만든 사용자만 쓸 수 있어서 다른 사용자의 캐시 저장이 PermissionError로 실패함.
+    이미 있는 폴더의 권한은 바꾸지 않음.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(cache_dir)), exist_ok=True)
+    relative = os.path.relpath(path, cache_dir)
+    parts = [] if relative == os.curdir else relative.split(os.sep)
+    directory = cache_dir
+    for i, part in enumerate([None] + parts):
+        if part is not None:
+            directory = os.path.join(directory, part)
+        try:
+            os.mkdir(directory)
+        except FileExistsError:
+            continue
+        os.chmod(directory, SHARED_ROOT_MODE if i == 0 else SHARED_DIR_MODE) # umask 무시하고 명시적으로 설정
+
+
+def get_model_version():
+    try:
+        return importlib.metadata.version("TotalSegmentator")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _safe_name(text):
+    # 파일/폴더 이름으로 쓸 수 없는 문자 제거
+    return re.sub(r'[^0-9A-Za-z._-]', '_', str(text))
+
+
+class InferenceCache:
+    """
+    TotalSegmentator 결과를 장기별로 디스크에 저장하는 캐시
+
+    키는 (SeriesInstanceUID, task, 모델버전)이고 장기 하나당 .npz 파일 하나로 저장함.
+    마스크는 bounding box로 잘라낸 뒤 np.packbits로 압축해서 저장하고
+    분할 요청했는데 결과가 없던 장기도 빈 파일로 기록해서 다시 추론하지 않게 함.
+    """
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or default_cache_dir()
+
+    def _entry_dir(self, series_uid, task, model_version):
+        return os.path.join(self.cache_dir, _safe_name(series_uid), f"{_safe_name(task)}_{_safe_name(model_version)}")
+
+    def missing(self, series_uid, task, model_version, organs):
+        """파일을 읽지 않고 캐시에 없는 장기 이름만 반환"""
+        entry_dir = self._entry_dir(series_uid, task, model_version)
+        return [name for name in organs if not os.path.exists(os.path.join(entry_dir, f"{_safe_name(name)}.npz"))]
+
+    def load(self, series_uid, task, model_version, organs, shape):
+        """
+        캐시에서 장기별 마스크를 읽음
+
+        Args:
+            organs (list): 찾을 장기 이름들.
+            shape (tuple): 에디터 볼륨 크기 (H, W, Z). 크기가 다르면 캐시를 무시함.
+        Returns:
+            tuple: (캐시에 있던 마스크 dict, 캐시에 없어서 추론이 필요한 장기 리스트).
+                   추론했지만 결과가 없던 장기는 둘 다에 포함되지 않음.
+        """
+        entry_dir = self._entry_dir(series_uid, task, model_version)
+        masks, missing = {}, []
+        for name in organs:
+            path = os.path.join(entry_dir, f"{_safe_name(name)}.npz")
+            if not os.path.exists(path):
+                missing.append(name)
+                continue
+            try:
+                with np.load(path) as data:
+                    if tuple(data['shape']) != tuple(shape):
+                        missing.append(name)
+                        continue
+                    bbox = data['bbox']
+                    if bbox.size == 0:
+                        continue # 추론했지만 분할된게 없던 장기
+                    crop_shape = tuple(int(b1 - b0) for b0, b1 in bbox.reshape(3, 2))
+                    crop = np.unpackbits(data['bits'], count=int(np.prod(crop_shape))).reshape(crop_shape).astype(bool)
+            except Exception as e:
+                print(f"캐시 파일을 읽는 중 오류 발생 ({path}): {e}")
+                missing.append(name)
+                continue
+            mask = np.zeros(shape, dtype=bool)
+            (r0, r1), (c0, c1), (z0, z1) = bbox.reshape(3, 2)
+            mask[r0:r1, c0:c1, z0:z1] = crop
+            masks[name] = mask
+        return masks, missing
+
+    def store(self, series_uid, task, model_version, masks, requested_organs, shape):
+        """
+        추론 결과를 캐시에 저장 (requested_organs 중 masks에 없는 장기는 빈 결과로 기록)
+
+        캐시는 추론이 끝난 뒤에 쓰므로 저장에 실패해도 (권한, 디스크 부족 등) 경고만 출력하고 넘어감
+        -> 추론 결과는 그대로 사용됨. 저장했으면 True.
+        """
+        entry_dir = self._entry_dir(series_uid, task, model_version)
+        try:
+            makedirs_shared(self.cache_dir, entry_dir)
+            for name in set(requested_organs) | set(masks):
+                self._store_one(entry_dir, name, masks.get(name), shape)
+        except Exception as e:
+            print(f"추론 캐시 저장 실패 ({entry_dir}): {e}")
+            return False
+        return True
+
+    @staticmethod
+    def _store_one(entry_dir, name, mask, shape):
+        if mask is not None and mask.any():
+            # 마스크가 있는 영역만 잘라서 비트 단위로 압축
+            bbox = []
+            for axis in range(3):
+                other_axes = tuple(a for a in range(3) if a != axis)
+                nonzero = np.flatnonzero(mask.any(axis=other_axes))
+                bbox.append((nonzero[0], nonzero[-1] + 1))
+            (r0, r1), (c0, c1), (z0, z1) = bbox
+            bits = np.packbits(mask[r0:r1, c0:c1, z0:z1], axis=None)
+            bbox = np.array(bbox, dtype=np.int32).ravel()
+        else:
+            bits = np.zeros(0, dtype=np.uint8)
+            bbox = np.zeros(0, dtype=np.int32)
+
+        # 여러 사용자가 동시에 써도 깨지지 않게 임시파일에 쓰고 교체
+        path = os.path.join(entry_dir, f"{_safe_name(name)}.npz")
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, bits=bits, bbox=bbox, shape=np.array(shape, dtype=np.int32))
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
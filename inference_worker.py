@@ -0,0 +1,63 @@
+import threading
+import queue
+import traceback
+
+
+class InferenceWorker:
+    """
+    시간이 오래 걸리는 추론 작업을 별도 thread에서 실행하고 결과를 queue로 전달하는 클래스
+
+    작업 함수는 worker를 첫 번째 인자로 받아서 worker.report(...)로 진행상황을 보내고
+    worker.cancelled로 취소 여부를 확인함. Tk 위젯은 메인 thread에서만 다뤄야 하므로
+    메인 thread에서 root.after로 poll()을 주기적으로 호출해서 메시지를 받아감.
+
+    메시지 종류:
+        ('progress', str)  진행상황 텍스트
+        ('done', result)   작업 함수의 반환값
+        ('error', str)     작업 중 발생한 예외 메시지
+        ('cancelled', None) 취소된 작업이 끝남 (결과는 버려짐)
+    """
+    def __init__(self, job, *args, **kwargs):
+        self.messages = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(job, args, kwargs), daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def cancel(self):
+        # 실행중인 TotalSegmentator 호출 자체는 중간에 끊을 수 없어서
+        # 다음 단계로 넘어가기 전에 멈추고 결과를 버리는 방식으로 취소함
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def report(self, text):
+        self.messages.put(('progress', text))
+
+    def poll(self):
+        # 지금까지 쌓인 메시지를 전부 꺼내서 반환 (블로킹 없음)
+        drained = []
+        while True:
+            try:
+                drained.append(self.messages.get_nowait())
+            except queue.Empty:
+                return drained
+
+    def _run(self, job, args, kwargs):
+        try:
+            result = job(self, *args, **kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self.messages.put(('error', str(e)))
+            return
+        if self.cancelled:
+            self.messages.put(('cancelled', None))
+        else:
+            self.messages.put(('done', result))
@@ -0,0 +1,69 @@
+import numpy as np
+from scipy.ndimage import find_objects
+
+
+class LabelVolume:
+    """
+    여러 장기를 하나의 multilabel 볼륨 (H, W, Z)에 담아두는 클래스
+
+    장기 이름 순서대로 1부터 label 값을 부여하고, finalize() 때 label별 bounding box를
+    한번에 구해둬서 get_mask()는 해당 box 안에서만 비교하므로 빠르게 꺼낼 수 있음.
+    """
+    def __init__(self, shape, names):
+        self.names = list(names)
+        self.shape = tuple(shape)
+        dtype = np.uint8 if len(self.names) < 256 else np.uint16
+        self.labels = np.zeros(self.shape, dtype=dtype)
+        self._label_ids = {name: i + 1 for i, name in enumerate(self.names)}
+        self._boxes = None
+
+    @classmethod
+    def from_array(cls, labels, names_by_id):
+        """
+        이미 만들어진 multilabel 배열로 생성 (TotalSegmentator ml 결과처럼 label 값이 정해진 경우)
+
+        Args:
+            labels (np.ndarray): (H, W, Z) 정수 label 배열.
+            names_by_id (dict): {label 값: 장기 이름}.
+        """
+        max_id = max(names_by_id) if names_by_id else 0
+        volume = cls.__new__(cls)
+        volume.names = [names_by_id.get(i, f"label_{i}") for i in range(1, max_id + 1)]
+        volume.shape = tuple(labels.shape)
+        volume.labels = labels
+        volume._label_ids = {name: i + 1 for i, name in enumerate(volume.names)}
+        volume._boxes = None
+        return volume
+
+    def paint(self, name, mask):
+        # 겹치는 부분은 나중에 칠한 장기가 덮어씀
+        self.labels[mask] = self._label_ids[name]
+        self._boxes = None
+
+    def finalize(self):
+        # label별 bounding box를 한번의 스캔으로 구함
+        self._boxes = find_objects(self.labels, max_label=len(self.names))
+        return self
+
+    def _box(self, name):
+        if self._boxes is None:
+            self.finalize()
+        label_id = self._label_ids.get(name)
+        if label_id is None:
+            return None
+        return self._boxes[label_id - 1]
+
+    def contains(self, name):
+        return self._box(name) is not None
+
+    def present_names(self):
+        return [name for name in self.names if self.contains(name)]
+
+    def get_mask(self, name):
+        """장기 하나를 boolean (H, W, Z) 마스크로 꺼냄. 없으면 None"""
+        box = self._box(name)
+        if box is None:
+            return None
+        mask = np.zeros(self.shape, dtype=bool)
+        mask[box] = self.labels[box] == self._label_ids[name]
+        return mask
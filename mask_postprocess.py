@@ -0,0 +1,108 @@
+import numpy as np
+from scipy.ndimage import label, binary_fill_holes, binary_opening, binary_closing, generate_binary_structure
+
+from mask_store import _bbox
+
+# 추론 결과를 정리할 때 지우는 작은 덩어리 기준 (mm^3)
+MIN_BLOB_MM3 = 100.0
+# 한 슬라이스 안에서만 연결되는 구조 (슬라이스별 hole filling용)
+_IN_PLANE = generate_binary_structure(2, 1)[:, :, None]
+
+
+def largest_component(crop):
+    """가장 큰 connected component만 남김"""
+    labels, count = label(crop)
+    if count <= 1:
+        return crop
+    sizes = np.bincount(labels.ravel())
+    sizes[0] = 0
+    return labels == sizes.argmax()
+
+
+def remove_small_components(crop, min_voxels):
+    """min_voxels보다 작은 connected component를 지움"""
+    labels, count = label(crop)
+    if count == 0:
+        return crop
+    sizes = np.bincount(labels.ravel())
+    keep = sizes >= min_voxels
+    keep[0] = False
+    return keep[labels]
+
+
+def fill_holes_per_slice(crop):
+    """슬라이스마다 구멍을 채움 (한번의 호출로 모든 슬라이스)"""
+    return binary_fill_holes(crop, structure=_IN_PLANE)
+
+
+def clean_crop(crop, voxel_mm3=1.0, close_radius=0, fill_slices=False, open_radius=0,
+               min_blob_mm3=None, largest_only=False):
+    """
+    잘라낸 (h, w, d) 마스크를 순서대로 closing -> 슬라이스별 hole filling -> opening -> 작은 덩어리 제거
+
+    closing은 바깥으로 커질 수 있으므로 crop은 close_radius만큼 여유가 있어야 함 (pad_for 참고).
+
+    Args:
+        crop (np.ndarray): boolean 마스크.
+        voxel_mm3 (float): voxel 하나의 부피 (mm^3).
+        close_radius, open_radius (int): morphological closing / opening 반복 횟수 (0이면 안함).
+        fill_slices (bool): 슬라이스별 hole filling 여부.
+        min_blob_mm3 (float): 이보다 작은 덩어리를 지움 (None이면 안함).
+        largest_only (bool): 가장 큰 덩어리만 남김.
+    """
+    if close_radius:
+        crop = binary_closing(crop, iterations=close_radius)
+    if fill_slices:
+        crop = fill_holes_per_slice(crop)
+    if open_radius:
+        crop = binary_opening(crop, iterations=open_radius)
+    if min_blob_mm3:
+        crop = remove_small_components(crop, int(np.ceil(min_blob_mm3 / voxel_mm3)))
+    if largest_only:
+        crop = largest_component(crop)
+    return crop
+
+
+def pad_for(close_radius=0, **_):
+    # closing으로 커질 수 있는 만큼 bounding box 바깥으로 여유
+    return close_radius
+
+
+def clean_roi(masks, name, voxel_mm3=1.0, **options):
+    """
+    MaskStore의 ROI 하나를 bounding box 안에서만 정리
+
+    Returns:
+        (origin(r0, c0, z0), block) -> MaskStore.set_slices / EditJournal.set_slices에 넘기면 됨.
+        ROI가 비어있으면 None.
+    """
+    box = masks.bbox(name)
+    if box is None:
+        return None
+    pad = pad_for(**options)
+    box = [(max(0, lo - pad), min(size, hi + pad)) for (lo, hi), size in zip(box, masks.shape)]
+    (r0, r1), (c0, c1), (z0, z1) = box
+    (or0, oc0, oz0), data = masks.get_crop(name)
+    crop = np.zeros((r1 - r0, c1 - c0, z1 - z0), dtype=bool)
+    crop[or0 - r0:or0 - r0 + data.shape[0], oc0 - c0:oc0 - c0 + data.shape[1], oz0 - z0:oz0 - z0 + data.shape[2]] = data
+    return (r0, c0, z0), clean_crop(crop, voxel_mm3, **options)
+
+
+def clean_volume(mask, voxel_mm3=1.0, **options):
+    """전체 크기 3차원 마스크를 bounding box 안에서만 정리 (추론 결과 일괄 처리용, mask를 직접 수정)"""
+    box = _bbox(mask)
+    if box is None:
+        return mask
+    if not mask.flags.writeable: # 캐시에서 읽은 read-only 배열
+        mask = mask.copy()
+    pad = pad_for(**options)
+    region = tuple(slice(max(0, lo - pad), min(size, hi + pad)) for (lo, hi), size in zip(box, mask.shape))
+    mask[region] = clean_crop(mask[region], voxel_mm3, **options)
+    return mask
+
+
+def clean_masks(masks, voxel_mm3=1.0, **options):
+    """{ROI 이름: 3차원 마스크} 전부에 clean_volume 적용"""
+    for name in masks:
+        masks[name] = clean_volume(masks[name], voxel_mm3, **options)
+    return masks
@@ -0,0 +1,256 @@
+import numpy as np
+
+# bounding box를 넓힐 때 여유로 더 잡는 크기 (row, column, slice) -> 브러시 한번마다 재할당하지 않게
+GROW_MARGIN = (16, 16, 2)
+
+
+def _bbox(mask):
+    """boolean 배열에서 True가 있는 영역의 축별 (start, stop). 비어있으면 None"""
+    if not mask.any():
+        return None
+    box = []
+    for axis in range(mask.ndim):
+        other_axes = tuple(a for a in range(mask.ndim) if a != axis)
+        nonzero = np.flatnonzero(mask.any(axis=other_axes)) if other_axes else np.flatnonzero(mask)
+        box.append((int(nonzero[0]), int(nonzero[-1]) + 1))
+    return box
+
+
+class MaskStore:
+    """
+    장기별 3차원 boolean 마스크를 bounding box로 잘라서 저장하는 클래스 (masks_dict 대체)
+
+    ROI마다 전체 (H, W, Z) 배열 대신 마스크가 있는 영역만 들고 있어서
+    메모리가 장기 개수가 아니라 장기 크기에 비례함.
+    에디터에서는 슬라이스 단위로 get_slice / set_slice로 읽고 씀.
+    """
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        self._rois = {} # {이름: (origin(r0, c0, z0), 잘라낸 boolean 배열)}
+        self._versions = {} # {이름: 마지막으로 수정됐을 때의 편집 번호} -> 저장할 때 바뀐 ROI만 골라내기 위함
+        self._edit_count = 0
+
+    # --- dict처럼 쓰기 위한 부분 ---
+    def __contains__(self, name):
+        return name in self._rois
+
+    def __iter__(self):
+        return iter(self._rois)
+
+    def __len__(self):
+        return len(self._rois)
+
+    def keys(self):
+        return self._rois.keys()
+
+    def __getitem__(self, name):
+        return self.get_volume(name)
+
+    def __setitem__(self, name, mask):
+        self.set_volume(name, mask)
+
+    def __delitem__(self, name):
+        del self._rois[name]
+        self._versions.pop(name, None)
+
+    def items(self):
+        # 전체 크기 볼륨은 하나씩만 만들어서 넘겨줌
+        for name in list(self._rois):
+            yield name, self.get_volume(name)
+
+    def update(self, masks):
+        for name, mask in masks.items():
+            self.set_volume(name, mask)
+
+    def version(self, name):
+        """ROI가 수정될 때마다 바뀌는 값 (값이 같으면 그 사이에 수정된 적이 없음)"""
+        return self._versions.get(name)
+
+    def _touch(self, name):
+        self._edit_count += 1
+        self._versions[name] = self._edit_count
+
+    @property
+    def nbytes(self):
+        return sum(data.nbytes for _, data in self._rois.values())
+
+    # --- 3차원 단위 ---
+    def set_volume(self, name, mask):
+        self._touch(name)
+        box = _bbox(mask)
+        if box is None:
+            self._rois[name] = ((0, 0, 0), np.zeros((0, 0, 0), dtype=bool))
+            return
+        (r0, r1), (c0, c1), (z0, z1) = box
+        self._rois[name] = ((r0, c0, z0), np.ascontiguousarray(mask[r0:r1, c0:c1, z0:z1], dtype=bool))
+
+    def get_volume(self, name):
+        (r0, c0, z0), data = self._rois[name]
+        volume = np.zeros(self.shape, dtype=bool)
+        volume[r0:r0 + data.shape[0], c0:c0 + data.shape[1], z0:z0 + data.shape[2]] = data
+        return volume
+
+    def bbox(self, name):
+        """저장된 영역의 ((r0, r1), (c0, c1), (z0, z1)). 비어있으면 None"""
+        (r0, c0, z0), data = self._rois[name]
+        if data.size == 0:
+            return None
+        return ((r0, r0 + data.shape[0]), (c0, c0 + data.shape[1]), (z0, z0 + data.shape[2]))
+
+    def get_crop(self, name):
+        """저장된 그대로의 (origin(r0, c0, z0), 잘라낸 배열). 배열은 내부 데이터이므로 수정하지 말 것"""
+        return self._rois[name]
+
+    # --- 슬라이스 단위 (에디터에서 사용) ---
+    def get_slice_region(self, name, z):
+        """
+        z 슬라이스에서 저장된 영역만 반환 -> (row slice, column slice, 2차원 배열 view)
+        해당 슬라이스에 저장된 영역이 없으면 None (화면 그릴때 전체 슬라이스를 만들지 않기 위함)
+        """
+        (r0, c0, z0), data = self._rois[name]
+        if not (z0 <= z < z0 + data.shape[2]):
+            return None
+        return slice(r0, r0 + data.shape[0]), slice(c0, c0 + data.shape[1]), data[:, :, z - z0]
+
+    def get_slice(self, name, z):
+        """z 슬라이스의 (H, W) boolean 마스크 (복사본)"""
+        mask = np.zeros(self.shape[:2], dtype=bool)
+        region = self.get_slice_region(name, z)
+        if region is not None:
+            rows, cols, data = region
+            mask[rows, cols] = data
+        return mask
+
+    def get_slice_crop(self, name, z, rows, cols):
+        """z 슬라이스의 rows=(r0, r1), cols=(c0, c1) 영역만 boolean 복사본으로 반환 (전체 슬라이스를 만들지 않음)"""
+        crop = np.zeros((rows[1] - rows[0], cols[1] - cols[0]), dtype=bool)
+        region = self.get_slice_region(name, z) if name in self._rois else None
+        if region is None:
+            return crop
+        stored_rows, stored_cols, data = region
+        r0, r1 = max(rows[0], stored_rows.start), min(rows[1], stored_rows.stop)
+        c0, c1 = max(cols[0], stored_cols.start), min(cols[1], stored_cols.stop)
+        if r0 < r1 and c0 < c1:
+            crop[r0 - rows[0]:r1 - rows[0], c0 - cols[0]:c1 - cols[0]] = \
+                data[r0 - stored_rows.start:r1 - stored_rows.start, c0 - stored_cols.start:c1 - stored_cols.start]
+        return crop
+
+    def set_slice(self, name, z, mask2d):
+        """z 슬라이스를 (H, W) boolean 마스크로 교체, 필요하면 bounding box를 넓힘"""
+        if name not in self._rois:
+            self._rois[name] = ((0, 0, 0), np.zeros((0, 0, 0), dtype=bool))
+        self._touch(name)
+        box = _bbox(mask2d)
+        if box is None:
+            self._clear_slice(name, z)
+            return
+        (r0, r1), (c0, c1) = box
+        self._ensure_contains(name, (r0, r1), (c0, c1), (z, z + 1))
+        (or0, oc0, oz0), data = self._rois[name]
+        data[:, :, z - oz0] = False
+        data[r0 - or0:r1 - or0, c0 - oc0:c1 - oc0, z - oz0] = mask2d[r0:r1, c0:c1]
+
+    def clear_slice(self, name, z):
+        self._clear_slice(name, z)
+
+    def _clear_slice(self, name, z):
+        (r0, c0, z0), data = self._rois[name]
+        if not (z0 <= z < z0 + data.shape[2]):
+            return
+        self._touch(name)
+        data[:, :, z - z0] = False
+        # 가장자리 슬라이스를 지웠으면 bounding box를 다시 줄임
+        if z == z0 or z == z0 + data.shape[2] - 1:
+            self.compact(name)
+
+    # --- 여러 슬라이스 단위 (3차원 브러시, slab 편집) ---
+    def paint(self, name, origin, footprint, value=True):
+        """
+        origin (r0, c0, z0) 위치에 3차원 boolean footprint를 한번에 칠함
+        value가 True면 footprint 영역을 추가, False면 지움
+        """
+        if name not in self._rois:
+            self._rois[name] = ((0, 0, 0), np.zeros((0, 0, 0), dtype=bool))
+        box = _bbox(footprint)
+        if box is None:
+            return
+        (a0, a1), (b0, b1), (d0, d1) = box
+        footprint = footprint[a0:a1, b0:b1, d0:d1]
+        wanted = [(o + lo, o + hi) for o, (lo, hi) in zip(origin, box)]
+        self._touch(name)
+        if value:
+            self._ensure_contains(name, *wanted)
+        (or0, oc0, oz0), data = self._rois[name]
+        # 저장된 영역과 footprint가 겹치는 부분만 수정
+        dst, src = [], []
+        for (w0, w1), o, size in zip(wanted, (or0, oc0, oz0), data.shape):
+            lo, hi = max(w0, o), min(w1, o + size)
+            if lo >= hi:
+                return
+            dst.append(slice(lo - o, hi - o))
+            src.append(slice(lo - w0, hi - w0))
+        if value:
+            data[tuple(dst)] |= footprint[tuple(src)]
+        else:
+            data[tuple(dst)] &= ~footprint[tuple(src)]
+
+    def fill_slices(self, name, z0, z1, mask2d):
+        """z0 ~ z1-1 슬라이스를 모두 같은 (H, W) 마스크로 교체 (슬라이스 복사)"""
+        box = _bbox(mask2d)
+        if box is None:
+            self.set_slices(name, (0, 0, z0), np.zeros((0, 0, z1 - z0), dtype=bool))
+            return
+        (r0, r1), (c0, c1) = box
+        self.set_slices(name, (r0, c0, z0), np.broadcast_to(mask2d[r0:r1, c0:c1, None], (r1 - r0, c1 - c0, z1 - z0)))
+
+    def set_slices(self, name, origin, block):
+        """
+        origin (r0, c0, z0)부터 block.shape[2]개 슬라이스를 통째로 교체
+        block 밖의 영역은 비워짐 (슬라이스 보간처럼 여러 슬라이스를 한번에 쓸 때 사용)
+        """
+        if name not in self._rois:
+            self._rois[name] = ((0, 0, 0), np.zeros((0, 0, 0), dtype=bool))
+        self._touch(name)
+        r0, c0, z0 = origin
+        z1 = z0 + block.shape[2]
+        box = _bbox(block)
+        if box is not None:
+            (a0, a1), (b0, b1), _ = box
+            self._ensure_contains(name, (r0 + a0, r0 + a1), (c0 + b0, c0 + b1), (z0, z1))
+        (or0, oc0, oz0), data = self._rois[name]
+        k0, k1 = max(z0, oz0) - oz0, min(z1, oz0 + data.shape[2]) - oz0
+        if k0 < k1:
+            data[:, :, k0:k1] = False
+        if box is not None:
+            data[r0 + a0 - or0:r0 + a1 - or0, c0 + b0 - oc0:c0 + b1 - oc0, z0 - oz0:z1 - oz0] = block[a0:a1, b0:b1]
+        else:
+            self.compact(name)
+
+    def compact(self, name):
+        """bounding box를 실제 마스크 영역에 딱 맞게 줄임"""
+        (r0, c0, z0), data = self._rois[name]
+        box = _bbox(data)
+        if box is None:
+            self._rois[name] = ((0, 0, 0), np.zeros((0, 0, 0), dtype=bool))
+            return
+        (a0, a1), (b0, b1), (d0, d1) = box
+        self._rois[name] = ((r0 + a0, c0 + b0, z0 + d0), np.ascontiguousarray(data[a0:a1, b0:b1, d0:d1]))
+
+    def _ensure_contains(self, name, rows, cols, zs):
+        (r0, c0, z0), data = self._rois[name]
+        current = self.bbox(name)
+        wanted = (rows, cols, zs)
+        if current is not None and all(c[0] <= w[0] and w[1] <= c[1] for c, w in zip(current, wanted)):
+            return
+        # 새 영역을 포함하도록 여유를 두고 넓혀서 다시 할당
+        new_box = []
+        for axis, (w0, w1) in enumerate(wanted):
+            if current is not None:
+                w0, w1 = min(w0, current[axis][0]), max(w1, current[axis][1])
+            margin = GROW_MARGIN[axis]
+            new_box.append((max(0, w0 - margin), min(self.shape[axis], w1 + margin)))
+        (n0, n1), (m0, m1), (k0, k1) = new_box
+        new_data = np.zeros((n1 - n0, m1 - m0, k1 - k0), dtype=bool)
+        if current is not None:
+            new_data[r0 - n0:r0 - n0 + data.shape[0], c0 - m0:c0 - m0 + data.shape[1], z0 - k0:z0 - k0 + data.shape[2]] = data
+        self._rois[name] = ((n0, m0, k0), new_data)
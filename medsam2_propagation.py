@@ -0,0 +1,126 @@
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+# MedSAM2 입력 크기와 ImageNet mean/std
+IMAGE_SIZE = 512
+IMG_MEAN = (0.485, 0.456, 0.406)
+IMG_STD = (0.229, 0.224, 0.225)
+# 한번에 전처리할 슬라이스 수 (전처리 중 임시 메모리를 이 크기로 제한)
+CHUNK_SIZE = 16
+# 장기의 z 범위 바깥으로 더 전파할 슬라이스 수
+Z_MARGIN = 10
+# 마스크가 이 슬라이스 수만큼 연속으로 비어있으면 그 방향 전파를 멈춤
+STOP_AFTER_EMPTY = 3
+# device -> host로 한번에 옮기는 슬라이스 수
+TRANSFER_BATCH = 8
+
+
+def select_device(device="auto"):
+    """'auto'면 CUDA가 있으면 cuda, 없으면 cpu"""
+    if device == "auto":
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    return torch.device(device)
+
+
+def build_predictor(model_cfg, checkpoint, device):
+    # sam2는 MedSAM2 저장소를 설치해야 있으므로 쓸 때만 import
+    from sam2.build_sam import build_sam2_video_predictor_npz
+    return build_sam2_video_predictor_npz(model_cfg, checkpoint, device=device)
+
+
+def bbox_from_mask(mask2d):
+    """mask2d: (H,W) bool/0-1 -> [x_min, y_min, x_max, y_max] (원본 해상도 좌표)"""
+    ys, xs = np.where(mask2d > 0)
+    if len(xs) == 0:
+        raise ValueError("수정한 슬라이스 마스크가 비어 있습니다.")
+    return np.array([int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max())], dtype=int)
+
+
+def propagation_range(mask_zyx, z, margin=Z_MARGIN):
+    """전파할 슬라이스 범위 (z0, z1): 마스크의 z 범위와 z를 포함하고 margin만큼 넓힘"""
+    zs = np.flatnonzero(mask_zyx.reshape(mask_zyx.shape[0], -1).any(axis=1))
+    lo, hi = (min(zs[0], z), max(zs[-1], z)) if len(zs) else (z, z)
+    return max(0, lo - margin), min(mask_zyx.shape[0], hi + margin + 1)
+
+
+def preprocess_volume(vol_uint8, device, image_size=IMAGE_SIZE, chunk_size=CHUNK_SIZE):
+    """
+    (D, H, W) uint8 -> MedSAM2 입력 (D, 3, size, size) float 텐서
+
+    chunk_size장씩 device로 보내서 한번에 bilinear resize + 정규화함 (PIL로 슬라이스마다 RGB 변환하지 않음).
+    3채널은 같은 값이므로 resize는 1채널로 하고 정규화할 때만 채널별 mean/std를 적용.
+    """
+    depth = vol_uint8.shape[0]
+    mean = torch.tensor(IMG_MEAN, dtype=torch.float32, device=device)[None, :, None, None]
+    std = torch.tensor(IMG_STD, dtype=torch.float32, device=device)[None, :, None, None]
+    out = torch.empty((depth, 3, image_size, image_size), dtype=torch.float32, device=device)
+    for start in range(0, depth, chunk_size):
+        chunk = torch.from_numpy(np.ascontiguousarray(vol_uint8[start:start + chunk_size])).to(device)
+        chunk = chunk[:, None].float().div_(255.0)
+        chunk = F.interpolate(chunk, size=(image_size, image_size), mode="bilinear", align_corners=False)
+        out[start:start + chunk_size] = (chunk - mean) / std
+    return out
+
+
+def propagate_from_slice(predictor, vol_uint8, mask2d, z, device, z_range=None, chunk_size=CHUNK_SIZE,
+                         stop_after_empty=STOP_AFTER_EMPTY, transfer_batch=TRANSFER_BATCH):
+    """
+    수정한 슬라이스 z의 마스크 bounding box를 시드로 앞뒤 슬라이스로 전파
+
+    전처리한 이미지는 한번만 만들고, 방향마다 reset_state 후 시드를 다시 넣어서 전파함
+    (MedSAM2 공식 스크립트와 같음: 역방향 전파가 정방향에서 추적한 반대쪽 슬라이스를 memory로 쓰지 않게).
+
+    Args:
+        predictor: build_predictor로 만든 MedSAM2 video predictor.
+        vol_uint8 (np.ndarray): (Z, H, W) window 적용된 uint8 볼륨.
+        mask2d (np.ndarray): (H, W) 수정한 슬라이스의 마스크.
+        z (int): 수정한 슬라이스 인덱스.
+        device (torch.device): 추론할 장치 (cpu도 가능).
+        z_range (tuple): 전파할 슬라이스 범위 (z0, z1). None이면 전체.
+        chunk_size (int): 전처리할 때 한번에 처리할 슬라이스 수.
+        stop_after_empty (int): 마스크가 연속으로 이만큼 비면 그 방향 전파 중단 (None이면 끝까지).
+        transfer_batch (int): 결과 마스크를 device에서 모아뒀다가 한번에 옮길 슬라이스 수.
+    Returns:
+        np.ndarray: (Z, H, W) uint8 전파된 마스크 (z_range 밖은 0).
+    """
+    depth, height, width = vol_uint8.shape
+    z0, z1 = z_range if z_range is not None else (0, depth)
+    images = preprocess_volume(vol_uint8[z0:z1], device, chunk_size=chunk_size)
+    bbox = bbox_from_mask(mask2d)
+
+    segs_3D = np.zeros((depth, height, width), dtype=np.uint8)
+    # cpu에서도 bfloat16 autocast 사용 가능
+    with torch.inference_mode(), torch.autocast(device.type, dtype=torch.bfloat16):
+        state = predictor.init_state(images, height, width)
+        for reverse in (False, True):
+            if reverse:
+                predictor.reset_state(state)
+            predictor.add_new_points_or_box(inference_state=state, frame_idx=z - z0, obj_id=1, box=bbox)
+            _propagate_direction(predictor, state, reverse, segs_3D[z0:z1], stop_after_empty, transfer_batch)
+    return segs_3D
+
+
+def _propagate_direction(predictor, state, reverse, segs_3D, stop_after_empty, transfer_batch):
+    # 결과는 device에 모아뒀다가 transfer_batch장씩 옮김 -> 마스크 전체를 슬라이스마다 옮기지 않음
+    # 빈 슬라이스 확인은 device에서 any()한 bool 하나만 읽어서 매 슬라이스마다 함 (멈출 조건을 넘겨서 더 전파하지 않게)
+    frame_ids, masks = [], []
+    empty_run = 0
+
+    def flush():
+        segs_3D[frame_ids] |= torch.stack(masks).cpu().numpy().astype(np.uint8)
+        frame_ids.clear()
+        masks.clear()
+
+    for out_frame_idx, _, out_mask_logits in predictor.propagate_in_video(state, reverse=reverse):
+        mask = out_mask_logits[0, 0] > 0.0
+        frame_ids.append(out_frame_idx)
+        masks.append(mask)
+        if len(masks) >= transfer_batch:
+            flush()
+        if stop_after_empty is not None:
+            empty_run = 0 if bool(mask.any()) else empty_run + 1
+            if empty_run >= stop_after_empty:
+                break
+    if masks:
+        flush()
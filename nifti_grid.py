@@ -0,0 +1,77 @@
+import numpy as np
+import nibabel as nib
+from scipy.ndimage import affine_transform
+
+# DICOM 환자좌표계(LPS) <-> NIfTI 좌표계(RAS)
+LPS_TO_RAS = np.diag([-1.0, -1.0, 1.0, 1.0])
+
+
+def editor_grid_affine(d2_slices):
+    """
+    에디터 볼륨 (H, W, Z) = (row, column, slice) 인덱스를 RAS 좌표로 바꾸는 4x4 affine
+
+    Args:
+        d2_slices (list): z축 기준으로 정렬된 pydicom Dataset 리스트 (헤더만 있어도 됨).
+    """
+    first = d2_slices[0]
+    orientation = np.array(first.ImageOrientationPatient, dtype=float)
+    row_cosine, col_cosine = orientation[:3], orientation[3:]
+    row_spacing, col_spacing = (float(v) for v in first.PixelSpacing)
+    origin = np.array(first.ImagePositionPatient, dtype=float)
+
+    if len(d2_slices) > 1:
+        last = np.array(d2_slices[-1].ImagePositionPatient, dtype=float)
+        slice_step = (last - origin) / (len(d2_slices) - 1)
+    else:
+        slice_step = np.cross(row_cosine, col_cosine) * float(first.get('SliceThickness', 1.0) or 1.0)
+
+    affine = np.eye(4)
+    affine[:3, 0] = col_cosine * row_spacing # row 인덱스가 늘어나는 방향
+    affine[:3, 1] = row_cosine * col_spacing # column 인덱스가 늘어나는 방향
+    affine[:3, 2] = slice_step
+    affine[:3, 3] = origin
+    return LPS_TO_RAS @ affine
+
+
+def volume_to_nifti(ct_volume, d2_slices, slope, intercept):
+    """
+    에디터 볼륨을 HU 값의 메모리상 NIfTI 이미지로 만듦 (파일로 저장하지 않음)
+
+    정수 변환이면 int16으로 저장하되, uint16 원본값(예: intercept -1024)이 int16 범위를 넘지 않게
+    int32로 더한 뒤 int16 범위로 잘라서 변환함.
+    """
+    if float(slope) == 1.0 and float(intercept).is_integer():
+        hu = np.clip(ct_volume.astype(np.int32) + int(intercept), -32768, 32767).astype(np.int16)
+    else:
+        hu = (ct_volume * np.float32(slope) + np.float32(intercept)).astype(np.float32)
+    return nib.Nifti1Image(hu, editor_grid_affine(d2_slices))
+
+
+def labels_to_grid(seg_data, seg_affine, grid_affine, grid_shape):
+    """
+    다른 affine을 가진 label 볼륨을 에디터 grid (H, W, Z)로 옮김
+
+    같은 시리즈에서 나온 결과라서 대부분 축 순서/뒤집기만 다르므로 그 경우는 transpose/flip만 하고,
+    아니면 nearest neighbour로 리샘플링함.
+    """
+    grid_to_seg = np.linalg.inv(seg_affine) @ grid_affine
+    rotation, offset = grid_to_seg[:3, :3], grid_to_seg[:3, 3]
+
+    perm = np.argmax(np.abs(rotation), axis=0) # grid 축별로 대응되는 seg 축
+    if sorted(perm) == [0, 1, 2]:
+        scales = rotation[perm, [0, 1, 2]]
+        is_permutation = np.allclose(np.abs(rotation), np.abs(rotation) * (np.abs(rotation) > 0.5), atol=1e-3) \
+            and np.allclose(np.abs(scales), 1.0, atol=1e-3)
+        if is_permutation:
+            data = np.transpose(seg_data, perm)
+            fits = data.shape == tuple(grid_shape)
+            for axis in range(3):
+                expected = 0.0 if scales[axis] > 0 else data.shape[axis] - 1
+                fits = fits and abs(offset[perm[axis]] - expected) < 0.5
+            if fits:
+                flips = tuple(axis for axis in range(3) if scales[axis] < 0)
+                if flips:
+                    data = np.flip(data, axis=flips)
+                return np.ascontiguousarray(data)
+
+    return affine_transform(seg_data, rotation, offset=offset, output_shape=tuple(grid_shape), order=0, mode='constant', cval=0)
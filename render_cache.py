@@ -0,0 +1,77 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+def composite_region(ct_slice, masks, active_rois, roi_colors, z, rows, cols):
+    """
+    CT 슬라이스의 (rows, cols) 영역에 보이는 ROI들을 반투명하게 합성한 RGB 배열을 반환
+
+    Args:
+        ct_slice (np.ndarray): (H, W) uint8 화면용 CT 슬라이스.
+        masks (MaskStore): ROI별 마스크 저장소.
+        active_rois (list): 화면에 표시할 ROI 이름들 (이 순서대로 덮어씀).
+        roi_colors (dict): {ROI 이름: [R, G, B]}.
+        z (int): 슬라이스 인덱스.
+        rows, cols (slice): 합성할 영역 (start, stop이 정수인 slice).
+    """
+    region = np.repeat(ct_slice[rows, cols, None], 3, axis=2)
+    for roi_name in active_rois:
+        stored = masks.get_slice_region(roi_name, z)
+        if stored is None:
+            continue
+        mask_rows, mask_cols, mask = stored
+        # 합성할 영역과 ROI가 저장된 영역이 겹치는 부분만 계산
+        r0, r1 = max(rows.start, mask_rows.start), min(rows.stop, mask_rows.stop)
+        c0, c1 = max(cols.start, mask_cols.start), min(cols.stop, mask_cols.stop)
+        if r0 >= r1 or c0 >= c1:
+            continue
+        sub_mask = mask[r0 - mask_rows.start:r1 - mask_rows.start, c0 - mask_cols.start:c1 - mask_cols.start]
+        target = region[r0 - rows.start:r1 - rows.start, c0 - cols.start:c1 - cols.start]
+        target[sub_mask] = (target[sub_mask] * 0.5 + np.array(roi_colors[roi_name]) * 0.5).astype(np.uint8)
+    return region
+
+
+class SliceRenderCache:
+    """
+    슬라이스별로 CT + ROI 오버레이 합성 결과(base layer)를 캐시하는 클래스
+
+    view_key (윈도우, 보이는 ROI 목록, 색상 등)가 바뀌면 전체를 버리고,
+    마스크를 수정한 슬라이스는 invalidate()로 버리거나 refresh_region()으로 수정된 영역만 다시 합성함.
+    최근에 본 슬라이스 max_slices개만 들고 있음.
+    """
+    def __init__(self, max_slices=8):
+        self.max_slices = max_slices
+        self._view_key = None
+        self._layers = OrderedDict() # {z: (H, W, 3) uint8}
+
+    def set_view_key(self, view_key):
+        if view_key != self._view_key:
+            self._view_key = view_key
+            self._layers.clear()
+
+    def invalidate(self, z=None):
+        if z is None:
+            self._layers.clear()
+        else:
+            self._layers.pop(z, None)
+
+    def base_layer(self, z, compose):
+        """
+        z 슬라이스의 합성 결과. 캐시에 없으면 compose(rows, cols)로 전체 슬라이스를 합성해서 저장
+        반환된 배열은 캐시 그 자체이므로 수정하지 말고 필요하면 복사해서 사용
+        """
+        layer = self._layers.get(z)
+        if layer is None:
+            layer = compose(None, None)
+            self._layers[z] = layer
+            while len(self._layers) > self.max_slices:
+                self._layers.popitem(last=False)
+        self._layers.move_to_end(z)
+        return layer
+
+    def refresh_region(self, z, rows, cols, compose):
+        """캐시된 z 슬라이스에서 (rows, cols) 영역만 다시 합성 (지우개처럼 일부만 바뀐 경우)"""
+        layer = self._layers.get(z)
+        if layer is not None:
+            layer[rows, cols] = compose(rows, cols)
@@ -0,0 +1,116 @@
+import hashlib
+
+import numpy as np
+from scipy.ndimage import binary_fill_holes
+from pydicom.dataset import Dataset
+from pydicom.sequence import Sequence
+from rt_utils import ds_helper, image_helper
+from rt_utils.rtstruct import RTStruct
+from rt_utils.utils import ROIData
+
+from mask_store import _bbox
+
+
+def _slice_signature(mask2d, r0, c0):
+    """슬라이스 마스크의 위치 + 내용으로 만든 값. 이전 저장 때와 같으면 contour를 다시 구하지 않음"""
+    box = _bbox(mask2d)
+    if box is None:
+        return None
+    (a0, a1), (b0, b1) = box
+    digest = hashlib.blake2b(np.packbits(mask2d[a0:a1, b0:b1]).tobytes(), digest_size=16)
+    digest.update(np.array([r0 + a0, r0 + a1, c0 + b0, c0 + b1], dtype=np.int64).tobytes())
+    return digest.digest()
+
+
+class RTStructWriter:
+    """
+    MaskStore의 ROI들을 RTSTRUCT 파일로 저장하는 클래스 (save_mask에서 사용)
+
+    RTStructBuilder.create_new처럼 DICOM 시리즈를 다시 읽지 않고 이미 읽어둔 헤더(d2_slices)를 사용함.
+    ROI별로 마지막 저장 때의 슬라이스별 contour를 들고 있다가
+    MaskStore.version()이 그대로인 ROI는 contour를 그대로 재사용하고,
+    수정된 ROI도 hole filling 결과가 달라진 슬라이스만 다시 contour를 구함.
+    """
+    def __init__(self, d2_slices):
+        self.series_data = d2_slices
+        self._pixel_to_patient = image_helper.get_pixel_to_patient_transformation_matrix(d2_slices)
+        self._rois = {} # {ROI 이름: (저장할 때의 version, {z: (signature, [contour Dataset])})}
+
+    def write(self, masks, file_path, roi_name_format="{}_modified"):
+        """
+        masks의 모든 ROI를 RTSTRUCT로 저장
+
+        Args:
+            masks (MaskStore): 저장할 ROI 마스크들.
+            file_path (str): 저장할 파일 경로.
+            roi_name_format (str): RTSTRUCT에 기록할 ROI 이름 형식.
+        Returns:
+            dict: {'contoured': 새로 contour를 구한 슬라이스 수, 'reused': 재사용한 슬라이스 수}.
+        """
+        ds = ds_helper.create_rtstruct_dataset(self.series_data)
+        rtstruct = RTStruct(self.series_data, ds)
+        stats = {'contoured': 0, 'reused': 0}
+
+        for number, name in enumerate(masks.keys(), start=1):
+            slices = self._roi_slices(masks, name, stats)
+            roi_data = ROIData(None, None, number, roi_name_format.format(name), rtstruct.frame_of_reference_uid)
+
+            roi_contour = Dataset()
+            roi_contour.ROIDisplayColor = roi_data.color
+            roi_contour.ContourSequence = Sequence([contour for z in sorted(slices) for contour in slices[z][1]])
+            roi_contour.ReferencedROINumber = str(number)
+            ds.ROIContourSequence.append(roi_contour)
+            ds.StructureSetROISequence.append(ds_helper.create_structure_set_roi(roi_data))
+            ds.RTROIObservationsSequence.append(ds_helper.create_rtroi_observation(roi_data))
+
+        # 지워진 ROI는 더 들고 있을 필요 없음
+        for name in list(self._rois):
+            if name not in masks:
+                del self._rois[name]
+
+        rtstruct.save(file_path)
+        return stats
+
+    def _roi_slices(self, masks, name, stats):
+        version = masks.version(name)
+        cached = self._rois.get(name)
+        if cached is not None and cached[0] == version:
+            stats['reused'] += len(cached[1])
+            return cached[1]
+
+        old_slices = cached[1] if cached is not None else {}
+        slices = {}
+        (r0, c0, z0), data = masks.get_crop(name)
+        if data.size:
+            # bounding box 밖은 전부 배경이라 잘라낸 영역에서 hole filling해도 전체 볼륨에서 한 것과 같음
+            filled = binary_fill_holes(data)
+            for k in range(filled.shape[2]):
+                signature = _slice_signature(filled[:, :, k], r0, c0)
+                if signature is None:
+                    continue
+                z = z0 + k
+                old = old_slices.get(z)
+                if old is not None and old[0] == signature:
+                    slices[z] = old
+                    stats['reused'] += 1
+                else:
+                    slices[z] = (signature, self._slice_contours(filled[:, :, k], r0, c0, z))
+                    stats['contoured'] += 1
+
+        self._rois[name] = (version, slices)
+        return slices
+
+    def _slice_contours(self, mask2d, r0, c0, z):
+        # rt_utils의 get_contours_coords와 같은 방식이지만 잘라낸 영역에서만 contour를 구함
+        padded = np.pad(mask2d, 1) # 잘라낸 경계에 닿은 contour도 원본과 같게 나오도록 1픽셀 여백
+        contours, _ = image_helper.find_mask_contours(padded, approximate_contours=True)
+        image_helper.validate_contours(contours)
+
+        series_slice = self.series_data[z]
+        dicom_contours = []
+        for contour in contours:
+            points = np.array(contour, dtype=float) + np.array([c0 - 1, r0 - 1]) # (x, y) = (column, row)
+            points = np.concatenate((points, np.full((len(points), 1), z)), axis=1)
+            patient_points = image_helper.apply_transformation_to_3d_points(points, self._pixel_to_patient)
+            dicom_contours.append(ds_helper.create_contour(series_slice, np.ravel(patient_points).tolist()))
+        return dicom_contours
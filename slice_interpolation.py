@@ -0,0 +1,77 @@
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+
+# key 슬라이스들의 bounding box 바깥으로 더 계산하는 여유 (pixel)
+INTERPOLATION_MARGIN = 2
+# 사이 슬라이스에 이미 마스크가 있어도 보간으로 덮어쓰는 최대 간격 (사이 슬라이스 수)
+# 이보다 먼 key 슬라이스 사이는 사이 슬라이스가 모두 비어있을 때만 보간 -> 모델 분할 결과를 덮어쓰지 않게
+MAX_INTERPOLATION_GAP = 8
+
+
+def signed_distance(mask2d):
+    """마스크 경계까지의 거리 (안쪽은 음수, 바깥쪽은 양수)"""
+    return distance_transform_edt(~mask2d) - distance_transform_edt(mask2d)
+
+
+def _has_mask_between(masks, name, za, zb):
+    # za, zb 사이 (둘 다 제외) 슬라이스 중 마스크가 있는 슬라이스가 있는지
+    for z in range(za + 1, zb):
+        region = masks.get_slice_region(name, z)
+        if region is not None and region[2].any():
+            return True
+    return False
+
+
+def interpolate_key_slices(masks, name, key_zs, margin=INTERPOLATION_MARGIN, max_gap=MAX_INTERPOLATION_GAP):
+    """
+    사용자가 수정한 key 슬라이스들 사이의 슬라이스를 signed distance 보간으로 채운 마스크를 계산
+
+    인접한 key 슬라이스 두 장의 signed distance를 z 위치에 따라 선형으로 섞고 0보다 작은 곳을 마스크로 봄.
+    key 슬라이스들의 bounding box 영역에서만 계산하고, 비어있는 key 슬라이스는 사용하지 않음.
+    보간 결과는 사이 슬라이스를 통째로 교체하므로, 사이 슬라이스 수가 max_gap보다 많은 구간은
+    사이 슬라이스가 모두 비어있을 때만 보간함 (멀리 떨어진 두 수정 사이의 분할 결과를 지우지 않게).
+
+    Args:
+        masks (MaskStore): ROI 마스크 저장소.
+        name (str): 보간할 ROI 이름.
+        key_zs (iterable): key 슬라이스 인덱스들.
+        margin (int): bounding box 바깥으로 더 계산할 여유.
+        max_gap (int): 마스크가 있는 사이 슬라이스를 덮어써도 되는 최대 사이 슬라이스 수 (None이면 제한 없음).
+    Returns:
+        list: [(origin(r0, c0, z0), (h, w, n) boolean block), ...] key 슬라이스 사이 구간마다 하나.
+            MaskStore.set_slices / EditJournal.set_slices에 그대로 넘기면 됨.
+    """
+    if name not in masks:
+        return []
+    keys = {}
+    for z in sorted(set(key_zs)):
+        region = masks.get_slice_region(name, z)
+        if region is not None and region[2].any():
+            keys[z] = region
+    if len(keys) < 2:
+        return []
+
+    # 모든 key 슬라이스의 저장 영역을 합친 범위 (+ margin)
+    h, w = masks.shape[:2]
+    r0 = max(0, min(rows.start for rows, _, _ in keys.values()) - margin)
+    r1 = min(h, max(rows.stop for rows, _, _ in keys.values()) + margin)
+    c0 = max(0, min(cols.start for _, cols, _ in keys.values()) - margin)
+    c1 = min(w, max(cols.stop for _, cols, _ in keys.values()) + margin)
+
+    distances = {}
+    for z, (rows, cols, data) in keys.items():
+        crop = np.zeros((r1 - r0, c1 - c0), dtype=bool)
+        crop[rows.start - r0:rows.stop - r0, cols.start - c0:cols.stop - c0] = data
+        distances[z] = signed_distance(crop).astype(np.float32)
+
+    blocks = []
+    key_list = sorted(distances)
+    for za, zb in zip(key_list[:-1], key_list[1:]):
+        if zb - za < 2:
+            continue
+        if max_gap is not None and zb - za - 1 > max_gap and _has_mask_between(masks, name, za, zb):
+            continue
+        t = ((np.arange(za + 1, zb) - za) / (zb - za)).astype(np.float32)
+        block = (1 - t) * distances[za][:, :, None] + t * distances[zb][:, :, None] < 0
+        blocks.append(((r0, c0, za + 1), block))
+    return blocks
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from pydicom.dataset import FileDataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, CTImageStorage, generate_uid
+
+# 저장소 루트 모듈과 GT_TEST 스크립트(서로 이름으로 import함)를 테스트에서 import할 수 있게
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "GT_TEST")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def write_ct_slice(path, z_position, instance_number, series_uid, pixels, acquisition=None, spacing=(0.8, 0.8)):
+    """테스트용 CT 슬라이스 하나를 비압축 DICOM으로 저장"""
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = CTImageStorage
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds = FileDataset(path, {}, file_meta=meta, preamble=b"\0" * 128)
+    ds.SOPClassUID, ds.SOPInstanceUID = CTImageStorage, meta.MediaStorageSOPInstanceUID
+    ds.SeriesInstanceUID = series_uid
+    ds.Modality = "CT"
+    ds.InstanceNumber = instance_number
+    if acquisition is not None:
+        ds.AcquisitionNumber = acquisition
+    ds.ImagePositionPatient = [0.0, 0.0, float(z_position)]
+    ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+    ds.PixelSpacing = list(spacing)
+    ds.Rows, ds.Columns = pixels.shape
+    ds.SamplesPerPixel, ds.PhotometricInterpretation = 1, "MONOCHROME2"
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit, ds.PixelRepresentation = 16, 16, 15, 0
+    ds.RescaleSlope, ds.RescaleIntercept = 1, -1024
+    ds.PixelData = pixels.astype(np.uint16).tobytes()
+    ds.save_as(path, enforce_file_format=True)
+    return path
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
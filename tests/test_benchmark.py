@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+# Front_UI (TotalSegmentator, tkinterdnd2)를 import할 수 없는 환경이면 건너뜀
+benchmark = pytest.importorskip("benchmark")
+
+DICOM_DIR = os.path.join(ROOT, "GT_TEST", "DCM")
+
+
+def _run(monkeypatch, tmp_path, *args):
+    output = tmp_path / "bench.json"
+    monkeypatch.setattr(sys, "argv", ["benchmark.py", "--repeat", "1", "--output", str(output), *args])
+    benchmark.main()
+    with open(output, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_synthetic_mode(monkeypatch, tmp_path):
+    report = _run(monkeypatch, tmp_path, "--dicom", "", "--synthetic", "48x48x8")
+    results = report["datasets"]["synthetic_48x48x8"]
+    assert results["shape"] == [48, 48, 8]
+    for name in ("dicom_to_np_cold", "paint_stroke", "release_stroke", "save_mask_cold", "get_mask_From_rtstruct"):
+        assert results[name]["median"] >= 0
+
+
+@pytest.mark.skipif(not os.path.isdir(DICOM_DIR), reason="GT_TEST/DCM 없음")
+def test_dicom_mode(monkeypatch, tmp_path):
+    report = _run(monkeypatch, tmp_path, "--dicom", DICOM_DIR)
+    results = report["datasets"]["DCM"]
+    assert results["save_mask_unchanged"]["median"] >= 0
+    assert results["update_plot_cached"]["median"] >= 0
+
+
+def test_shortcuts_ignored_while_typing_in_entry(tmp_path):
+    import tkinter as tk
+    editor = benchmark.headless_editor(str(tmp_path))
+    editor._update_plot = lambda: None
+    editor._copy_slice_to_slab = editor._interpolate_key_slices = lambda: pytest.fail("검색어 입력이 단축키로 처리됨")
+    entry = tk.Entry.__new__(tk.Entry) # isinstance 확인용 (Tk 창 없이)
+
+    for key in "kidneyiliac[]":
+        keysym = {"[": "bracketleft", "]": "bracketright"}.get(key, key)
+        event = type('Event', (), {'keysym': keysym, 'widget': entry})()
+        editor._on_d_press(event)
+        editor._on_key_press(event)
+    assert (editor.brush_shape, editor.slab_depth, editor.d_key_pressed) == ("square", 0, False)
+
+    # 캔버스에서 누르면 그대로 단축키
+    event = type('Event', (), {'keysym': 'b', 'widget': editor.canvas})()
+    editor._on_key_press(event)
+    assert editor.brush_shape != "square"
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from brush_stroke import rasterize_stroke, close_stroke, slab_footprint, StrokeBuffer, _segment_points
+
+
+def _stamp(points, radius, shape, brush_shape):
+    # 기준 구현: 1픽셀 간격의 모든 중심점마다 브러시를 찍음
+    h, w = shape
+    rows, cols = np.ogrid[:h, :w]
+    mask = np.zeros(shape, dtype=bool)
+    for y, x in _segment_points(points):
+        if brush_shape == "round":
+            mask |= (rows - y) ** 2 + (cols - x) ** 2 <= radius ** 2
+        else:
+            mask |= (np.abs(rows - y) <= radius) & (np.abs(cols - x) <= radius)
+    return mask
+
+
+def _full(painted, shape):
+    mask = np.zeros(shape, dtype=bool)
+    if painted is not None:
+        rows, cols, data = painted
+        mask[rows, cols] = data
+    return mask
+
+
+@pytest.mark.parametrize("brush_shape", ["square", "round"])
+@pytest.mark.parametrize("radius", [0, 1, 4])
+def test_rasterize_matches_per_point_stamping(brush_shape, radius, rng):
+    shape = (60, 70)
+    points = [tuple(p) for p in rng.integers(-5, 75, size=(6, 2))]
+    painted = rasterize_stroke(points, radius, shape, brush_shape)
+    np.testing.assert_array_equal(_full(painted, shape), _stamp(points, radius, shape, brush_shape))
+
+
+def test_rasterize_outside_image_returns_none():
+    assert rasterize_stroke([(-50, -50), (-40, -60)], 3, (20, 20)) is None
+
+
+def test_segment_points_has_no_gaps():
+    samples = _segment_points([(0, 0), (0, 9), (7, 2)])
+    steps = np.abs(np.diff(samples, axis=0)).max(axis=1)
+    assert steps.max() <= 1
+    assert tuple(samples[0]) == (0, 0) and tuple(samples[-1]) == (7, 2)
+
+
+def test_stroke_buffer_connects_frames():
+    buffer = StrokeBuffer()
+    buffer.start(0, 0)
+    buffer.add(0, 5)
+    first = buffer.take()
+    buffer.add(5, 5)
+    second = buffer.take()
+    assert first == [(0, 0), (0, 5)]
+    assert second == [(0, 5), (5, 5)] # 이전 프레임의 마지막 점부터 이어짐
+    assert buffer.take() == []
+    buffer.reset()
+    assert buffer.take() == []
+
+
+def test_close_stroke_fills_the_loop_but_keeps_existing_holes():
+    mask = np.zeros((80, 80), dtype=bool)
+    mask[5:25, 5:25] = True
+    mask[12:18, 12:18] = False # 원래 있던 구멍 (혈관 내강 같은)
+    stroke = np.zeros_like(mask)
+    stroke[40:60, 40] = stroke[40:60, 60] = stroke[40, 40:61] = stroke[59, 40:61] = True
+
+    result = close_stroke(mask, stroke)
+
+    assert result[41:59, 41:60].all() # 선으로 닫은 영역은 채움
+    assert not result[12:18, 12:18].any() # stroke에 닿지 않은 구멍은 그대로
+    assert (result & ~stroke & ~mask).sum() == 18 * 19
+
+
+def test_close_stroke_without_loop_only_adds_the_line():
+    mask = np.zeros((30, 30), dtype=bool)
+    stroke = np.zeros_like(mask)
+    stroke[10, 5:20] = True
+    np.testing.assert_array_equal(close_stroke(mask, stroke), stroke)
+
+
+def test_slab_footprint_cylinder_and_sphere():
+    footprint = np.zeros((11, 11), dtype=bool)
+    footprint[1:10, 1:10] = True
+    dzs = np.arange(-3, 4)
+
+    cylinder = slab_footprint(footprint, dzs, 3, 4)
+    assert cylinder.shape == (11, 11, 7)
+    assert all(np.array_equal(cylinder[:, :, k], footprint) for k in range(7))
+
+    sphere = slab_footprint(footprint, dzs, 3, 4, taper=True)
+    areas = sphere.sum(axis=(0, 1))
+    assert areas[3] == footprint.sum() # 현재 슬라이스는 그대로
+    assert list(areas[:4]) == sorted(areas[:4]) and areas[0] < areas[3] # 멀어질수록 작아짐
+    np.testing.assert_array_equal(areas, areas[::-1])
@@ -0,0 +1,86 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+from pydicom.uid import generate_uid
+
+import dicom_loader
+from conftest import ROOT, write_ct_slice
+from dicom_loader import read_series_headers, load_series_volume
+
+DICOM_DIR = os.path.join(ROOT, "GT_TEST", "DCM") # JPEG 2000 압축 시리즈
+
+
+def _slice(z):
+    return np.full((4, 5), z, dtype=np.uint16)
+
+
+def test_headers_sorted_and_volume_stacked(tmp_path):
+    uid = generate_uid()
+    for i, z in enumerate([3, 1, 2, 0]):
+        write_ct_slice(str(tmp_path / f"s{i}.dcm"), z * 2.5, i + 1, uid, _slice(z))
+
+    headers = read_series_headers(str(tmp_path))
+    volume = load_series_volume(headers)
+
+    assert [float(ds.ImagePositionPatient[2]) for ds in headers] == [0, 2.5, 5, 7.5]
+    assert volume.shape == (4, 5, 4)
+    assert [int(volume[0, 0, z]) for z in range(4)] == [0, 1, 2, 3]
+
+
+def test_multiple_acquisitions_are_not_interleaved(tmp_path):
+    # 같은 시리즈에 5mm (2장)와 2.5mm (4장) 재구성이 같이 있는 경우 (GT_TEST/DCM과 같은 구성)
+    uid = generate_uid()
+    for i in range(2):
+        write_ct_slice(str(tmp_path / f"a{i}.dcm"), i * 5.0, i + 1, uid, _slice(100 + i), acquisition=1)
+    for i in range(4):
+        write_ct_slice(str(tmp_path / f"b{i}.dcm"), i * 2.5, 10 + i, uid, _slice(i), acquisition=2)
+
+    largest = read_series_headers(str(tmp_path))
+    assert {str(ds.AcquisitionNumber) for ds in largest} == {"2"}
+    assert len(largest) == 4
+
+    chosen = read_series_headers(str(tmp_path), acquisition=1)
+    assert [int(ds.InstanceNumber) for ds in chosen] == [1, 2]
+
+
+def test_duplicate_position_keeps_lowest_instance_number(tmp_path):
+    uid = generate_uid()
+    write_ct_slice(str(tmp_path / "a.dcm"), 0.0, 1, uid, _slice(0))
+    write_ct_slice(str(tmp_path / "b.dcm"), 2.5, 3, uid, _slice(30))
+    write_ct_slice(str(tmp_path / "c.dcm"), 2.5, 2, uid, _slice(20))
+
+    headers = read_series_headers(str(tmp_path))
+    volume = load_series_volume(headers)
+
+    assert [int(ds.InstanceNumber) for ds in headers] == [1, 2]
+    assert os.path.basename(headers[1].filename) == "c.dcm"
+    assert int(volume[0, 0, 1]) == 20
+
+
+@pytest.mark.skipif(not os.path.isdir(DICOM_DIR), reason="GT_TEST/DCM 없음")
+def test_process_pool_does_not_fork_while_another_thread_holds_a_lock(monkeypatch):
+    headers = read_series_headers(DICOM_DIR)[:12]
+    methods = []
+    original = dicom_loader._process_context
+
+    def recording_context():
+        context = original()
+        methods.append(context.get_start_method())
+        return context
+
+    monkeypatch.setattr(dicom_loader, "_process_context", recording_context)
+
+    # 추론 thread처럼 lock을 잡고 있는 thread가 있어도 process pool 디코딩이 끝나야 함
+    lock, release = threading.Lock(), threading.Event()
+    holder = threading.Thread(target=lambda: lock.acquire() and release.wait(), daemon=True)
+    holder.start()
+    try:
+        pooled = load_series_volume(headers, max_workers=2)
+    finally:
+        release.set()
+        holder.join()
+
+    assert methods and methods[0] != "fork"
+    np.testing.assert_array_equal(pooled, load_series_volume(headers, max_workers=1)) # thread 경로와 같은 결과
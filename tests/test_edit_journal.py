@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from mask_store import MaskStore
+from edit_journal import EditJournal
+
+SHAPE = (48, 56, 16)
+NAMES = ("liver", "spleen")
+
+
+def _random_edit(journal, rng):
+    # 에디터가 쓰는 수정 종류를 골고루 (set_slice, clear_slice, paint, fill_slices, set_slices)
+    name = NAMES[int(rng.integers(0, len(NAMES)))]
+    z = int(rng.integers(0, SHAPE[2] - 4))
+    kind = int(rng.integers(0, 5))
+    if kind == 0:
+        mask2d = np.zeros(SHAPE[:2], dtype=bool)
+        r, c = int(rng.integers(0, SHAPE[0] - 12)), int(rng.integers(0, SHAPE[1] - 12))
+        mask2d[r:r + int(rng.integers(1, 12)), c:c + int(rng.integers(1, 12))] = True
+        journal.set_slice(name, z, mask2d)
+    elif kind == 1:
+        if name in journal.masks:
+            journal.clear_slice(name, z)
+    elif kind == 2:
+        footprint = rng.random((7, 7, 3)) < 0.6
+        r, c = int(rng.integers(0, SHAPE[0] - 7)), int(rng.integers(0, SHAPE[1] - 7))
+        journal.paint(name, (r, c, z), footprint, bool(rng.integers(0, 2)))
+    elif kind == 3:
+        if name in journal.masks:
+            journal.fill_slices(name, z, z + 3, journal.masks.get_slice(name, int(rng.integers(0, SHAPE[2]))))
+    else:
+        block = rng.random((9, 9, 4)) < 0.5
+        r, c = int(rng.integers(0, SHAPE[0] - 9)), int(rng.integers(0, SHAPE[1] - 9))
+        journal.set_slices(name, (r, c, z), block)
+
+
+def _snapshot(masks):
+    # 없는 ROI와 빈 ROI는 같은 상태로 봄
+    return {name: masks[name] if name in masks else np.zeros(SHAPE, dtype=bool) for name in NAMES}
+
+
+def _assert_same(masks, snapshot):
+    for name in NAMES:
+        np.testing.assert_array_equal(_snapshot(masks)[name], snapshot[name])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_undo_redo_round_trip(seed):
+    rng = np.random.default_rng(seed)
+    masks = MaskStore(SHAPE)
+    journal = EditJournal(masks)
+    snapshots = [_snapshot(masks)]
+    for _ in range(400):
+        grouped = rng.random() < 0.3
+        if grouped: # stroke처럼 여러 수정을 하나의 undo 단위로
+            journal.begin()
+            for _ in range(int(rng.integers(2, 5))):
+                _random_edit(journal, rng)
+            journal.commit()
+        else:
+            _random_edit(journal, rng)
+        current = _snapshot(masks)
+        if all(np.array_equal(current[n], snapshots[-1][n]) for n in NAMES):
+            continue # 아무것도 안 바뀐 수정은 undo 단위가 생기지 않음
+        snapshots.append(current)
+
+    for expected in reversed(snapshots[:-1]):
+        assert journal.undo()
+        _assert_same(masks, expected)
+    assert not journal.can_undo()
+    for expected in snapshots[1:]:
+        assert journal.redo()
+        _assert_same(masks, expected)
+
+
+def test_pending_memory_scales_with_edit_size():
+    masks = MaskStore((512, 512, 200))
+    journal = EditJournal(masks)
+    journal.set_slices("liver", (100, 100, 0), np.ones((40, 40, 200), dtype=bool))
+
+    journal.begin()
+    journal.paint("liver", (300, 300, 50), np.ones((5, 5, 7), dtype=bool))
+    pending = sum(before.nbytes for _, _, before in journal._pending.values())
+    assert pending == 5 * 5 * 7 # 슬라이스 전체(512x512)가 아니라 footprint 영역만
+    journal.commit()
+
+    (r0, r1), (c0, c1), _ = masks.bbox("liver")
+    journal.begin()
+    journal.set_slices("liver", (110, 110, 0), np.ones((10, 10, 200), dtype=bool))
+    pending = sum(before.nbytes for _, _, before in journal._pending.values())
+    assert pending == 200 * (r1 - r0) * (c1 - c0) # 슬라이스를 교체하는 수정은 저장된 ROI 영역만큼
+    assert pending < 200 * 512 * 512 // 4
+    journal.commit()
+    journal.undo()
+    assert masks["liver"][100:140, 100:140, :].all()
+
+
+def test_grouped_touches_extend_the_recorded_region():
+    masks = MaskStore((32, 32, 4))
+    journal = EditJournal(masks)
+    journal.begin()
+    journal.paint("a", (2, 2, 1), np.ones((3, 3, 1), dtype=bool))
+    journal.paint("a", (20, 20, 1), np.ones((3, 3, 1), dtype=bool))
+    journal.paint("a", (3, 3, 1), np.ones((2, 2, 1), dtype=bool), value=False)
+    assert journal.commit() == [("a", 1)]
+    journal.undo()
+    assert not masks["a"].any()
+    journal.redo()
+    assert masks["a"][2, 2, 1] and not masks["a"][3, 3, 1] and masks["a"][21, 21, 1]
@@ -0,0 +1,100 @@
+import os
+import stat
+import shutil
+import tempfile
+
+import numpy as np
+import pytest
+
+from inference_cache import InferenceCache, SHARED_ROOT_MODE, SHARED_DIR_MODE
+
+SHAPE = (12, 10, 6)
+NOBODY = 65534
+
+
+def _mask(rng):
+    mask = np.zeros(SHAPE, dtype=bool)
+    mask[2:7, 3:8, 1:4] = rng.random((5, 5, 3)) > 0.3
+    return mask
+
+
+def _as_user(uid, func):
+    """func를 uid 사용자로 실행한 결과 (root일 때만 가능, fork한 자식 프로세스에서 실행)"""
+    pid = os.fork()
+    if pid == 0:
+        code = 2
+        try:
+            os.setgid(uid)
+            os.setuid(uid)
+            code = 0 if func() else 1
+        finally:
+            os._exit(code)
+    return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) == 0
+
+
+@pytest.fixture
+def shared_tmp():
+    # pytest tmp_path는 root 전용(0700)이라 다른 사용자가 들어갈 수 없음
+    path = tempfile.mkdtemp()
+    os.chmod(path, 0o755)
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def test_store_and_load_round_trip(tmp_path, rng):
+    cache = InferenceCache(str(tmp_path / "cache"))
+    mask = _mask(rng)
+    assert cache.store("1.2.3", "total", "2.0", {"liver": mask}, ["liver", "spleen"], SHAPE)
+    masks, missing = cache.load("1.2.3", "total", "2.0", ["liver", "spleen", "kidney"], SHAPE)
+    np.testing.assert_array_equal(masks["liver"], mask)
+    assert "spleen" not in masks and missing == ["kidney"]
+
+
+def test_shared_directories_are_writable_by_everyone(tmp_path, rng):
+    cache_dir = tmp_path / "cache"
+    cache = InferenceCache(str(cache_dir))
+    assert cache.store("1.2.3", "total", "2.0", {"liver": _mask(rng)}, ["liver"], SHAPE)
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) == SHARED_ROOT_MODE
+    for directory in (cache_dir / "1.2.3", cache_dir / "1.2.3" / "total_2.0"):
+        assert stat.S_IMODE(os.stat(directory).st_mode) == SHARED_DIR_MODE
+
+
+@pytest.mark.skipif(not hasattr(os, "geteuid") or os.geteuid() != 0, reason="다른 사용자로 실행하려면 root 필요")
+def test_second_user_can_store_into_shared_cache(shared_tmp, rng):
+    cache = InferenceCache(os.path.join(shared_tmp, "cache"))
+    assert cache.store("1.2.3", "total", "2.0", {"liver": _mask(rng)}, ["liver"], SHAPE)
+    mask = _mask(rng)
+    assert _as_user(NOBODY, lambda: cache.store("1.2.3", "total", "2.0", {"spleen": mask}, ["spleen", "liver"], SHAPE))
+    masks, missing = cache.load("1.2.3", "total", "2.0", ["spleen"], SHAPE)
+    np.testing.assert_array_equal(masks["spleen"], mask)
+
+
+def test_read_only_cache_dir_logs_and_keeps_going(shared_tmp, rng, capsys):
+    cache_dir = os.path.join(shared_tmp, "cache")
+    os.mkdir(cache_dir)
+    os.chmod(cache_dir, 0o555)
+    cache = InferenceCache(cache_dir)
+    mask = _mask(rng)
+
+    def store():
+        # 실패하면 예외 없이 False를 반환해야 함
+        return cache.store("1.2.3", "total", "2.0", {"liver": mask}, ["liver"], SHAPE) is False
+
+    if os.geteuid() == 0: # root는 권한 검사를 건너뛰므로 다른 사용자로 실행
+        assert _as_user(NOBODY, store)
+    else:
+        assert store()
+        assert "추론 캐시 저장 실패" in capsys.readouterr().out
+    assert os.listdir(cache_dir) == []
+
+
+def test_write_failure_leaves_no_temp_files(tmp_path, rng, monkeypatch, capsys):
+    cache = InferenceCache(str(tmp_path / "cache"))
+
+    def disk_full(src, dst):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "replace", disk_full)
+    assert cache.store("1.2.3", "total", "2.0", {"liver": _mask(rng)}, ["liver"], SHAPE) is False
+    assert "추론 캐시 저장 실패" in capsys.readouterr().out
+    assert os.listdir(tmp_path / "cache" / "1.2.3" / "total_2.0") == []
@@ -0,0 +1,75 @@
+import numpy as np
+
+from mask_store import MaskStore, _bbox
+
+
+SHAPE = (40, 48, 12)
+
+
+def _blob(rng, shape=SHAPE):
+    mask = np.zeros(shape, dtype=bool)
+    r, c, z = (int(rng.integers(0, max(1, s - 4))) for s in shape)
+    mask[r:r + int(rng.integers(1, 12)), c:c + int(rng.integers(1, 12)), z:z + int(rng.integers(1, 5))] = True
+    return mask
+
+
+def test_bbox():
+    mask = np.zeros((5, 6, 3), dtype=bool)
+    assert _bbox(mask) is None
+    mask[1, 2:4, 2] = True
+    assert _bbox(mask) == [(1, 2), (2, 4), (2, 3)]
+
+
+def test_volume_round_trip_keeps_only_the_crop(rng):
+    store = MaskStore(SHAPE)
+    mask = _blob(rng)
+    store["liver"] = mask
+    np.testing.assert_array_equal(store["liver"], mask)
+    assert store.nbytes == int(mask.sum()) # 꽉 찬 직육면체라서 crop 크기 = voxel 수
+
+
+def test_slice_edits_match_a_dense_reference(rng):
+    store = MaskStore(SHAPE)
+    dense = np.zeros(SHAPE, dtype=bool)
+    for step in range(300):
+        z = int(rng.integers(0, SHAPE[2]))
+        op = step % 4
+        if op == 0:
+            mask2d = _blob(rng)[:, :, 0] | _blob(rng)[:, :, 0]
+            store.set_slice("roi", z, mask2d)
+            dense[:, :, z] = mask2d
+        elif op == 1:
+            if "roi" in store:
+                store.clear_slice("roi", z)
+            dense[:, :, z] = False
+        elif op == 2:
+            footprint = _blob(rng, (8, 8, 3))
+            r, c = int(rng.integers(0, SHAPE[0] - 8)), int(rng.integers(0, SHAPE[1] - 8))
+            z0 = int(rng.integers(0, SHAPE[2] - 3))
+            value = bool(rng.integers(0, 2))
+            store.paint("roi", (r, c, z0), footprint, value)
+            if value:
+                dense[r:r + 8, c:c + 8, z0:z0 + 3] |= footprint
+            else:
+                dense[r:r + 8, c:c + 8, z0:z0 + 3] &= ~footprint
+        else:
+            block = _blob(rng, (10, 10, 3))
+            r, c = int(rng.integers(0, SHAPE[0] - 10)), int(rng.integers(0, SHAPE[1] - 10))
+            z0 = int(rng.integers(0, SHAPE[2] - 3))
+            store.set_slices("roi", (r, c, z0), block)
+            dense[:, :, z0:z0 + 3] = False
+            dense[r:r + 10, c:c + 10, z0:z0 + 3] = block
+        np.testing.assert_array_equal(store["roi"], dense)
+        z = int(rng.integers(0, SHAPE[2]))
+        np.testing.assert_array_equal(store.get_slice_crop("roi", z, (5, 30), (0, 20)), dense[5:30, 0:20, z])
+
+
+def test_version_changes_only_on_edit():
+    store = MaskStore(SHAPE)
+    store.set_slice("a", 3, np.ones(SHAPE[:2], dtype=bool))
+    version = store.version("a")
+    store.get_slice("a", 3)
+    assert store.version("a") == version
+    store.clear_slice("a", 3)
+    assert store.version("a") != version
+    assert not store["a"].any()
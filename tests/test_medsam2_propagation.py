@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from medsam2_propagation import propagate_from_slice # noqa: E402
+
+
+class FakePredictor:
+    """MedSAM2 video predictor 흉내: present에 있는 슬라이스만 마스크가 있다고 반환"""
+    def __init__(self, present):
+        self.present = set(present)
+        self.calls = []
+        self.yielded = {False: [], True: []}
+
+    def init_state(self, images, height, width):
+        self.depth, self.shape = len(images), (height, width)
+        return {"seed": None}
+
+    def reset_state(self, state):
+        self.calls.append("reset")
+        state["seed"] = None
+
+    def add_new_points_or_box(self, inference_state, frame_idx, obj_id, box):
+        self.calls.append(("box", frame_idx))
+        inference_state["seed"] = frame_idx
+
+    def propagate_in_video(self, state, reverse=False):
+        seed = state["seed"]
+        assert seed is not None, "시드 없이 전파함"
+        for frame in (range(seed, -1, -1) if reverse else range(seed, self.depth)):
+            self.yielded[reverse].append(frame)
+            yield frame, [1], torch.full((1, 1, *self.shape), 1.0 if frame in self.present else -1.0)
+
+
+def _inputs():
+    vol = np.zeros((20, 8, 8), dtype=np.uint8)
+    mask2d = np.zeros((8, 8), dtype=bool)
+    mask2d[2:5, 3:6] = True
+    return vol, mask2d
+
+
+def test_each_direction_is_reset_and_reseeded():
+    vol, mask2d = _inputs()
+    predictor = FakePredictor(range(7, 14))
+    segs = propagate_from_slice(predictor, vol, mask2d, 10, torch.device("cpu"))
+    assert predictor.calls == [("box", 10), "reset", ("box", 10)]
+    np.testing.assert_array_equal(np.flatnonzero(segs.reshape(20, -1).any(axis=1)), np.arange(7, 14))
+
+
+def test_stops_right_after_empty_run():
+    vol, mask2d = _inputs()
+    predictor = FakePredictor(range(7, 14))
+    propagate_from_slice(predictor, vol, mask2d, 10, torch.device("cpu"), stop_after_empty=3, transfer_batch=8)
+    # 빈 슬라이스 3장 (14, 15, 16 / 6, 5, 4)을 본 직후 멈춤 (transfer_batch와 상관없이)
+    assert predictor.yielded[False] == list(range(10, 17))
+    assert predictor.yielded[True] == list(range(10, 3, -1))
+
+
+def test_without_stop_propagates_whole_range():
+    vol, mask2d = _inputs()
+    predictor = FakePredictor(range(7, 14))
+    segs = propagate_from_slice(predictor, vol, mask2d, 10, torch.device("cpu"), z_range=(2, 18), stop_after_empty=None)
+    assert predictor.yielded[False] == list(range(8, 16)) # z_range 안의 frame 번호 (z - 2)
+    assert predictor.yielded[True] == list(range(8, -1, -1))
+    np.testing.assert_array_equal(np.flatnonzero(segs.reshape(20, -1).any(axis=1)), np.arange(9, 16))
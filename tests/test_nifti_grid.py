@@ -0,0 +1,64 @@
+import numpy as np
+from pydicom.dataset import Dataset
+
+from nifti_grid import editor_grid_affine, volume_to_nifti, labels_to_grid
+
+
+def _headers(depth, spacing=(0.8, 0.7), step=2.5):
+    headers = []
+    for z in range(depth):
+        ds = Dataset()
+        ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+        ds.PixelSpacing = list(spacing)
+        ds.ImagePositionPatient = [-100.0, -120.0, 30.0 + z * step]
+        headers.append(ds)
+    return headers
+
+
+def test_grid_affine_maps_indices_to_ras():
+    affine = editor_grid_affine(_headers(5))
+    # (row, column, slice) = (2, 3, 4) -> LPS (-100 + 3*0.7, -120 + 2*0.8, 30 + 4*2.5) -> RAS
+    point = affine @ np.array([2, 3, 4, 1.0])
+    np.testing.assert_allclose(point[:3], [100 - 2.1, 120 - 1.6, 40.0])
+
+
+def test_volume_to_nifti_does_not_wrap_unsigned_values():
+    raw = np.array([0, 1024, 40000, 65535], dtype=np.uint16).reshape(2, 2, 1)
+    image = volume_to_nifti(raw, _headers(1), 1, -1024)
+    data = np.asanyarray(image.dataobj)
+    assert data.dtype == np.int16
+    np.testing.assert_array_equal(data.ravel(), [-1024, 0, 32767, 32767])
+
+
+def test_volume_to_nifti_float_rescale():
+    raw = np.array([0, 10], dtype=np.int16).reshape(1, 2, 1)
+    data = np.asanyarray(volume_to_nifti(raw, _headers(1), 0.5, -1000.25).dataobj)
+    np.testing.assert_allclose(data.ravel(), [-1000.25, -995.25])
+
+
+def test_labels_to_grid_round_trips_flipped_and_permuted_affines(rng):
+    grid_shape = (6, 5, 4)
+    grid_affine = editor_grid_affine(_headers(grid_shape[2]))
+    labels = rng.integers(0, 4, size=grid_shape).astype(np.uint8)
+
+    # seg 볼륨 = grid 축을 (2, 0, 1) 순서로 바꾸고 첫 축을 뒤집은 것
+    seg = np.flip(np.transpose(labels, (2, 0, 1)), axis=0)
+    seg_to_grid = np.zeros((4, 4))
+    seg_to_grid[2, 0] = -1
+    seg_to_grid[0, 1] = 1
+    seg_to_grid[1, 2] = 1
+    seg_to_grid[2, 3] = grid_shape[2] - 1
+    seg_to_grid[3, 3] = 1
+    seg_affine = grid_affine @ seg_to_grid
+
+    np.testing.assert_array_equal(labels_to_grid(seg, seg_affine, grid_affine, grid_shape), labels)
+
+
+def test_labels_to_grid_resamples_other_grids():
+    grid_shape = (4, 4, 2)
+    grid_affine = np.eye(4)
+    seg = np.zeros((2, 2, 1), dtype=np.uint8)
+    seg[1, 1, 0] = 3
+    seg_affine = np.diag([2.0, 2.0, 2.0, 1.0]) # seg voxel 하나 = grid 2x2x2
+    out = labels_to_grid(seg, seg_affine, grid_affine, grid_shape)
+    assert out[2, 2, 0] == 3 and out[0, 0, 0] == 0
@@ -0,0 +1,39 @@
+import pydicom
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, CTImageStorage, generate_uid
+
+from test2 import scan_elements, verify_dataset, fix_dataset
+
+
+def _dataset():
+    ds = Dataset()
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds.file_meta.MediaStorageSOPClassUID = CTImageStorage
+    ds.file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    ds.SOPClassUID, ds.SOPInstanceUID = CTImageStorage, ds.file_meta.MediaStorageSOPInstanceUID
+    ds.ImageType = "ORIGINAL"
+    ds.add_new(0x00091010, "OB", b"private\0")
+    return ds
+
+
+def test_image_type_with_missing_vr_is_fixed_to_cs(tmp_path):
+    ds = _dataset()
+    ds[0x00080008].VR = None
+    ds[0x00091010].VR = None
+
+    # process_file처럼 검사 전에 한번 모은 scan을 수정에도 그대로 사용
+    scan = scan_elements(ds)
+    assert any("ImageType VR" in issue for issue in verify_dataset(ds, scan))
+    ds, fixes = fix_dataset(ds, scan=scan)
+
+    assert ds[0x00080008].VR == "CS"
+    assert "(0008,0008) VR=CS로 교정" in fixes
+    assert not any(fix.startswith("(0008,0008) VR=UN") for fix in fixes)
+    assert ds[0x00091010].VR == "UN" # 다른 VR 누락 태그는 그대로 UN으로
+
+    path = str(tmp_path / "out.dcm")
+    ds.save_as(path, enforce_file_format=True)
+    saved = pydicom.dcmread(path)
+    assert saved[0x00080008].VR == "CS"
+    assert saved.ImageType == "ORIGINAL"
@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import nibabel as nib
+import pytest
+import SimpleITK as sitk
+from PIL import Image
+
+import slice_convert
+from slice_convert import is_compressed, iter_slices, volume_to_png, png_to_volume, read_png
+
+
+def _write_volume(path, array, compress):
+    image = sitk.GetImageFromArray(array)
+    image.SetSpacing((0.8, 0.7, 2.5))
+    image.SetOrigin((-100.0, -120.0, 30.0))
+    image.SetDirection((1, 0, 0, 0, -1, 0, 0, 0, 1))
+    sitk.WriteImage(image, str(path), useCompression=compress)
+    return str(path)
+
+
+def _labels(rng, shape=(9, 16, 20)):
+    return rng.integers(0, 4, size=shape).astype(np.uint8)
+
+
+@pytest.mark.parametrize("name, compress, expected", [
+    ("v.nii.gz", True, True), ("v.nii", False, False), ("v.nrrd", True, True), ("v.nrrd", False, False),
+    ("v.mha", True, True), ("v.mha", False, False),
+])
+def test_is_compressed(tmp_path, rng, name, compress, expected):
+    assert is_compressed(_write_volume(tmp_path / name, _labels(rng), compress)) is expected
+
+
+@pytest.mark.parametrize("name, compress", [("v.nii.gz", True), ("v.nrrd", False), ("v.nrrd", True), ("v.mha", True)])
+def test_iter_slices_matches_full_read(tmp_path, rng, name, compress):
+    labels = _labels(rng)
+    path = _write_volume(tmp_path / name, labels, compress)
+    zs = [7, 0, 3, 4, 8]
+    assert [z for z, _ in iter_slices(path, zs)] == zs
+    for z, array2d in iter_slices(path, zs):
+        np.testing.assert_array_equal(array2d, labels[z])
+    np.testing.assert_array_equal(np.stack([a for _, a in iter_slices(path)]), labels)
+
+
+@pytest.mark.parametrize("name, compress", [("v.nii.gz", True), ("v.nrrd", False)])
+def test_palette_round_trip_keeps_labels_and_geometry(tmp_path, rng, name, compress):
+    labels = _labels(rng)
+    path = _write_volume(tmp_path / name, labels, compress)
+    png_dir = str(tmp_path / "png")
+    assert volume_to_png(path, png_dir, workers=2) == labels.shape[0]
+    with Image.open(tmp_path / "png" / "slice_000.png") as first:
+        assert first.mode == "P"
+
+    output = str(tmp_path / "out.nrrd")
+    png_to_volume(png_dir, output, reference=path, workers=2)
+    assert is_compressed(output)
+    image = sitk.ReadImage(output)
+    np.testing.assert_array_equal(sitk.GetArrayFromImage(image), labels)
+    reference = sitk.ReadImage(path)
+    np.testing.assert_allclose(image.GetSpacing(), reference.GetSpacing())
+    np.testing.assert_allclose(image.GetOrigin(), reference.GetOrigin())
+    np.testing.assert_allclose(image.GetDirection(), reference.GetDirection())
+
+
+def test_binary_round_trip_and_reverse(tmp_path, rng):
+    labels = _labels(rng)
+    path = _write_volume(tmp_path / "v.nii.gz", labels, True)
+    png_dir = str(tmp_path / "png")
+    volume_to_png(path, png_dir, mode="binary", workers=1)
+    assert set(np.unique(read_png(str(tmp_path / "png" / "slice_000.png")))) <= {0, 255}
+
+    output = str(tmp_path / "out.nii.gz")
+    png_to_volume(png_dir, output, reverse=True, binarize=True, workers=1)
+    np.testing.assert_array_equal(sitk.GetArrayFromImage(sitk.ReadImage(output)), (labels > 0)[::-1])
+
+
+def test_gray_window(tmp_path):
+    ct = np.tile(np.array([-1000, -160, 40, 240, 3000], dtype=np.int16), (2, 3, 1))
+    path = _write_volume(tmp_path / "ct.nii.gz", ct.astype(np.float32), True)
+    png_dir = tmp_path / "png"
+    volume_to_png(path, str(png_dir), workers=1)
+    np.testing.assert_array_equal(read_png(str(png_dir / "slice_001.png"))[0], [0, 0, 127, 255, 255])
+
+
+@pytest.mark.parametrize("name", ["v.nii.gz", "v.nrrd"])
+def test_compressed_input_is_streamed_without_block_reads(tmp_path, rng, monkeypatch, name):
+    labels = _labels(rng)
+    path = _write_volume(tmp_path / name, labels, True)
+
+    def block_read(*args):
+        raise AssertionError("압축 파일을 블록 단위로 다시 열었음")
+
+    monkeypatch.setattr(slice_convert, "read_slices", block_read)
+    zs = [2, 5, 1, 8]
+    for z, array2d in iter_slices(path, zs):
+        np.testing.assert_array_equal(array2d, labels[z])
+    volume_to_png(path, str(tmp_path / "png"), workers=1) # fork된 worker에도 위의 read_slices 교체가 적용됨
+    assert len(os.listdir(tmp_path / "png")) == labels.shape[0]
+
+
+def test_scaled_nifti_matches_itk(tmp_path, rng):
+    raw = rng.integers(-1000, 2000, size=(10, 8, 5)).astype(np.int16) # (x, y, z)
+    image = nib.Nifti1Image(raw, np.eye(4))
+    image.header.set_slope_inter(0.5, -10)
+    path = str(tmp_path / "scaled.nii.gz")
+    nib.save(image, path)
+    full = sitk.GetArrayFromImage(sitk.ReadImage(path))
+    for z, array2d in iter_slices(path):
+        assert array2d.dtype == full.dtype
+        np.testing.assert_allclose(array2d, full[z])
+
+
+@pytest.mark.parametrize("name", ["ct.nii.gz", "ct.nrrd"])
+def test_auto_mode_uses_gray_for_int16_ct(tmp_path, name):
+    ct = np.tile(np.array([-1000, -160, 40, 240, 3000], dtype=np.int16), (2, 3, 1))
+    path = _write_volume(tmp_path / name, ct, True)
+    png_dir = tmp_path / "png"
+    assert volume_to_png(path, str(png_dir), workers=1) == 2
+    with Image.open(png_dir / "slice_000.png") as first:
+        assert first.mode == "L"
+    np.testing.assert_array_equal(read_png(str(png_dir / "slice_001.png"))[0], [0, 0, 127, 255, 255])
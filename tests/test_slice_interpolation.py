@@ -0,0 +1,68 @@
+import numpy as np
+
+from mask_store import MaskStore
+from slice_interpolation import interpolate_key_slices, signed_distance
+
+SHAPE = (64, 64, 40)
+
+
+def _disk(radius, center=(32, 32)):
+    rows, cols = np.ogrid[:SHAPE[0], :SHAPE[1]]
+    return (rows - center[0]) ** 2 + (cols - center[1]) ** 2 <= radius ** 2
+
+
+def _apply(masks, name, blocks):
+    for origin, block in blocks:
+        masks.set_slices(name, origin, block)
+
+
+def test_signed_distance_sign():
+    mask = _disk(5)
+    distance = signed_distance(mask)
+    assert distance[32, 32] < 0 and distance[0, 0] > 0
+
+
+def test_interpolates_between_two_key_slices():
+    masks = MaskStore(SHAPE)
+    masks.set_slice("roi", 10, _disk(4))
+    masks.set_slice("roi", 16, _disk(10))
+
+    _apply(masks, "roi", interpolate_key_slices(masks, "roi", [10, 16]))
+
+    areas = [masks.get_slice("roi", z).sum() for z in range(10, 17)]
+    assert areas == sorted(areas) and areas[0] < areas[3] < areas[-1]
+    assert masks.get_slice("roi", 13)[32, 32]
+    assert not masks.get_slice("roi", 9).any() and not masks.get_slice("roi", 17).any()
+
+
+def test_needs_two_non_empty_keys():
+    masks = MaskStore(SHAPE)
+    masks.set_slice("roi", 5, _disk(4))
+    assert interpolate_key_slices(masks, "roi", [5, 20]) == []
+    assert interpolate_key_slices(masks, "other", [5, 20]) == []
+
+
+def test_long_gap_over_existing_mask_is_left_alone():
+    # 모델 분할 결과 위에서 멀리 떨어진 두 슬라이스를 고친 경우 -> 사이 결과를 지우지 않음
+    masks = MaskStore(SHAPE)
+    model = np.zeros(SHAPE, dtype=bool)
+    model[:, :, 2:38] = _disk(12, (30, 30))[:, :, None]
+    masks["roi"] = model
+    masks.set_slice("roi", 3, _disk(6))
+    masks.set_slice("roi", 36, _disk(6))
+
+    assert interpolate_key_slices(masks, "roi", [3, 36], max_gap=8) == []
+    blocks = interpolate_key_slices(masks, "roi", [3, 36], max_gap=None)
+    assert len(blocks) == 1 and blocks[0][1].shape[2] == 32
+
+
+def test_short_gap_or_empty_gap_is_interpolated():
+    masks = MaskStore(SHAPE)
+    masks.set_slice("roi", 2, _disk(5))
+    masks.set_slice("roi", 6, _disk(5))
+    masks.set_slice("roi", 4, _disk(20)) # 사이 슬라이스에 마스크가 있지만 간격이 max_gap 이하
+    masks.set_slice("roi", 30, _disk(5)) # 6 ~ 30 사이는 비어있음
+
+    blocks = interpolate_key_slices(masks, "roi", [2, 6, 30], max_gap=3)
+    spans = [(origin[2], origin[2] + block.shape[2]) for origin, block in blocks]
+    assert spans == [(3, 6), (7, 30)]
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+import SimpleITK as sitk
+from PIL import Image
+from pydicom.uid import generate_uid
+
+from conftest import write_ct_slice
+from slice_convert import volume_to_png
+from volume_metrics import label_metrics, read_png_stack, read_dicom_geometry, evaluate_volumes
+
+
+def _labels(shape=(6, 20, 24)):
+    """(z, y, x) label 볼륨: label 1, 2, 3이 서로 다른 상자"""
+    labels = np.zeros(shape, dtype=np.uint8)
+    labels[1:5, 2:8, 3:9] = 1
+    labels[2:4, 10:16, 4:12] = 2
+    labels[0:6, 5:15, 15:22] = 3
+    return labels
+
+
+def test_label_metrics_known_overlap():
+    gt = np.zeros((4, 10, 10), dtype=bool)
+    pred = np.zeros_like(gt)
+    gt[1:3, 2:6, 2:6] = True # 32 voxels
+    pred[1:3, 2:6, 4:8] = True # 32 voxels, 16개 겹침
+    result = label_metrics(pred, gt, (1.0, 1.0, 1.0))
+    assert result["dice"] == pytest.approx(0.5)
+    assert result["iou"] == pytest.approx(16 / 48)
+    assert result["hd95"] > 0
+
+    same = label_metrics(gt, gt, (2.5, 0.8, 0.8))
+    assert same["dice"] == same["iou"] == 1.0
+    assert same["hd95"] == same["assd"] == 0.0
+
+
+def test_label_metrics_one_side_empty():
+    gt = np.zeros((3, 5, 5), dtype=bool)
+    gt[1, 1:3, 1:3] = True
+    result = label_metrics(np.zeros_like(gt), gt, (1.0, 1.0, 1.0))
+    assert result["dice"] == 0.0
+    assert np.isnan(result["hd95"])
+
+
+def test_palette_png_stack_keeps_labels(tmp_path):
+    labels = _labels()
+    volume = sitk.GetImageFromArray(labels)
+    volume.SetSpacing((0.8, 0.8, 2.5))
+    gt_path = str(tmp_path / "gt.nii.gz")
+    sitk.WriteImage(volume, gt_path)
+    png_dir = str(tmp_path / "png")
+    volume_to_png(gt_path, png_dir, workers=1)
+
+    np.testing.assert_array_equal(sitk.GetArrayFromImage(read_png_stack(png_dir)), labels)
+    results = evaluate_volumes(png_dir, gt_path)
+    assert sorted(results) == [1, 2, 3]
+    assert all(m["dice"] == 1.0 for m in results.values())
+
+
+def test_grayscale_png_stack_keeps_small_labels_and_binarises_masks(tmp_path):
+    labels = _labels((3, 8, 8))
+    for name, scale in (("labels", 1), ("mask", 255)):
+        folder = tmp_path / name
+        folder.mkdir()
+        for z, array2d in enumerate(labels):
+            Image.fromarray(((array2d > 0) * 255 if scale == 255 else array2d).astype(np.uint8)).save(
+                folder / f"{z:03d}.png")
+    np.testing.assert_array_equal(sitk.GetArrayFromImage(read_png_stack(str(tmp_path / "labels"))), labels)
+    np.testing.assert_array_equal(sitk.GetArrayFromImage(read_png_stack(str(tmp_path / "mask"))), labels > 0)
+
+
+def test_dicom_geometry_from_headers_matches_series_read(tmp_path, rng):
+    series_uid = generate_uid()
+    for i in range(5):
+        pixels = rng.integers(0, 2000, size=(12, 10))
+        write_ct_slice(str(tmp_path / f"IMG{i:03d}.dcm"), -40.0 + 2.5 * i, i + 1, series_uid, pixels,
+                       spacing=(0.7, 0.9))
+
+    geometry = read_dicom_geometry(str(tmp_path))
+    reader = sitk.ImageSeriesReader()
+    reader.SetFileNames(reader.GetGDCMSeriesFileNames(str(tmp_path)))
+    full = reader.Execute()
+    assert geometry.GetSize() == full.GetSize() == (10, 12, 5)
+    np.testing.assert_allclose(geometry.GetSpacing(), full.GetSpacing())
+    np.testing.assert_allclose(geometry.GetOrigin(), full.GetOrigin())
+    np.testing.assert_allclose(geometry.GetDirection(), full.GetDirection())
+    assert not sitk.GetArrayViewFromImage(geometry).any()
+
+
+def test_png_folder_against_dicom_reference(tmp_path, rng):
+    series_uid = generate_uid()
+    dicom_dir = tmp_path / "dicom"
+    dicom_dir.mkdir()
+    labels = _labels((4, 20, 24))
+    for i in range(labels.shape[0]):
+        write_ct_slice(str(dicom_dir / f"IMG{i:03d}.dcm"), 2.5 * i, i + 1, series_uid, rng.integers(0, 2000, (20, 24)))
+    gt_dir = tmp_path / "gt"
+    gt_dir.mkdir()
+    for z, array2d in enumerate(labels):
+        Image.fromarray(array2d).save(gt_dir / f"{z:03d}.png")
+
+    results = evaluate_volumes(str(gt_dir), str(gt_dir), reference_dicom=str(dicom_dir))
+    assert all(m["dice"] == 1.0 and m["hd95"] == 0.0 for m in results.values())
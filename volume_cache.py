@@ -0,0 +1,142 @@
+import os
+import glob
+import json
+import uuid
+import hashlib
+
+import numpy as np
+
+from inference_cache import default_cache_dir, makedirs_shared, _safe_name
+from dicom_loader import read_series_headers, load_series_volume, _read_header
+from windowing import first_value
+
+
+def series_key(dicom_series_path):
+    """
+    폴더의 SeriesInstanceUID와 파일 목록 fingerprint를 구함 (헤더는 파일 하나만 읽음)
+
+    fingerprint는 파일 이름/크기/수정시간으로 만들기 때문에 폴더 내용이 바뀌면 캐시를 다시 만듦.
+    Returns:
+        tuple: (SeriesInstanceUID, fingerprint 문자열).
+    """
+    dicom_files = sorted(glob.glob(os.path.join(dicom_series_path, '*.dcm')))
+    if not dicom_files:
+        raise FileNotFoundError(f"'{dicom_series_path}' 폴더에 DICOM 파일이 없습니다.")
+    digest = hashlib.sha1()
+    for path in dicom_files:
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return str(_read_header(dicom_files[0]).SeriesInstanceUID), digest.hexdigest()
+
+
+class VolumeCache:
+    """
+    디코딩한 원본 볼륨을 SeriesInstanceUID별로 디스크에 저장해두는 캐시
+
+    볼륨은 (Z, H, W) 순서의 .npy로 저장하고 np.load(mmap_mode='r')로 열어서
+    (H, W, Z) view로 넘겨줌 -> 슬라이스 하나가 파일에서 연속된 영역이라 보는 슬라이스만 메모리에 올라옴.
+    rescale/window/geometry 정보와 정렬된 파일 순서는 meta.json에 저장함.
+    같은 시리즈라도 로더(pydicom, SimpleITK)마다 슬라이스 순서가 다를 수 있어서 로더별로 따로 저장함.
+    """
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or default_cache_dir()
+
+    def _entry_dir(self, series_uid, loader):
+        return os.path.join(self.cache_dir, _safe_name(series_uid), f"volume_{_safe_name(loader)}")
+
+    def load(self, series_uid, loader, fingerprint):
+        """
+        캐시된 볼륨을 memmap으로 엶
+
+        Returns:
+            tuple: (읽기전용 (H, W, Z) 볼륨, meta dict).
+                   캐시가 없거나 fingerprint가 다르면 None.
+        """
+        entry_dir = self._entry_dir(series_uid, loader)
+        meta_path = os.path.join(entry_dir, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('fingerprint') != fingerprint:
+                return None
+            volume_zhw = np.load(os.path.join(entry_dir, 'volume.npy'), mmap_mode='r')
+            volume = np.transpose(volume_zhw, (1, 2, 0))
+            if list(volume.shape) != meta['shape']:
+                return None
+        except Exception as e:
+            print(f"볼륨 캐시를 읽는 중 오류 발생 ({entry_dir}): {e}")
+            return None
+        return volume, meta
+
+    def store(self, series_uid, loader, fingerprint, volume, meta):
+        """
+        (H, W, Z) 볼륨과 meta를 캐시에 저장하고 저장된 memmap 볼륨을 반환
+        저장에 실패하면 경고만 출력하고 넘겨받은 볼륨을 그대로 반환함.
+        """
+        entry_dir = self._entry_dir(series_uid, loader)
+        meta = dict(meta, fingerprint=fingerprint, shape=list(volume.shape), dtype=str(volume.dtype))
+        try:
+            makedirs_shared(self.cache_dir, entry_dir)
+            # 여러 사용자가 동시에 써도 깨지지 않게 임시파일에 쓰고 교체, meta.json을 마지막에 써서 완료 표시로 사용
+            self._write_atomic(os.path.join(entry_dir, 'volume.npy'),
+                               lambda f: np.save(f, np.transpose(volume, (2, 0, 1))))
+            self._write_atomic(os.path.join(entry_dir, 'meta.json'),
+                               lambda f: f.write(json.dumps(meta).encode('utf-8')))
+        except Exception as e:
+            print(f"볼륨 캐시 저장 실패 ({entry_dir}): {e}")
+            return volume
+
+        volume_zhw = np.load(os.path.join(entry_dir, 'volume.npy'), mmap_mode='r')
+        return np.transpose(volume_zhw, (1, 2, 0))
+
+    @staticmethod
+    def _write_atomic(path, write):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def series_meta(headers):
+    """정렬된 헤더에서 캐시에 같이 저장할 rescale/window/geometry 정보"""
+    first = headers[0]
+    return {
+        'slope': float(first.get('RescaleSlope', 1.0)),
+        'intercept': float(first.get('RescaleIntercept', 0.0)),
+        'window_center': first_value(first.get('WindowCenter'), None),
+        'window_width': first_value(first.get('WindowWidth'), None),
+        'pixel_spacing': [float(v) for v in first.PixelSpacing],
+        'orientation': [float(v) for v in first.ImageOrientationPatient],
+        'positions': [[float(v) for v in ds.ImagePositionPatient] for ds in headers],
+        'filenames': [os.path.basename(ds.filename) for ds in headers],
+    }
+
+
+def load_series_cached(dicom_series_path, volume_cache, progress_callback=None):
+    """
+    캐시가 있으면 memmap으로 바로 열고, 없으면 디코딩한 뒤 캐시에 저장
+
+    헤더는 픽셀데이터 없이 읽어서 빠르므로 매번 다시 읽고 (RTSTRUCT 저장 등에 필요),
+    정렬된 파일 순서가 캐시와 다르면 캐시를 쓰지 않음. 시간이 오래 걸리는 픽셀 디코딩만 건너뜀.
+
+    Returns:
+        tuple: ((H, W, Z) 볼륨, 정렬된 헤더 리스트, meta dict).
+    """
+    series_uid, fingerprint = series_key(dicom_series_path)
+    headers = read_series_headers(dicom_series_path)
+    cached = volume_cache.load(series_uid, 'pydicom', fingerprint)
+    if cached is not None and cached[1]['filenames'] == [os.path.basename(ds.filename) for ds in headers]:
+        print("캐시된 볼륨을 사용합니다.")
+        volume, meta = cached
+        return volume, headers, meta
+
+    volume = load_series_volume(headers, progress_callback=progress_callback)
+    meta = series_meta(headers)
+    volume = volume_cache.store(series_uid, 'pydicom', fingerprint, volume, meta)
+    return volume, headers, meta
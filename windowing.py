@@ -0,0 +1,69 @@
+import numpy as np
+
+# 자주 쓰는 CT window 프리셋 (center, width)
+WINDOW_PRESETS = {
+    "soft tissue": (40, 400),
+    "lung": (-600, 1500),
+    "bone": (400, 1800),
+    "liver": (60, 160),
+    "brain": (40, 80),
+}
+
+
+def window_to_uint8(data, center, width):
+    """HU 값을 window (center, width)로 잘라서 0~255 uint8로 변환"""
+    min_val = center - width / 2
+    max_val = center + width / 2
+    data = np.clip(data, min_val, max_val)
+    data = (data - min_val) / (max_val - min_val) * 255
+    return data.astype(np.uint8)
+
+
+def first_value(value, default):
+    # WindowCenter/WindowWidth가 여러 값(MultiValue)이면 첫 번째 값 사용
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except TypeError:
+        return float(value[0])
+
+
+class WindowLUT:
+    """
+    원본 저장값(raw) -> 화면용 uint8 변환을 lookup table로 하는 클래스
+
+    16bit 이하 정수 볼륨이면 가능한 모든 raw 값에 대해 (slope, intercept, window)를 미리 계산해두고
+    슬라이스를 그릴 때 테이블 인덱싱만 함. window를 바꿀 때는 테이블만 다시 만들면 되고
+    볼륨 전체의 HU/float 배열을 만들지 않음.
+    """
+    def __init__(self, dtype, slope, intercept):
+        self.dtype = np.dtype(dtype)
+        self.slope = float(slope)
+        self.intercept = float(intercept)
+        self.center = None
+        self.width = None
+        self._table = None
+        # 16bit 이하 정수형만 테이블 사용 (raw 비트패턴을 unsigned로 보고 인덱싱)
+        self._index_dtype = None
+        if self.dtype.kind in 'iu' and self.dtype.itemsize <= 2:
+            self._index_dtype = np.dtype(f'u{self.dtype.itemsize}')
+            bit_patterns = np.arange(2 ** (8 * self.dtype.itemsize), dtype=self._index_dtype)
+            self._table_hu = bit_patterns.view(self.dtype).astype(np.float32) * self.slope + self.intercept
+
+    @property
+    def key(self):
+        return (self.center, self.width)
+
+    def set_window(self, center, width):
+        self.center = float(center)
+        self.width = max(1.0, float(width))
+        if self._index_dtype is not None:
+            self._table = window_to_uint8(self._table_hu, self.center, self.width)
+
+    def apply(self, raw):
+        """raw 슬라이스(또는 임의의 배열)를 현재 window로 uint8 변환"""
+        if self._table is not None:
+            return self._table[raw.view(self._index_dtype)]
+        # 테이블을 못쓰는 dtype은 해당 슬라이스만 직접 계산
+        return window_to_uint8(raw * self.slope + self.intercept, self.center, self.width)